@@ -0,0 +1,275 @@
+# Description: Non-interactive batch mode for One Stop Insurance policies
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import argparse
+import csv
+import json
+import math
+import string
+import sys
+import time
+
+import ClaimCollection as CC
+import OneStop as OS
+import PolicyLog as PL
+import PolicyNumbers as PN
+import PolicyQuery as PQ
+import PolicyStore as PS
+import QuoteCache as QC
+
+
+# Batch Values
+
+PAY_MAP = {'F': 'Full', 'M': 'Monthly', 'D': 'Down Pay'}
+
+# Lets a record use either the prompt letter or the full method name.
+PAY_LOOKUP = dict(PAY_MAP, **{Method.upper(): Method for Method in PAY_MAP.values()})
+
+# Same checks, in the same order, that collect_customer_info prompts for.
+CUSTOMER_FIELDS = [
+    ('FName', 'Name', "Invalid first name. Please use only allowed characters."),
+    ('LName', 'Name', "Invalid last name. Please use only allowed characters."),
+    ('Address', 'Empty', "Invalid address. Please ensure the address is not empty."),
+    ('City', 'Name', "Invalid city name. Please use only allowed characters."),
+    ('Province', 'Province', "Invalid province. Please enter a valid abbreviation."),
+    ('PostCode', 'PostCode', "Invalid postal code format."),
+    ('PhoneNum', 'PhoneNum', "Invalid phone number. Please enter a 10-digit numeric phone number."),
+    ('NumCars', 'NumCars', f"Please enter a positive integer up to {PS.MAX_NUM_CARS}."),
+    ('ExtLiability', 'YesNo', "Data Entry Error - Answer Yes or No by typing Y or N"),
+    ('GlassCoverage', 'YesNo', "Data Entry Error - Answer Yes or No by typing Y or N"),
+    ('LoanerCar', 'YesNo', "Data Entry Error - Answer Yes or No by typing Y or N"),
+]
+
+
+# Input Functions
+
+def read_policy_records(FileName):
+
+    # Stream records one at a time so memory use does not grow with the file.
+    # JSONL files hold one JSON object per line, anything else is read as CSV.
+    # A line that is not valid JSON comes through as a ValueError in place of
+    # the record, so it is rejected like any other bad record and the run goes on.
+    with open(FileName, 'r', newline='') as f:
+        if FileName.lower().endswith(('.jsonl', '.json')):
+            for Line in f:
+                if Line.strip():
+                    try:
+                        yield json.loads(Line)
+                    except ValueError as Error:
+                        yield ValueError(f"Malformed JSON: {Error}")
+        else:
+            for Record in csv.DictReader(f):
+                yield Record
+
+def parse_claims(RawClaims):
+
+    # Claims come in as a list of dicts (JSONL) or as "Num:Date:Amount;..." (CSV).
+    if not RawClaims:
+        return []
+    if isinstance(RawClaims, str):
+        RawClaims = [dict(zip(('Number', 'Date', 'Amount'), Item.split(':')))
+                     for Item in RawClaims.split(';') if Item.strip()]
+    if not isinstance(RawClaims, list) or not all(isinstance(RawClaim, dict) for RawClaim in RawClaims):
+        raise ValueError("Claims must be a list of claims, each with a Number, Date and Amount.")
+
+    # Keyed by claim number so a repeated number updates the amount, like get_claims.
+    Claims = CC.ClaimCollection()
+    for RawClaim in RawClaims:
+        ClaimNum = str(RawClaim.get('Number', '')).strip()
+        ClaimDate = str(RawClaim.get('Date', '')).strip()
+        ClaimAmt = str(RawClaim.get('Amount', '')).strip()
+
+        if not OS.is_valid_input(ClaimNum, 'PosiInteger'):
+            raise ValueError("Invalid input. Please enter a valid claim number.")
+        if not OS.is_valid_input(ClaimDate, 'Date'):
+            raise ValueError("Invalid date format or date. Please enter the date in YYYY-MM-DD format.")
+        if not OS.is_valid_input(ClaimAmt, 'PosiFloat'):
+            raise ValueError("Invalid amount. Please enter a valid number.")
+
+        Claims.upsert(ClaimNum, ClaimDate, float(ClaimAmt))
+
+    if len(Claims) > PS.MAX_CLAIMS:
+        raise ValueError(f"A policy can hold at most {PS.MAX_CLAIMS} claims.")
+    return Claims.to_list()
+
+def build_customer_info(Record):
+
+    # A line read_policy_records could not parse arrives as its error.
+    if isinstance(Record, ValueError):
+        raise Record
+    if not isinstance(Record, dict):
+        raise ValueError("Record must be a JSON object.")
+
+    # Validate every field with the same rules as the interactive prompts.
+    Values = {}
+    for Field, ValiType, ErrorMess in CUSTOMER_FIELDS:
+        Value = str(Record.get(Field, '') or '').strip()
+        if not OS.is_valid_input(Value, ValiType):
+            raise ValueError(f"{Field}: {ErrorMess}")
+        Values[Field] = Value
+
+    # Apply the same formatting collect_customer_info does.
+    return {
+        'FName': Values['FName'].title(),
+        'LName': Values['LName'].title(),
+        'Address': string.capwords(Values['Address']),
+        'City': Values['City'].title(),
+        'Province': Values['Province'].upper(),
+        'PostCode': Values['PostCode'].upper().replace(" ", ""),
+        'PhoneNum': Values['PhoneNum'],
+        'NumCars': int(Values['NumCars']),
+        'ExtLiability': Values['ExtLiability'].upper(),
+        'GlassCoverage': Values['GlassCoverage'].upper(),
+        'LoanerCar': Values['LoanerCar'].upper()
+    }
+
+def build_payment_info(Record):
+
+    # Map the record's payment method the same way get_payment_info does.
+    PayMethod = PAY_LOOKUP.get(str(Record.get('PayMethod', '') or '').strip().upper())
+    if PayMethod is None:
+        raise ValueError("Invalid payment method. Please enter 'F', 'M', or 'D'.")
+
+    # Down payment is only used for the 'Down Pay' option.
+    DownPay = None
+    if PayMethod == 'Down Pay':
+        try:
+            DownPay = float(str(Record.get('DownPay', '')).strip())
+        except ValueError:
+            raise ValueError("Invalid amount. Please enter a numeric value.")
+        if not math.isfinite(DownPay):
+            raise ValueError("Invalid amount. Please enter a numeric value.")
+        if DownPay < 0:
+            raise ValueError("The down payment cannot be negative. Please enter a positive value.")
+
+    return PayMethod, DownPay
+
+
+# Calculation Functions
+
+def price_policy(CustInfo, PayMethod, DownPay, Rates=None):
+
+    # Run the record through the same calculations as process_insurance_policy,
+    # all with one rate snapshot. Premium and total cost come from the quote cache.
+    Rates = Rates or OS.RATE_TABLE.current()
+    PremDetails, Hst, TotCost = QC.QUOTE_CACHE.quote(
+        CustInfo['NumCars'],
+        CustInfo['ExtLiability'],
+        CustInfo['GlassCoverage'],
+        CustInfo['LoanerCar'],
+        Rates
+    )
+    MonPayment = OS.calculate_monthly_payments(TotCost, PayMethod, DownPay, Rates)
+
+    return PremDetails, Hst, TotCost, MonPayment
+
+
+# Main Functions
+
+def process_policy_file(InFileName, ClaimsFileName=None, RejectFileName=None, StartPolicyNumber=None,
+                        BatchCount=500, Fsync=False, DefaultsFileName=None, NumberBlockSize=PN.DEFAULT_BLOCK_SIZE,
+                        RotateBytes=None, RotateDays=None, Compression='zlib'):
+
+    # Files not named are the active context's (OneStop.use_context).
+    ClaimsFileName = ClaimsFileName or PS.CLAIMS_FILE
+    DefaultsFileName = DefaultsFileName or PN.DEFAULTS_FILE
+
+    # Policy numbers are leased in blocks from Defaults.dat unless a start number is given.
+    Allocator = None
+    if StartPolicyNumber is None:
+        Allocator = PN.PolicyNumberAllocator(DefaultsFileName, NumberBlockSize)
+    NextNumber = StartPolicyNumber
+    FirstPolicyNumber = None
+    LastPolicyNumber = None
+    Processed = 0
+    Rejected = 0
+    StartTime = time.perf_counter()
+
+    # The whole run is priced with the rates in effect when it starts.
+    OS.RATE_TABLE.check_for_changes()
+    Rates = OS.RATE_TABLE.current()
+
+    # Claims.dat (and the reject file) are opened once for the whole run.
+    # With a rotation size or age, Claims.dat is sealed into the policy log
+    # (PolicyLog.py) whenever it gets that big or old during the run.
+    if RotateBytes or RotateDays:
+        Writer = PL.SegmentedWriter(ClaimsFileName, RotateBytes, RotateDays, Compression, BatchCount=BatchCount, Fsync=Fsync)
+    else:
+        Writer = PS.PolicyWriter(ClaimsFileName, BatchCount=BatchCount, Fsync=Fsync)
+    RejectFile = open(RejectFileName, "a") if RejectFileName else None
+
+    try:
+        for LineNum, Record in enumerate(read_policy_records(InFileName), start=1):
+            try:
+                CustInfo = build_customer_info(Record)
+                Claims = parse_claims(Record.get('Claims'))
+                PayMethod, DownPay = build_payment_info(Record)
+            except ValueError as Error:
+                Rejected += 1
+                if RejectFile:
+                    RejectFile.write(json.dumps({'Record': LineNum, 'Error': str(Error)}) + "\n")
+                continue
+
+            if Allocator:
+                PolicyNumber = Allocator.next_number()
+            else:
+                PolicyNumber = NextNumber
+                NextNumber += 1
+
+            PremDetails, Hst, TotCost, MonPayment = price_policy(CustInfo, PayMethod, DownPay, Rates)
+            OS.write_policy_data(Writer, PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails, Rates.Version)
+
+            if FirstPolicyNumber is None:
+                FirstPolicyNumber = PolicyNumber
+            LastPolicyNumber = PolicyNumber
+            Processed += 1
+    finally:
+        Writer.close()
+        if Allocator:
+            Allocator.release()
+        if RejectFile:
+            RejectFile.close()
+
+    # Index the records just saved; only the new ones are read.
+    PQ.open_index(ClaimsFileName)
+
+    # Return a summary of the run.
+    return {
+        'Processed': Processed,
+        'Rejected': Rejected,
+        'FirstPolicyNumber': FirstPolicyNumber,
+        'LastPolicyNumber': LastPolicyNumber,
+        'RateVersion': Rates.Version,
+        'QuoteCache': QC.cache_stats(),
+        'Seconds': time.perf_counter() - StartTime
+    }
+
+def main(Args=None):
+
+    Parser = argparse.ArgumentParser(description="Process One Stop Insurance policies from a CSV or JSONL file.")
+    Parser.add_argument("InFile", help="CSV or JSONL file of policy records")
+    Parser.add_argument("--claims-file", default=PS.CLAIMS_FILE, help="file the policies are saved to")
+    Parser.add_argument("--reject-file", default=None, help="JSONL file for records that fail validation")
+    Parser.add_argument("--start-number", type=int, default=None, help="first policy number to use")
+    Parser.add_argument("--batch-size", type=int, default=500, help="policies written to Claims.dat per batch")
+    Parser.add_argument("--fsync", action="store_true", help="fsync Claims.dat after every batch")
+    Parser.add_argument("--rotate-mb", type=float, default=None, help="seal Claims.dat into the policy log at this size")
+    Parser.add_argument("--rotate-days", type=int, default=None, help="seal Claims.dat into the policy log at this age")
+    Parser.add_argument("--compression", choices=sorted(PL.COMPRESSIONS), default="zlib", help="how sealed segments are compressed")
+    Options = Parser.parse_args(Args)
+
+    RotateBytes = int(Options.rotate_mb * (1 << 20)) if Options.rotate_mb else None
+    Summary = process_policy_file(Options.InFile, Options.claims_file, Options.reject_file, Options.start_number,
+                                  Options.batch_size, Options.fsync, RotateBytes=RotateBytes,
+                                  RotateDays=Options.rotate_days, Compression=Options.compression)
+
+    print(f"Processed: {Summary['Processed']}  Rejected: {Summary['Rejected']}  "
+          f"Policies #{Summary['FirstPolicyNumber']} - #{Summary['LastPolicyNumber']}  "
+          f"Time: {Summary['Seconds']:.2f}s  Quote cache hit rate: {Summary['QuoteCache']['HitRate']:.1%}")
+
+    return 0 if Summary['Rejected'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
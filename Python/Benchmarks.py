@@ -0,0 +1,338 @@
+# Description: Benchmarks for the validation, pricing, receipt and Claims.dat hot paths, with a stored baseline to catch regressions
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import OneStop as OS
+import PolicyStore as PS
+
+
+# Benchmark Values
+
+SCALES = (1000, 100000, 1000000)
+DEFAULT_SCALES = (1000, 100000)
+
+# Large runs cycle through this many distinct policies instead of holding
+# every one in memory.
+POOL_SIZE = 10000
+
+# Runs below this size are repeated and the fastest time kept, to smooth
+# out noise; larger runs are long enough to time once.
+REPEAT_BELOW = 1000000
+DEFAULT_REPEAT = 3
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# A benchmark more than this much slower per operation than the baseline fails.
+DEFAULT_THRESHOLD = 0.25
+
+# Target for "import OneStop" in a fresh interpreter, as reported by
+# python -X importtime (cumulative, in milliseconds).
+IMPORT_TARGET_MS = 50
+
+FIRST_NAMES = ["John", "Mary", "Jean-Luc", "O'Brien", "Anne Marie", "Li", "Fatima", "Connor"]
+LAST_NAMES = ["Smith", "Tremblay", "O'Neil", "MacDonald", "Nguyen", "St. Pierre", "Murphy", "Singh"]
+STREETS = ["Water Street", "Elizabeth Ave", "Topsail Rd", "Kenmount Rd", "Main Street", "Rue Principale"]
+CITIES = ["St. John's", "Mount Pearl", "Halifax", "Moncton", "Toronto", "Corner Brook"]
+PROVINCES = sorted(OS.VALID_PROVINCES)
+
+
+# Synthetic Data
+
+def generate_customer(Random):
+
+    # A customer as collect_customer_info returns it.
+    return {
+        'FName': Random.choice(FIRST_NAMES),
+        'LName': Random.choice(LAST_NAMES),
+        'Address': f"{Random.randint(1, 999)} {Random.choice(STREETS)}",
+        'City': Random.choice(CITIES),
+        'Province': Random.choice(PROVINCES),
+        'PostCode': f"{Random.choice('ABCEGHJKLMNPRSTVXY')}{Random.randint(0, 9)}{Random.choice('ABCEGHJKLMNPRSTVWXYZ')}"
+                    f"{Random.randint(0, 9)}{Random.choice('ABCEGHJKLMNPRSTVWXYZ')}{Random.randint(0, 9)}",
+        'PhoneNum': f"{Random.randint(200, 999)}{Random.randint(0, 9999999):07d}",
+        'NumCars': Random.randint(1, 5),
+        'ExtLiability': Random.choice("YN"),
+        'GlassCoverage': Random.choice("YN"),
+        'LoanerCar': Random.choice("YN"),
+    }
+
+def generate_claims(Random):
+
+    # Up to four claims, as get_claims returns them.
+    return [{'Number': str(Random.randint(1, 99999)),
+             'Date': f"{Random.randint(2015, 2024)}-{Random.randint(1, 12):02d}-{Random.randint(1, 28):02d}",
+             'Amount': round(Random.uniform(100, 20000), 2)}
+            for _ in range(Random.choice((0, 0, 1, 1, 2, 4)))]
+
+def generate_policies(Count, Seed=0):
+
+    # Count policies as (CustInfo, Claims, PayMethod, DownPay), always the
+    # same for the same Seed.
+    Random = random.Random(Seed)
+    Policies = []
+    for _ in range(Count):
+        PayMethod = Random.choice(('Full', 'Monthly', 'Down Pay'))
+        DownPay = round(Random.uniform(0, 1000), 2) if PayMethod == 'Down Pay' else None
+        Policies.append((generate_customer(Random), generate_claims(Random), PayMethod, DownPay))
+    return Policies
+
+def generate_inputs(ValiType, Count, Seed=0):
+
+    # Typed-in strings for one ValiType, about one in five of them invalid.
+    Random = random.Random(Seed)
+    Valid = {
+        'Empty': lambda: Random.choice(STREETS),
+        'Name': lambda: Random.choice(FIRST_NAMES + LAST_NAMES),
+        'PhoneNum': lambda: f"{Random.randint(200, 999)}{Random.randint(0, 9999999):07d}",
+        'PostCode': lambda: Random.choice(("A1B2C3", "a1b 2c3", "K1A0B1")),
+        'Date': lambda: f"{Random.randint(1990, 2024)}-{Random.randint(1, 12):02d}-{Random.randint(1, 28):02d}",
+        'Province': lambda: Random.choice(PROVINCES),
+        'YesNo': lambda: Random.choice("YyNn"),
+        'PosiInteger': lambda: str(Random.randint(1, 9999)),
+        'PosiFloat': lambda: f"{Random.uniform(0, 9999):.2f}",
+        'NumCars': lambda: str(Random.choice((1, PS.MAX_NUM_CARS, Random.randint(1, PS.MAX_NUM_CARS)))),
+    }[ValiType]
+    Invalid = ("", "   ", "12ab", "2023-02-30", "-5", "Q9Z 9Z9", "XX", "maybe", "J0hn")
+
+    # Values just outside the range for types that have one.
+    Invalid += {
+        'NumCars': ("0", str(PS.MAX_NUM_CARS + 1)),
+    }.get(ValiType, ())
+    return [Random.choice(Invalid) if Random.random() < 0.2 else Valid() for _ in range(Count)]
+
+def cycle(Items, Count):
+    return itertools.islice(itertools.cycle(Items), Count)
+
+
+# Benchmark Functions
+
+def best_time(Run, Repeat):
+
+    # Fastest of Repeat runs, in seconds.
+    Best = None
+    for _ in range(Repeat):
+        Start = time.perf_counter()
+        Run()
+        Seconds = time.perf_counter() - Start
+        Best = Seconds if Best is None else min(Best, Seconds)
+    return Best
+
+def bench_validation(Count, Repeat):
+
+    # is_valid_input, one benchmark per ValiType.
+    Results = {}
+    for ValiType in OS.VALIDATORS:
+        Inputs = generate_inputs(ValiType, min(Count, POOL_SIZE))
+
+        def run():
+            for Value in cycle(Inputs, Count):
+                OS.is_valid_input(Value, ValiType)
+
+        Results[f"Validate.{ValiType}"] = best_time(run, Repeat)
+    return Results
+
+def bench_pricing(Policies, Count, Repeat):
+
+    # calculate_insurance_premium through calculate_monthly_payments, as
+    # process_insurance_policy calls them.
+    Rates = OS.RATE_TABLE.current()
+
+    def run():
+        for CustInfo, _, PayMethod, DownPay in cycle(Policies, Count):
+            PremDetails = OS.calculate_insurance_premium(CustInfo['NumCars'], CustInfo['ExtLiability'],
+                                                         CustInfo['GlassCoverage'], CustInfo['LoanerCar'], Rates)
+            Hst, TotCost = OS.calculate_total_cost(PremDetails['TotalPremium'], Rates)
+            OS.calculate_monthly_payments(TotCost, PayMethod, DownPay, Rates)
+
+    return {"Price": best_time(run, Repeat)}
+
+def bench_receipts(Policies, Count, Repeat):
+
+    # generate_and_display_receipt with its output sent to a buffer, which
+    # is emptied every thousand receipts.
+    Priced = []
+    for CustInfo, Claims, PayMethod, DownPay in Policies:
+        PremDetails = OS.calculate_insurance_premium(CustInfo['NumCars'], CustInfo['ExtLiability'],
+                                                     CustInfo['GlassCoverage'], CustInfo['LoanerCar'])
+        Hst, TotCost = OS.calculate_total_cost(PremDetails['TotalPremium'])
+        MonPayment = OS.calculate_monthly_payments(TotCost, PayMethod, DownPay)
+        Priced.append((CustInfo, Claims, PremDetails, Hst, TotCost, PayMethod, DownPay, MonPayment,
+                       PremDetails['TotalPremium']))
+
+    def run():
+        Buffer = io.StringIO()
+        with contextlib.redirect_stdout(Buffer):
+            for Number, Args in enumerate(cycle(Priced, Count)):
+                OS.generate_and_display_receipt(*Args)
+                if Number % 1000 == 999:
+                    Buffer.seek(0)
+                    Buffer.truncate()
+
+    return {"Receipt": best_time(run, Repeat)}
+
+def bench_persistence(Policies, Count, Repeat):
+
+    # Saving policies to a new Claims.dat through PolicyWriter, including
+    # the final flush.
+    PremDetails = {'Premium': 1520.75, 'TotalPremium': 1838.75, 'ExtLiabilityCost': 260.0,
+                   'GlassCoverageCost': 0.0, 'LoanerCarCost': 58.0}
+
+    with tempfile.TemporaryDirectory() as Folder:
+        FileName = os.path.join(Folder, "Claims.dat")
+
+        def run():
+            if os.path.exists(FileName):
+                os.remove(FileName)
+            with PS.PolicyWriter(FileName) as Writer:
+                for PolicyNumber, (CustInfo, Claims, PayMethod, DownPay) in enumerate(cycle(Policies, Count)):
+                    OS.write_policy_data(Writer, PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails)
+
+        return {"Persist": best_time(run, Repeat)}
+
+def bench_import(Repeat, Module="OneStop"):
+
+    # Import time of Module in a fresh interpreter, from python -X importtime.
+    # It is run from an empty folder to show the import does not depend on
+    # the current directory.
+    Folder = os.path.dirname(os.path.abspath(__file__))
+    Environ = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [Folder, os.environ.get('PYTHONPATH')])))
+    Best = None
+    with tempfile.TemporaryDirectory() as WorkDir:
+        for _ in range(Repeat):
+            Run = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {Module}"], cwd=WorkDir,
+                                 env=Environ, capture_output=True, text=True, check=True)
+
+            # The last line is the module itself: "import time: self | cumulative | name" in microseconds.
+            Seconds = int(Run.stderr.strip().splitlines()[-1].split('|')[1]) / 1e6
+            Best = Seconds if Best is None else min(Best, Seconds)
+    return {f"Import.{Module}": Best}
+
+def run_benchmarks(Scales=DEFAULT_SCALES, Repeat=DEFAULT_REPEAT, Progress=None):
+
+    # Returns {"Name@Count": {'Count', 'Seconds', 'NsPerOp'}}. The import
+    # benchmark runs once, as "Import.OneStop@1".
+    Policies = generate_policies(POOL_SIZE)
+    Results = {}
+    for Name, Seconds in bench_import(Repeat).items():
+        Results[f"{Name}@1"] = {'Count': 1, 'Seconds': Seconds, 'NsPerOp': Seconds * 1e9}
+        if Progress:
+            Progress(f"{Name}@1", Results[f"{Name}@1"])
+    for Count in Scales:
+        Repeats = Repeat if Count < REPEAT_BELOW else 1
+        for Bench in (lambda: bench_validation(Count, Repeats),
+                      lambda: bench_pricing(Policies, Count, Repeats),
+                      lambda: bench_receipts(Policies, Count, Repeats),
+                      lambda: bench_persistence(Policies, Count, Repeats)):
+            for Name, Seconds in Bench().items():
+                Key = f"{Name}@{Count}"
+                Results[Key] = {'Count': Count, 'Seconds': Seconds, 'NsPerOp': Seconds / Count * 1e9}
+                if Progress:
+                    Progress(Key, Results[Key])
+    return Results
+
+def environment():
+    return {
+        'Python': platform.python_version(),
+        'Platform': platform.platform(),
+        'Processor': platform.processor() or platform.machine(),
+        'Time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+# Baseline Functions
+
+def load_results(FileName):
+    with open(FileName, 'r') as f:
+        return json.load(f)
+
+def save_results(FileName, Results):
+    with open(FileName, 'w') as f:
+        json.dump({'Environment': environment(), 'Results': Results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def compare(Results, Baseline, Threshold=DEFAULT_THRESHOLD):
+
+    # Compare time per operation with the baseline. Returns a list of
+    # (Name, BaselineNs, CurrentNs, Change) for every benchmark in both,
+    # and the names that got slower by more than Threshold.
+    Rows = []
+    Regressions = []
+    for Name, Result in Results.items():
+        Before = Baseline.get(Name)
+        if Before is None:
+            continue
+        Change = Result['NsPerOp'] / Before['NsPerOp'] - 1
+        Rows.append((Name, Before['NsPerOp'], Result['NsPerOp'], Change))
+        if Change > Threshold:
+            Regressions.append(Name)
+    return Rows, Regressions
+
+def print_comparison(Rows, Regressions, Threshold):
+    print()
+    print(f"  {'Benchmark':<28s} {'Baseline ns':>12s} {'Current ns':>12s} {'Change':>9s}")
+    print(f"  ---------------------------------------------------------------")
+    for Name, Before, After, Change in Rows:
+        Flag = "  SLOWER" if Name in Regressions else ""
+        print(f"  {Name:<28s} {Before:>12,.0f} {After:>12,.0f} {Change:>+9.1%}{Flag}")
+    print()
+    if Regressions:
+        print(f"  {len(Regressions)} benchmark(s) more than {Threshold:.0%} slower than the baseline.")
+    else:
+        print(f"  No benchmark more than {Threshold:.0%} slower than the baseline.")
+    print()
+
+
+# Main Functions
+
+def main(Args=None):
+
+    Parser = argparse.ArgumentParser(description="Benchmark the One Stop Insurance hot paths.")
+    Parser.add_argument("--scale", type=int, action="append", choices=SCALES,
+                        help="policies per benchmark; repeat for several (default: 1000 and 100000)")
+    Parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per small benchmark, fastest kept")
+    Parser.add_argument("--output", default=None, help="save the results to this JSON file")
+    Parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file to compare against")
+    Parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail if any benchmark is this fraction slower than the baseline")
+    Parser.add_argument("--save-baseline", action="store_true", help="save these results as the new baseline")
+    Options = Parser.parse_args(Args)
+
+    def progress(Name, Result):
+        print(f"  {Name:<28s} {Result['Seconds']:>9.3f}s {Result['NsPerOp']:>12,.0f} ns/op", flush=True)
+
+    Results = run_benchmarks(tuple(Options.scale or DEFAULT_SCALES), Options.repeat, progress)
+
+    ImportMs = Results['Import.OneStop@1']['Seconds'] * 1000
+    ImportOk = ImportMs <= IMPORT_TARGET_MS
+    print(f"\n  import OneStop: {ImportMs:.1f} ms (target {IMPORT_TARGET_MS} ms){'' if ImportOk else '  OVER TARGET'}")
+
+    if Options.output:
+        save_results(Options.output, Results)
+    if Options.save_baseline:
+        save_results(Options.baseline, Results)
+        print(f"\n  Baseline saved to {Options.baseline}\n")
+        return 0
+    if not os.path.exists(Options.baseline):
+        print(f"\n  No baseline at {Options.baseline}; run with --save-baseline to create one.\n")
+        return 0
+
+    Rows, Regressions = compare(Results, load_results(Options.baseline)['Results'], Options.threshold)
+    print_comparison(Rows, Regressions, Options.threshold)
+    return 1 if Regressions or not ImportOk else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+# Description: Claim collection keyed by claim number, with O(1) duplicate checks and bulk loading
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import csv
+import json
+
+import Records as R
+
+
+class ClaimCollection:
+
+    # Holds claims as Claim records (used like {'Number', 'Date', 'Amount'}
+    # dicts) in a dict keyed by claim number, so finding a duplicate is a
+    # single lookup instead of a scan. Dicts keep insertion order, so claims
+    # come back in the order entered.
+    # Checking the values is left to the caller (is_valid_input).
+
+    def __init__(self, Claims=()):
+        self.ByNumber = {}
+        self.load(Claims)
+
+    def upsert(self, Number, Date, Amount):
+
+        # Add a claim, or update the amount if the number is already there
+        # (the same rule get_claims has always used). Returns True on update.
+        Claim = self.ByNumber.get(Number)
+        if Claim is not None:
+            Claim['Amount'] = Amount
+            return True
+        self.ByNumber[Number] = R.Claim(Number, Date, Amount)
+        return False
+
+    def load(self, Claims):
+
+        # Bulk add claims given as dicts or (Number, Date, Amount) tuples.
+        for Claim in Claims:
+            if isinstance(Claim, (dict, R.Claim)):
+                self.upsert(str(Claim['Number']), Claim['Date'], float(Claim['Amount']))
+            else:
+                Number, Date, Amount = Claim
+                self.upsert(str(Number), Date, float(Amount))
+
+    def load_file(self, FileName):
+
+        # Bulk add claims from a JSONL file (one claim object per line) or a
+        # CSV file with Number, Date and Amount columns. The file is streamed.
+        with open(FileName, 'r', newline='') as f:
+            if FileName.lower().endswith(('.jsonl', '.json')):
+                self.load(json.loads(Line) for Line in f if Line.strip())
+            else:
+                self.load(csv.DictReader(f))
+
+    def get(self, Number):
+        return self.ByNumber.get(Number)
+
+    def to_list(self):
+
+        # The claims in the order entered, as Claim records.
+        return list(self.ByNumber.values())
+
+    def __contains__(self, Number):
+        return Number in self.ByNumber
+
+    def __iter__(self):
+        return iter(self.ByNumber.values())
+
+    def __len__(self):
+        return len(self.ByNumber)
@@ -0,0 +1,294 @@
+# Description: Claims analytics over Claims.dat: loss ratios, monthly claim counts and rolling 12-month totals, updated incrementally
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import os
+import sys
+from array import array
+
+import numpy as np
+
+import PolicyLog as PL
+import PolicyStore as PS
+
+
+# Analytics Values
+
+# Day ordinal (as stored in Claims.dat) of 1970-01-01, where datetime64 counts from.
+EPOCH_ORDINAL = 719163
+
+ROLLING_MONTHS = 12
+
+# Positions of the values used here in PolicyStore.decode_raw's output.
+POLICY_NUMBER = PS.FIXED_FIELDS.index('PolicyNumber')
+TOTAL_PREMIUM = PS.FIXED_FIELDS.index('TotalPremium')
+PROVINCE = PS.STRING_FIELDS.index('Province')
+
+STATE_SUFFIX = ".analytics.npz"
+
+
+class ClaimsAnalytics:
+
+    # Policy and claim columns gathered from a store file, and the sealed
+    # segments of its log, in one streaming pass. update() reads only the
+    # records added since the last call, so the figures can be kept current
+    # as policies are saved; save() and load() keep the columns between
+    # runs in "<store>.analytics.npz".
+    #
+    # When a policy number is saved more than once, the latest record is the
+    # one counted; earlier ones are marked inactive. Records numbered 0 were
+    # migrated from the text format without numbers and are all counted.
+
+    def __init__(self, FileName):
+        self.FileName = FileName
+        self.StateFileName = FileName + STATE_SUFFIX
+        self.reset()
+
+    def reset(self):
+        self.Reader = PL.LogReader(self.FileName)
+        self.Provinces = []
+        self.ProvinceCodes = {}
+        self.RowByNumber = {}
+
+        # One entry per record.
+        self.PolicyNumbers = array('q')
+        self.ProvinceCode = array('H')
+        self.TotalPremium = array('d')
+        self.Active = bytearray()
+
+        # One entry per claim, pointing back to its record's row.
+        self.ClaimRow = array('q')
+        self.ClaimDay = array('q')
+        self.ClaimAmount = array('d')
+
+    # Loading
+
+    def update(self):
+
+        # Add any records appended to the log. Returns how many were read.
+        if not self.Reader.matches():
+            self.reset()
+
+        Count = 0
+        for _, Version, _, _, _, Payload in self.Reader.read():
+            Fixed, Strings, Claims = PS.decode_raw(Payload, Version)
+            self.add_policy(Fixed[POLICY_NUMBER], Strings[PROVINCE], Fixed[TOTAL_PREMIUM], Claims)
+            Count += 1
+        return Count
+
+    def add_policy(self, PolicyNumber, Province, TotalPremium, Claims):
+
+        # Claims are (Number, DayOrdinal, Amount), as PolicyStore.decode_raw
+        # returns them.
+        Row = len(self.PolicyNumbers)
+        if PolicyNumber:
+            Previous = self.RowByNumber.get(PolicyNumber)
+            if Previous is not None:
+                self.Active[Previous] = 0
+            self.RowByNumber[PolicyNumber] = Row
+
+        Code = self.ProvinceCodes.get(Province)
+        if Code is None:
+            Code = self.ProvinceCodes[Province] = len(self.Provinces)
+            self.Provinces.append(Province)
+
+        self.PolicyNumbers.append(PolicyNumber)
+        self.ProvinceCode.append(Code)
+        self.TotalPremium.append(TotalPremium)
+        self.Active.append(1)
+
+        for _, ClaimDate, Amount in Claims:
+            self.ClaimRow.append(Row)
+            self.ClaimDay.append(ClaimDate - EPOCH_ORDINAL)
+            self.ClaimAmount.append(Amount)
+
+    def save(self, FileName=None):
+        Generation, Segment, End, LastFrame = self.Reader.position()
+        np.savez(FileName or self.StateFileName,
+                 Position=np.array((Generation, Segment, End) + (LastFrame or (0, 0, 0)), dtype=np.int64),
+                 Provinces=np.array(self.Provinces, dtype=str),
+                 PolicyNumbers=np.frombuffer(self.PolicyNumbers, np.int64),
+                 ProvinceCode=np.frombuffer(self.ProvinceCode, np.uint16),
+                 TotalPremium=np.frombuffer(self.TotalPremium, np.float64),
+                 Active=np.frombuffer(bytes(self.Active), np.uint8),
+                 ClaimRow=np.frombuffer(self.ClaimRow, np.int64),
+                 ClaimDay=np.frombuffer(self.ClaimDay, np.int64),
+                 ClaimAmount=np.frombuffer(self.ClaimAmount, np.float64))
+
+    def load(self, FileName=None):
+
+        # Load saved columns; returns False (leaving the analytics empty) if
+        # there are none or they no longer match the store.
+        self.reset()
+        FileName = FileName or self.StateFileName
+        if not os.path.exists(FileName):
+            return False
+        with np.load(FileName) as State:
+            if 'Position' not in State.files:
+                return False
+            Generation, Segment, End, *LastFrame = (int(Value) for Value in State['Position'])
+            Reader = PL.LogReader(self.FileName, (Generation, Segment, End, tuple(LastFrame) if LastFrame[1] else None))
+            if not Reader.matches():
+                return False
+            self.Reader = Reader
+            self.Provinces = [str(Province) for Province in State['Provinces']]
+            self.ProvinceCodes = {Province: Code for Code, Province in enumerate(self.Provinces)}
+            self.PolicyNumbers = array('q', State['PolicyNumbers'].tobytes())
+            self.ProvinceCode = array('H', State['ProvinceCode'].tobytes())
+            self.TotalPremium = array('d', State['TotalPremium'].tobytes())
+            self.Active = bytearray(State['Active'].tobytes())
+            self.ClaimRow = array('q', State['ClaimRow'].tobytes())
+            self.ClaimDay = array('q', State['ClaimDay'].tobytes())
+            self.ClaimAmount = array('d', State['ClaimAmount'].tobytes())
+        self.RowByNumber = {}
+        for Row, PolicyNumber in enumerate(self.PolicyNumbers):
+            if self.Active[Row] and PolicyNumber:
+                self.RowByNumber[PolicyNumber] = Row
+        return True
+
+    # Column Views
+
+    def policy_columns(self):
+
+        # Active policies as NumPy arrays: row numbers, policy numbers,
+        # province codes and total premiums.
+        Active = np.frombuffer(bytes(self.Active), np.uint8).astype(bool)
+        Rows = np.flatnonzero(Active)
+        return (Rows, np.frombuffer(self.PolicyNumbers, np.int64)[Rows],
+                np.frombuffer(self.ProvinceCode, np.uint16)[Rows], np.frombuffer(self.TotalPremium, np.float64)[Rows])
+
+    def claim_columns(self):
+
+        # Claims on active policies: row numbers, months (datetime64[M]) and amounts.
+        Rows = np.frombuffer(self.ClaimRow, np.int64)
+        Keep = np.frombuffer(bytes(self.Active), np.uint8).astype(bool)[Rows]
+        Days = np.frombuffer(self.ClaimDay, np.int64)[Keep].astype('datetime64[D]')
+        return Rows[Keep], Days.astype('datetime64[M]'), np.frombuffer(self.ClaimAmount, np.float64)[Keep]
+
+    # Reports
+
+    def loss_ratios(self):
+
+        # Claims paid over TotalPremium for the portfolio, each province and
+        # each policy. Returns a dict; per-policy values are NumPy arrays.
+        Rows, PolicyNumbers, Codes, Premiums = self.policy_columns()
+        ClaimRows, _, Amounts = self.claim_columns()
+
+        ClaimsByRow = np.bincount(ClaimRows, weights=Amounts, minlength=len(self.PolicyNumbers))[Rows]
+        Provinces = len(self.Provinces)
+        PremiumByProvince = np.bincount(Codes, weights=Premiums, minlength=Provinces)
+        ClaimsByProvince = np.bincount(Codes, weights=ClaimsByRow, minlength=Provinces)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'Premium': float(Premiums.sum()),
+                'Claims': float(ClaimsByRow.sum()),
+                'LossRatio': float(ClaimsByRow.sum() / Premiums.sum()) if Premiums.sum() else 0.0,
+                'ByProvince': {Province: {'Premium': float(PremiumByProvince[Code]),
+                                          'Claims': float(ClaimsByProvince[Code]),
+                                          'LossRatio': float(ClaimsByProvince[Code] / PremiumByProvince[Code])
+                                          if PremiumByProvince[Code] else 0.0}
+                               for Code, Province in enumerate(self.Provinces) if PremiumByProvince[Code]},
+                'PolicyNumbers': PolicyNumbers,
+                'PolicyLossRatios': np.where(Premiums > 0, ClaimsByRow / Premiums, 0.0),
+            }
+
+    def monthly(self):
+
+        # Claim counts and totals per month, for the portfolio and for each
+        # province, from the first claim month to the last. Returns
+        # (Months, Counts, Totals, CountsByProvince, TotalsByProvince); the
+        # by-province arrays have one row per entry in self.Provinces.
+        ClaimRows, Months, Amounts = self.claim_columns()
+        Provinces = len(self.Provinces)
+        if not len(Months):
+            Empty = np.zeros((Provinces, 0))
+            return np.array([], 'datetime64[M]'), np.zeros(0, np.int64), np.zeros(0), Empty, Empty
+
+        First = Months.min()
+        MonthIndex = (Months - First).astype(np.int64)
+        MonthCount = int(MonthIndex.max()) + 1
+        Codes = np.frombuffer(self.ProvinceCode, np.uint16)[ClaimRows].astype(np.int64)
+
+        # One bincount over (province, month) cells fills the whole table.
+        Cells = Codes * MonthCount + MonthIndex
+        CountsByProvince = np.bincount(Cells, minlength=Provinces * MonthCount).reshape(Provinces, MonthCount)
+        TotalsByProvince = np.bincount(Cells, weights=Amounts, minlength=Provinces * MonthCount).reshape(Provinces, MonthCount)
+
+        Range = First + np.arange(MonthCount)
+        return Range, CountsByProvince.sum(axis=0), TotalsByProvince.sum(axis=0), CountsByProvince, TotalsByProvince
+
+    def rolling_totals(self, Window=ROLLING_MONTHS):
+
+        # Claim totals over the Window months ending with each month, for
+        # the portfolio and each province. Returns (Months, Totals, TotalsByProvince).
+        Months, _, Totals, _, TotalsByProvince = self.monthly()
+        return Months, rolling_sum(Totals, Window), rolling_sum(TotalsByProvince, Window)
+
+    def policy_rolling_totals(self, AsOf=None, Window=ROLLING_MONTHS):
+
+        # Each active policy's claim total over the Window months ending with
+        # AsOf (a 'YYYY-MM' string or datetime64; default the latest claim
+        # month). Returns (PolicyNumbers, Totals).
+        Rows, PolicyNumbers, _, _ = self.policy_columns()
+        ClaimRows, Months, Amounts = self.claim_columns()
+        if not len(Months):
+            return PolicyNumbers, np.zeros(len(Rows))
+
+        AsOf = Months.max() if AsOf is None else np.datetime64(AsOf, 'M')
+        InWindow = (Months <= AsOf) & (Months > AsOf - Window)
+        Totals = np.bincount(ClaimRows[InWindow], weights=Amounts[InWindow], minlength=len(self.PolicyNumbers))
+        return PolicyNumbers, Totals[Rows]
+
+def rolling_sum(Values, Window):
+
+    # Sum of the last Window values at each position along the last axis,
+    # from one cumulative sum rather than a loop.
+    Cumulative = np.cumsum(Values, axis=-1)
+    Result = Cumulative.copy()
+    Result[..., Window:] -= Cumulative[..., :-Window]
+    return Result
+
+def open_analytics(FileName):
+
+    # Load saved analytics for a store if there are any, bring them up to
+    # date and save them again.
+    Analytics = ClaimsAnalytics(FileName)
+    Analytics.load()
+    if Analytics.update():
+        Analytics.save()
+    return Analytics
+
+
+# Main Functions
+
+def print_report(Analytics, Months=ROLLING_MONTHS):
+
+    Ratios = Analytics.loss_ratios()
+    print()
+    print(f"  Portfolio loss ratio: {Ratios['LossRatio']:.2%}   "
+          f"(claims {Ratios['Claims']:,.2f} / premium {Ratios['Premium']:,.2f})")
+    print()
+    print(f"  Province        Premium          Claims   Loss Ratio")
+    print(f"  ----------------------------------------------------")
+    for Province, Values in sorted(Ratios['ByProvince'].items()):
+        print(f"  {Province:<8s} {Values['Premium']:>14,.2f} {Values['Claims']:>15,.2f} {Values['LossRatio']:>12.2%}")
+
+    Range, Counts, Totals, _, _ = Analytics.monthly()
+    _, Rolling, _ = Analytics.rolling_totals()
+    print()
+    print(f"  Month      Claims          Amount   Rolling {ROLLING_MONTHS}-Month")
+    print(f"  ----------------------------------------------------")
+    for Month, Count, Total, RollingTotal in list(zip(Range, Counts, Totals, Rolling))[-Months:]:
+        print(f"  {str(Month):<8s} {Count:>8,d} {Total:>15,.2f} {RollingTotal:>18,.2f}")
+    print()
+
+def main(Args=None):
+    Args = sys.argv[1:] if Args is None else Args
+    FileName = Args[0] if Args else PS.CLAIMS_FILE
+    print_report(open_analytics(FileName))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
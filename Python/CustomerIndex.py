@@ -0,0 +1,282 @@
+# Description: Customer index over Claims.dat for spotting customers who already hold a policy, and a bulk duplicate-customer report
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import argparse
+import re
+import sys
+import threading
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+import PolicyLog as PL
+import PolicyStore as PS
+
+
+# Index Values
+
+# Names at least this similar (difflib ratio of the normalized full names)
+# count as the same customer when they share a blocking key.
+SIMILARITY = 0.85
+
+# Blocks larger than this are too coarse to say much and are left out of
+# fuzzy matching, so one very common name in an area cannot slow lookups
+# down or make the bulk pass quadratic. Exact matches still apply.
+MAX_BLOCK_SIZE = 200
+
+# Match reasons, strongest first.
+REASONS = ('Phone number', 'Name and postal code', 'Similar name')
+
+NON_LETTERS = re.compile(r"[\W\d_]+")
+NON_DIGITS = re.compile(r"\D+")
+
+SOUNDEX_CODES = {Char: Code for Letters, Code in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"),
+                                                  ("mn", "5"), ("r", "6")) for Char in Letters}
+
+
+# Key Functions
+# The fields are compared the way collect_customer_info formats them, with
+# case, spaces and punctuation taken out of names and anything but digits
+# out of phone numbers. Last names repeat a lot, so their Soundex codes are
+# cached.
+
+def normalize_name(Name):
+    return NON_LETTERS.sub("", Name.lower())
+
+@lru_cache(maxsize=65536)
+def soundex(Name):
+
+    # American Soundex: the first letter and up to three digits for the
+    # consonant sounds that follow, so "Moss" and "Mosse" both give M200.
+    Name = normalize_name(Name)
+    if not Name:
+        return ""
+    Code = Name[0].upper()
+    Last = SOUNDEX_CODES.get(Name[0], "")
+    for Char in Name[1:]:
+        Digit = SOUNDEX_CODES.get(Char, "")
+        if Digit and Digit != Last:
+            Code += Digit
+        if Char not in "hw":
+            Last = Digit
+    return (Code + "000")[:4]
+
+def customer_keys(CustInfo):
+
+    # (phone key, name and postal code key, blocking key, full name). The
+    # blocking key is coarse on purpose: the first half of the postal code
+    # (the area), the Soundex of the last name and the first initial, so
+    # spelling slips in a name still land in the same block.
+    FName = normalize_name(CustInfo['FName'])
+    LName = normalize_name(CustInfo['LName'])
+    PostCode = CustInfo['PostCode'].upper().replace(" ", "")
+    Phone = NON_DIGITS.sub("", CustInfo['PhoneNum'])
+    FullName = f"{FName} {LName}"
+    return (Phone or None, f"{FullName}|{PostCode}", f"{PostCode[:3]}|{soundex(LName)}|{FName[:1]}", FullName)
+
+
+# Index
+
+class CustomerIndex:
+
+    # Hash maps from the phone key and the name and postal code key to the
+    # policies holding them, and blocks of similar-sounding names for fuzzy
+    # matches. A lookup is a couple of dict lookups plus a name comparison
+    # with each member of one block.
+    #
+    # update() reads only the records added to the log since the last
+    # call, sealed segments included. When a policy number is saved more than once the latest record
+    # is the one indexed. Migrated records have no policy number (0), so
+    # each is kept under minus its log position instead, the same key
+    # ReceiptCache uses, and reported as policy 0. A large store takes seconds to index, so the
+    # interactive program builds it on a background thread and find() waits
+    # for that to finish.
+
+    def __init__(self, FileName=None):
+        self.FileName = FileName
+        self.Updater = None
+        self.reset()
+
+    def reset(self):
+        self.Reader = PL.LogReader(self.FileName) if self.FileName else None
+        self.ByPhone = {}
+        self.ByName = {}
+        self.Blocks = {}            # blocking key -> [(entry key, full name), ...]
+        self.Customers = {}         # entry key -> its customer keys
+
+    def __len__(self):
+        return len(self.Customers)
+
+    def add(self, PolicyNumber, CustInfo, Position):
+
+        # Position is where the record sits in the log. Only a numbered
+        # policy replaces what was indexed for it before.
+        if PolicyNumber:
+            self.remove(PolicyNumber)
+        EntryKey = PolicyNumber or -Position
+        Keys = customer_keys(CustInfo)
+        Phone, Name, Block, FullName = Keys
+        if Phone:
+            self.ByPhone.setdefault(Phone, []).append(EntryKey)
+        self.ByName.setdefault(Name, []).append(EntryKey)
+        self.Blocks.setdefault(Block, []).append((EntryKey, FullName))
+        self.Customers[EntryKey] = Keys
+
+    def remove(self, EntryKey):
+        Keys = self.Customers.pop(EntryKey, None)
+        if Keys is None:
+            return
+        Phone, Name, Block, FullName = Keys
+        for Map, Key, Entry in ((self.ByPhone, Phone, EntryKey), (self.ByName, Name, EntryKey),
+                                (self.Blocks, Block, (EntryKey, FullName))):
+            Entries = Map.get(Key)
+            if Entries is None:
+                continue
+            Entries.remove(Entry)
+            if not Entries:
+                del Map[Key]
+
+    def update(self):
+
+        # Add any records appended to the log. Returns how many were read.
+        if not self.Reader.matches():
+            self.reset()
+
+        Count = 0
+        for Segment, Version, Offset, _, _, Payload in self.Reader.read():
+            Fixed, Strings, _ = PS.decode_raw(Payload, Version)
+            self.add(Fixed[0], dict(zip(PS.STRING_FIELDS, Strings)), PL.log_position(Segment, Offset))
+            Count += 1
+        return Count
+
+    def update_in_background(self):
+        self.Updater = threading.Thread(target=self.update, daemon=True)
+        self.Updater.start()
+
+    def wait(self):
+        if self.Updater is not None:
+            self.Updater.join()
+            self.Updater = None
+
+    # Lookups
+
+    def find(self, CustInfo, Fuzzy=True, Similarity=SIMILARITY):
+
+        # Policies that may belong to this customer, as (PolicyNumber,
+        # Reason) with the strongest reason for each. The strongest matches
+        # come first, then policy number order, with any migrated records
+        # (policy 0) in log order.
+        self.wait()
+        Phone, Name, Block, FullName = customer_keys(CustInfo)
+        Found = {}
+        for EntryKey in self.ByPhone.get(Phone, ()) if Phone else ():
+            Found.setdefault(EntryKey, REASONS[0])
+        for EntryKey in self.ByName.get(Name, ()):
+            Found.setdefault(EntryKey, REASONS[1])
+        if Fuzzy:
+            Members = self.Blocks.get(Block, ())
+            Matcher = SequenceMatcher(None, "", FullName)
+            for EntryKey, OtherName in Members if len(Members) <= MAX_BLOCK_SIZE else ():
+                if EntryKey not in Found and similar(OtherName, FullName, Similarity, Matcher):
+                    Found[EntryKey] = REASONS[2]
+        Matches = sorted(Found.items(), key=lambda Match: (REASONS.index(Match[1]), entry_order(Match[0])))
+        return [(policy_number(EntryKey), Reason) for EntryKey, Reason in Matches]
+
+    def duplicates(self, Fuzzy=True, Similarity=SIMILARITY):
+
+        # Group the policies that look like the same customer in one pass
+        # over the keys: every policy sharing a phone or name key is joined,
+        # and within each block (up to MAX_BLOCK_SIZE) names are compared in
+        # pairs. Returns [(PolicyNumbers, Reasons)] for groups of two or more.
+        self.wait()
+        Parent = {}
+
+        def root(EntryKey):
+            Root = Parent.setdefault(EntryKey, EntryKey)
+            while Parent[Root] != Root:
+                Root = Parent[Root]
+            while EntryKey != Root:
+                Next = Parent[EntryKey]
+                Parent[EntryKey] = Root
+                EntryKey = Next
+            return Root
+
+        Reasons = {}
+
+        def join(First, Second, Reason):
+            FirstRoot, SecondRoot = root(First), root(Second)
+            if FirstRoot != SecondRoot:
+                Parent[SecondRoot] = FirstRoot
+                Reasons.setdefault(FirstRoot, set()).update(Reasons.pop(SecondRoot, ()))
+            Reasons.setdefault(FirstRoot, set()).add(Reason)
+
+        for Map, Reason in ((self.ByPhone, REASONS[0]), (self.ByName, REASONS[1])):
+            for EntryKeys in Map.values():
+                for EntryKey in EntryKeys[1:]:
+                    join(EntryKeys[0], EntryKey, Reason)
+
+        if Fuzzy:
+            for Members in self.Blocks.values():
+                if len(Members) < 2 or len(Members) > MAX_BLOCK_SIZE:
+                    continue
+                for Position, (First, FirstName) in enumerate(Members):
+                    for Second, SecondName in Members[Position + 1:]:
+                        if root(First) != root(Second) and similar(FirstName, SecondName, Similarity):
+                            join(First, Second, REASONS[2])
+
+        Groups = {}
+        for EntryKey in Parent:
+            Groups.setdefault(root(EntryKey), []).append(EntryKey)
+        return sorted(([policy_number(EntryKey) for EntryKey in sorted(Members, key=entry_order)],
+                       sorted(Reasons[Root], key=REASONS.index))
+                      for Root, Members in Groups.items() if len(Members) > 1)
+
+def policy_number(EntryKey):
+    return max(EntryKey, 0)
+
+def entry_order(EntryKey):
+
+    # Migrated records (policy 0) first, in log order, then policy numbers.
+    return (EntryKey > 0, abs(EntryKey))
+
+def similar(FirstName, SecondName, Similarity=SIMILARITY, Matcher=None):
+
+    # The cheap upper bounds rule most pairs out before the full ratio. A
+    # Matcher already holding SecondName (set_seq2) can be passed in when
+    # one name is compared with many.
+    if FirstName == SecondName:
+        return True
+    if Matcher is None:
+        Matcher = SequenceMatcher(None, FirstName, SecondName)
+    else:
+        Matcher.set_seq1(FirstName)
+    return (Matcher.real_quick_ratio() >= Similarity and Matcher.quick_ratio() >= Similarity
+            and Matcher.ratio() >= Similarity)
+
+def open_customer_index(FileName):
+
+    # Build the index for a store file.
+    Index = CustomerIndex(FileName)
+    Index.update()
+    return Index
+
+
+# Main Functions
+
+def main(Args=None):
+
+    Parser = argparse.ArgumentParser(description="Report customers who appear to hold more than one policy in Claims.dat.")
+    Parser.add_argument("ClaimsFile", nargs="?", default=PS.CLAIMS_FILE, help="policy store file")
+    Parser.add_argument("--exact", action="store_true", help="only match on phone number or name and postal code")
+    Options = Parser.parse_args(Args)
+
+    Index = open_customer_index(Options.ClaimsFile)
+    Groups = Index.duplicates(Fuzzy=not Options.exact)
+    for PolicyNumbers, Reasons in Groups:
+        print(f"  Policies {', '.join(f'#{PolicyNumber}' for PolicyNumber in PolicyNumbers)}: {', '.join(Reasons)}")
+    print(f"\n  Policies: {len(Index):,}   Possible duplicate customers: {len(Groups):,}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
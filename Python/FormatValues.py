@@ -1,78 +1,149 @@
-def FDollar2(DollarValue):
-    # Function will accept a value and format it to $#,###.##.
-
-    DollarValueStr = "${:,.2f}".format(DollarValue)
-
-    return DollarValueStr
-
-
-def FDollar0(DollarValue):
-    # Function will accept a value and format it to $#,###.##.
-
-    DollarValueStr = "${:,.0f}".format(DollarValue)
-
-    return DollarValueStr
-
-
-def FComma2(Value):
-    # Function will accept a value and format it to $#,###.##.
-
-    ValueStr = "{:,.2f}".format(Value)
-
-    return ValueStr
-
-
-def FComma0(Value):
-    # Function will accept a value and format it to $#,###.##.
-
-    ValueStr = "{:,.0f}".format(Value)
-
-    return ValueStr
-
-
-def FNumber0(Value):
-    # Function will accept a value and format it to $#,###.##.
-
-    ValueStr = "{:.0f}".format(Value)
-
-    return ValueStr
-
-
-def FNumber1(Value):
-    # Function will accept a value and format it to $#,###.##.
-
-    ValueStr = "{:.1f}".format(Value)
-
-    return ValueStr
-
-
-def FNumber2(Value):
-    # Function will accept a value and format it to $#,###.##.
-
-    ValueStr = "{:.2f}".format(Value)
-
-    return ValueStr
-
-
-def FDateS(DateValue):
-    # Function will accept a value and format it to yyyy-mm-dd.
-
-    DateValueStr = DateValue.strftime("%Y-%m-%d")
-
-    return DateValueStr
-
-
-def FDateM(DateValue):
-    # Function will accept a value and format it to dd-Mon-yy.
-
-    DateValueStr = DateValue.strftime("%d-%b-%y")
-
-    return DateValueStr
-
-
-def FDateL(DateValue):
-    # Function will accept a value and format it to Day, Month dd, yyyy.
-
-    DateValueStr = DateValue.strftime("%A, %B %d, %Y")
-
-    return DateValueStr
+from datetime import date
+from functools import lru_cache, wraps
+
+
+# Formatted values are cached, since the same handful of amounts and dates
+# come up over and over. CACHE_SIZE bounds each cache.
+CACHE_SIZE = 4096
+
+
+def cached_number(Formatter):
+    # Function will wrap a number format function with a bounded cache.
+    # Numbers are cached by type as well as value, so 1 and 1.0 are kept
+    # apart. Zero skips the cache since 0.0 and -0.0 print differently.
+
+    Cached = lru_cache(maxsize=CACHE_SIZE, typed=True)(Formatter)
+
+    @wraps(Formatter)
+    def Format(Value):
+        if Value == 0:
+            return Formatter(Value)
+        return Cached(Value)
+
+    Format.cache_info = Cached.cache_info
+    Format.cache_clear = Cached.cache_clear
+
+    return Format
+
+
+@cached_number
+def FDollar2(DollarValue):
+    # Function will accept a value and format it to $#,###.##.
+
+    DollarValueStr = "${:,.2f}".format(DollarValue)
+
+    return DollarValueStr
+
+
+@cached_number
+def FDollar0(DollarValue):
+    # Function will accept a value and format it to $#,###.##.
+
+    DollarValueStr = "${:,.0f}".format(DollarValue)
+
+    return DollarValueStr
+
+
+@cached_number
+def FComma2(Value):
+    # Function will accept a value and format it to $#,###.##.
+
+    ValueStr = "{:,.2f}".format(Value)
+
+    return ValueStr
+
+
+@cached_number
+def FComma0(Value):
+    # Function will accept a value and format it to $#,###.##.
+
+    ValueStr = "{:,.0f}".format(Value)
+
+    return ValueStr
+
+
+@cached_number
+def FNumber0(Value):
+    # Function will accept a value and format it to $#,###.##.
+
+    ValueStr = "{:.0f}".format(Value)
+
+    return ValueStr
+
+
+@cached_number
+def FNumber1(Value):
+    # Function will accept a value and format it to $#,###.##.
+
+    ValueStr = "{:.1f}".format(Value)
+
+    return ValueStr
+
+
+@cached_number
+def FNumber2(Value):
+    # Function will accept a value and format it to $#,###.##.
+
+    ValueStr = "{:.2f}".format(Value)
+
+    return ValueStr
+
+
+def FDateS(DateValue):
+    # Function will accept a value and format it to yyyy-mm-dd.
+
+    DateValueStr = date_text(DateValue.year, DateValue.month, DateValue.day, "%Y-%m-%d")
+
+    return DateValueStr
+
+
+def FDateM(DateValue):
+    # Function will accept a value and format it to dd-Mon-yy.
+
+    DateValueStr = date_text(DateValue.year, DateValue.month, DateValue.day, "%d-%b-%y")
+
+    return DateValueStr
+
+
+def FDateL(DateValue):
+    # Function will accept a value and format it to Day, Month dd, yyyy.
+
+    DateValueStr = date_text(DateValue.year, DateValue.month, DateValue.day, "%A, %B %d, %Y")
+
+    return DateValueStr
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def date_text(Year, Month, Day, DateFormat):
+    # Function will format a year, month and day with a strftime format.
+    # The date formats only use the day, so dates and datetimes share entries.
+
+    return date(Year, Month, Day).strftime(DateFormat)
+
+
+def FList(Formatter, Values):
+    # Function will format a whole list or array of values with one of the
+    # functions above. NumPy arrays are turned into plain Python values first.
+
+    if hasattr(Values, "tolist"):
+        Values = Values.tolist()
+
+    return list(map(Formatter, Values))
+
+
+def FDollar2List(DollarValues):
+    # Function will format a list of values to $#,###.##.
+
+    return FList(FDollar2, DollarValues)
+
+
+def FComma2List(Values):
+    # Function will format a list of values to #,###.##.
+
+    return FList(FComma2, Values)
+
+
+def FDateSList(DateValues):
+    # Function will format a list of dates to yyyy-mm-dd.
+
+    return FList(FDateS, DateValues)
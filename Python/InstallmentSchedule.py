@@ -0,0 +1,178 @@
+# Description: Vectorized installment schedules (due dates and amounts) for the monthly payment plan, and a billing export from Claims.dat
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import argparse
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+import PolicyLog as PL
+import PolicyStore as PS
+import VectorPricing as VP
+
+
+# Schedule Values
+
+PAY_METHODS = np.array([PS.PAY_METHODS[Code] for Code in range(len(PS.PAY_METHODS))])
+
+# Billing export rows are formatted this many at a time.
+EXPORT_CHUNK = 100000
+
+EXPORT_HEADER = "PolicyNumber,Installment,DueDate,Amount\n"
+
+
+# Schedule Functions
+
+def as_date_array(Dates, Size):
+
+    # Invoice dates as datetime64[D]; None means today for every policy.
+    if Dates is None:
+        Dates = np.datetime64('today', 'D')
+    return np.broadcast_to(np.asarray(Dates, dtype='datetime64[D]'), Size)
+
+def due_dates(InvoiceDates, NumPayments):
+
+    # The first day of each of the NumPayments months after the invoice
+    # date, one row per policy. The first is the receipt's first payment date.
+    Months = np.asarray(InvoiceDates, dtype='datetime64[D]').astype('datetime64[M]')
+    return (Months[..., None] + np.arange(1, NumPayments + 1)).astype('datetime64[D]')
+
+def installment_schedules(TotCost, PayMethods, DownPays=None, InvoiceDates=None, Rates=None):
+
+    # Due dates and amounts for every installment of every policy at once.
+    # The amount left after the down payment is split into equal installments
+    # rounded down to the cent, and the last installment takes the cents
+    # left over, so the installments add up to the amount owed to the cent
+    # and none is ever below the others. The processing fee is added to each. Returns a dict of
+    # (policies x NUM_PAYMENTS) arrays: 'DueDates' (datetime64[D]), 'Cents'
+    # (int64) and 'Amounts' (dollars). 'Full' policies get NaT and 0.
+    Rates = VP.rates_dict(Rates)
+    NumPayments = Rates['NUM_PAYMENTS']
+    TotCost = np.asarray(TotCost, dtype=float)
+    Monthly = np.asarray(PayMethods) != 'Full'
+    DownPays = VP.as_down_pay_array(DownPays, TotCost.shape)
+
+    Owed = np.rint((TotCost - DownPays) * 100).astype(np.int64)
+    Each = Owed // NumPayments
+    Cents = np.repeat(Each[..., None], NumPayments, axis=-1)
+    Cents[..., -1] = Owed - Each * (NumPayments - 1)
+    Cents += int(round(Rates['MONTHLY_PAYMENT_PROCESSING_FEE'] * 100))
+    Cents[~Monthly] = 0
+
+    DueDates = due_dates(as_date_array(InvoiceDates, TotCost.shape), NumPayments)
+    DueDates[~Monthly] = np.datetime64('NaT')
+
+    return {'DueDates': DueDates, 'Cents': Cents, 'Amounts': Cents / 100}
+
+def installment_schedule(TotCost, PayMethod, DownPay=None, InvoiceDate=None, Rates=None):
+
+    # The schedule for one policy as a list of (due date, amount), empty
+    # for payment in full.
+    if PayMethod == 'Full':
+        return []
+    Schedule = installment_schedules([TotCost], [PayMethod], [DownPay], InvoiceDate, Rates)
+    return [(date.fromisoformat(str(DueDate)), Amount)
+            for DueDate, Amount in zip(Schedule['DueDates'][0], Schedule['Amounts'][0].tolist())]
+
+
+# Export Functions
+
+def read_portfolio(ClaimsFileName):
+
+    # The latest record of each policy in the log, as arrays of the fields
+    # pricing needs. Only the fixed block of each record is unpacked. The
+    # fields used come first in the fixed block of every store format.
+    Columns = ('PolicyNumber', 'NumCars', 'Flags', 'PayCode', 'DownPay')
+    Rows = [PS.FIXED_BY_VERSION[Version].unpack_from(Payload, 0)[:len(Columns)]
+            for _, Version, _, _, _, Payload in PL.LogReader(ClaimsFileName).read()]
+    Table = np.array(Rows, dtype=float) if Rows else np.empty((0, len(Columns)))
+    Arrays = {Column: Table[:, PS.FIXED_FIELDS.index(Column)] for Column in Columns}
+    Arrays['PolicyNumber'] = Arrays['PolicyNumber'].astype(np.int64)
+
+    # A policy number saved more than once keeps its last record. Number 0
+    # marks migrated records with no number of their own; all are kept.
+    Numbers = Arrays['PolicyNumber'][::-1]
+    _, Latest = np.unique(Numbers, return_index=True)
+    Keep = len(Numbers) - 1 - Latest
+    Keep = np.sort(np.concatenate([Keep[Numbers[Latest] != 0], np.flatnonzero(Arrays['PolicyNumber'] == 0)]))
+    Arrays = {Column: Values[Keep] for Column, Values in Arrays.items()}
+
+    # The store saves "no down payment" as NaN.
+    Arrays['DownPay'] = np.where(np.isnan(Arrays['DownPay']), 0.0, Arrays['DownPay'])
+
+    Flags = Arrays.pop('Flags').astype(np.uint8)
+    for Bit, Field in enumerate(PS.FLAG_FIELDS):
+        Arrays[Field] = (Flags & (1 << Bit)) != 0
+    Arrays['PayMethod'] = PAY_METHODS[Arrays.pop('PayCode').astype(np.intp)]
+    return Arrays
+
+def billing_rows(PolicyNumbers, Schedule, DownPays, InvoiceDates):
+
+    # Flatten the schedules into (policy number, installment, due date,
+    # cents) columns, with the down payment as installment 0 due on the
+    # invoice date. Policies paid in full and zero down payments are left out.
+    Size = len(PolicyNumbers)
+    DownCents = np.rint(VP.as_down_pay_array(DownPays, (Size,)) * 100).astype(np.int64)
+    Cents = np.column_stack([DownCents, Schedule['Cents']])
+    DueDates = np.column_stack([as_date_array(InvoiceDates, (Size,)), Schedule['DueDates']])
+    Keep = (Cents > 0) & ~np.isnat(DueDates[:, 1:2])
+
+    Installments = np.broadcast_to(np.arange(Cents.shape[1]), Cents.shape)
+    Numbers = np.broadcast_to(np.asarray(PolicyNumbers)[:, None], Cents.shape)
+    return Numbers[Keep], Installments[Keep], DueDates[Keep], Cents[Keep]
+
+def write_billing_export(f, PolicyNumbers, Schedule, DownPays=None, InvoiceDates=None):
+
+    # Write the billing CSV. Due dates repeat across policies, so each
+    # distinct date is formatted once; rows are formatted EXPORT_CHUNK at a
+    # time with one % operation. Returns the number of rows written.
+    Numbers, Installments, DueDates, Cents = billing_rows(PolicyNumbers, Schedule, DownPays, InvoiceDates)
+    Unique, Inverse = np.unique(DueDates, return_inverse=True)
+    DateText = np.array([str(DueDate) for DueDate in Unique], dtype=object)[Inverse.ravel()]
+
+    f.write(EXPORT_HEADER)
+    for Start in range(0, len(Numbers), EXPORT_CHUNK):
+        Stop = Start + EXPORT_CHUNK
+        Values = np.empty((len(Numbers[Start:Stop]), 5), dtype=object)
+        Values[:, 0] = Numbers[Start:Stop]
+        Values[:, 1] = Installments[Start:Stop]
+        Values[:, 2] = DateText[Start:Stop]
+        Values[:, 3], Values[:, 4] = np.divmod(Cents[Start:Stop], 100)
+        f.write(("%d,%d,%s,%d.%02d\n" * len(Values)) % tuple(Values.ravel().tolist()))
+    return len(Numbers)
+
+def export_billing(ClaimsFileName, f, InvoiceDate=None, Rates=None):
+
+    # Price every policy in the store with the current rates, as the
+    # receipts are, and write the billing CSV for the monthly-plan policies.
+    Rates = VP.rates_dict(Rates)
+    Portfolio = read_portfolio(ClaimsFileName)
+    Prices = VP.price_portfolio(Portfolio['NumCars'], Portfolio['ExtLiability'], Portfolio['GlassCoverage'],
+                                Portfolio['LoanerCar'], Portfolio['PayMethod'], Portfolio['DownPay'], Rates)
+    Schedule = installment_schedules(Prices['TotalCost'], Portfolio['PayMethod'], Portfolio['DownPay'], InvoiceDate, Rates)
+    Rows = write_billing_export(f, Portfolio['PolicyNumber'], Schedule, Portfolio['DownPay'], InvoiceDate)
+    return len(Portfolio['PolicyNumber']), Rows
+
+
+# Main Functions
+
+def main(Args=None):
+
+    Parser = argparse.ArgumentParser(description="Export the installment schedule of every monthly-plan policy in Claims.dat.")
+    Parser.add_argument("ClaimsFile", nargs="?", default=PS.CLAIMS_FILE, help="policy store file")
+    Parser.add_argument("--output", default="billing.csv", help="CSV file to write")
+    Parser.add_argument("--invoice-date", default=None, help="invoice date, YYYY-MM-DD (default: today)")
+    Options = Parser.parse_args(Args)
+
+    StartTime = time.perf_counter()
+    with open(Options.output, 'w', newline="") as f:
+        Policies, Rows = export_billing(Options.ClaimsFile, f, Options.invoice_date)
+    print(f"Policies: {Policies:,}  Billing rows: {Rows:,}  Time: {time.perf_counter() - StartTime:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
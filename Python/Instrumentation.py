@@ -0,0 +1,247 @@
+# Description: Per-stage timers, counters and latency histograms for process_insurance_policy, with JSON/Prometheus export and sampled profiling
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import bisect
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+
+# Instrumentation Values
+
+# Stages of process_insurance_policy, in order. Customer, Claims and Payment
+# are mostly time spent at the prompts; Save includes the blinking "Saving
+# claim data" messages.
+STAGES = ('Customer', 'Claims', 'Payment', 'Pricing', 'Receipt', 'Save')
+
+# Histogram bucket upper bounds in seconds. Stages range from microseconds
+# (pricing) to minutes (a customer typing their details).
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+PROFILERS = ('cprofile', 'tracemalloc')
+
+# Environment variables One Stop.py reads to switch instrumentation on.
+ENV_OUTPUT = "ONESTOP_METRICS"              # file to write, .json or anything else for Prometheus text
+ENV_SAMPLE_RATE = "ONESTOP_PROFILE_RATE"    # fraction of policies to profile, 0 to 1
+ENV_PROFILER = "ONESTOP_PROFILER"           # cprofile or tracemalloc
+ENV_PROFILE_DIR = "ONESTOP_PROFILE_DIR"     # folder for profile files
+
+# Handed out while instrumentation is off, so a stage costs one attribute
+# check and an empty with block.
+OFF = nullcontext()
+
+
+# Metric Types
+
+class Histogram:
+
+    # Latency histogram with fixed buckets, plus the count and sum.
+
+    __slots__ = ('Counts', 'Count', 'Sum', 'Max')
+
+    def __init__(self):
+        self.Counts = [0] * (len(BUCKETS) + 1)
+        self.Count = 0
+        self.Sum = 0.0
+        self.Max = 0.0
+
+    def observe(self, Seconds):
+        self.Counts[bisect.bisect_left(BUCKETS, Seconds)] += 1
+        self.Count += 1
+        self.Sum += Seconds
+        if Seconds > self.Max:
+            self.Max = Seconds
+
+    def to_dict(self):
+        Cumulative = 0
+        Buckets = {}
+        for Bound, Count in zip(BUCKETS + ('+Inf',), self.Counts):
+            Cumulative += Count
+            Buckets[str(Bound)] = Cumulative
+        return {'Count': self.Count, 'Sum': self.Sum, 'Max': self.Max, 'Buckets': Buckets}
+
+class StageTimer:
+
+    # Times one run of a stage into the metrics it came from.
+
+    __slots__ = ('Metrics', 'Name', 'Start')
+
+    def __init__(self, Metrics, Name):
+        self.Metrics = Metrics
+        self.Name = Name
+
+    def __enter__(self):
+        self.Start = time.perf_counter()
+        return self
+
+    def __exit__(self, *ExcInfo):
+        self.Metrics.observe(self.Name, time.perf_counter() - self.Start)
+        return False
+
+
+# Metrics
+
+class Metrics:
+
+    # Stage timings and counters for one process. While Enabled is False,
+    # stage(), policy() and count() record nothing and cost next to nothing,
+    # so the calls can stay in process_insurance_policy permanently.
+    #
+    # When SampleRate is above zero, that fraction of policies is run under
+    # cProfile or tracemalloc and the results written to ProfileDir, one
+    # file per sampled policy.
+
+    def __init__(self):
+        self.Enabled = False
+        self.Lock = threading.Lock()
+        self.OutputFileName = None
+        self.SampleRate = 0.0
+        self.Profiler = 'cprofile'
+        self.ProfileDir = "profiles"
+        self.reset()
+
+    def reset(self):
+        with self.Lock:
+            self.Histograms = {Stage: Histogram() for Stage in STAGES}
+            self.Counters = {}
+
+    def configure(self, Enabled=True, OutputFileName=None, SampleRate=0.0, Profiler='cprofile', ProfileDir="profiles"):
+        if Profiler not in PROFILERS:
+            raise ValueError(f"Profiler must be one of {', '.join(PROFILERS)}.")
+        self.OutputFileName = OutputFileName
+        self.SampleRate = max(0.0, min(1.0, SampleRate))
+        self.Profiler = Profiler
+        self.ProfileDir = ProfileDir
+        self.Enabled = Enabled
+
+    def configure_from_environment(self, Environ=os.environ):
+
+        # Switch on only if ONESTOP_METRICS names an output file.
+        OutputFileName = Environ.get(ENV_OUTPUT)
+        if not OutputFileName:
+            return
+        self.configure(True, OutputFileName, float(Environ.get(ENV_SAMPLE_RATE, 0) or 0),
+                       Environ.get(ENV_PROFILER, 'cprofile').lower(), Environ.get(ENV_PROFILE_DIR, "profiles"))
+
+    # Recording
+
+    def stage(self, Name):
+
+        # with METRICS.stage('Pricing'): ...
+        if not self.Enabled:
+            return OFF
+        return StageTimer(self, Name)
+
+    def observe(self, Name, Seconds):
+        with self.Lock:
+            Stage = self.Histograms.get(Name)
+            if Stage is None:
+                Stage = self.Histograms[Name] = Histogram()
+            Stage.observe(Seconds)
+
+    def count(self, Name, Amount=1):
+        if not self.Enabled:
+            return
+        with self.Lock:
+            self.Counters[Name] = self.Counters.get(Name, 0) + Amount
+
+    def policy(self, PolicyNumber):
+
+        # Wrap a whole policy; profiles it if it is picked for sampling.
+        if not self.Enabled or not self.SampleRate:
+            return OFF
+        if random.random() >= self.SampleRate:
+            return OFF
+        return SampledProfile(self, PolicyNumber)
+
+    # Export
+
+    def to_dict(self):
+        with self.Lock:
+            return {
+                'Stages': {Name: Stage.to_dict() for Name, Stage in self.Histograms.items()},
+                'Counters': dict(self.Counters),
+            }
+
+    def to_prometheus(self):
+
+        # Prometheus text exposition format.
+        Data = self.to_dict()
+        Lines = ["# HELP onestop_stage_seconds Time spent in each stage of process_insurance_policy.",
+                 "# TYPE onestop_stage_seconds histogram"]
+        for Name, Stage in Data['Stages'].items():
+            for Bound, Count in Stage['Buckets'].items():
+                Lines.append(f'onestop_stage_seconds_bucket{{stage="{Name}",le="{Bound}"}} {Count}')
+            Lines.append(f'onestop_stage_seconds_sum{{stage="{Name}"}} {Stage["Sum"]!r}')
+            Lines.append(f'onestop_stage_seconds_count{{stage="{Name}"}} {Stage["Count"]}')
+        for Name, Value in sorted(Data['Counters'].items()):
+            Metric = f"onestop_{re.sub(r'(?<!^)(?=[A-Z])', '_', Name).lower()}_total"
+            Lines.append(f"# TYPE {Metric} counter")
+            Lines.append(f"{Metric} {Value}")
+        return "\n".join(Lines) + "\n"
+
+    def write(self, FileName=None):
+
+        # Write JSON for a .json file name, Prometheus text otherwise. The
+        # file is replaced in one step so a scraper never reads half of it.
+        FileName = FileName or self.OutputFileName
+        if not FileName:
+            return
+        if FileName.lower().endswith('.json'):
+            Text = json.dumps(self.to_dict(), indent=2) + "\n"
+        else:
+            Text = self.to_prometheus()
+        TempFileName = FileName + ".tmp"
+        with open(TempFileName, 'w') as f:
+            f.write(Text)
+        os.replace(TempFileName, FileName)
+
+class SampledProfile:
+
+    # Runs one policy under cProfile or tracemalloc and saves the result as
+    # policy-<number>.prof (load with pstats) or policy-<number>.txt.
+    # The profilers are only imported once a policy is sampled.
+
+    def __init__(self, Metrics, PolicyNumber):
+        self.Metrics = Metrics
+        self.PolicyNumber = PolicyNumber
+        self.Profile = None
+
+    def __enter__(self):
+        import cProfile
+        import tracemalloc
+        if self.Metrics.Profiler == 'cprofile':
+            self.Profile = cProfile.Profile()
+            self.Profile.enable()
+        elif not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *ExcInfo):
+        import tracemalloc
+        os.makedirs(self.Metrics.ProfileDir, exist_ok=True)
+        BaseName = os.path.join(self.Metrics.ProfileDir, f"policy-{self.PolicyNumber}")
+        if self.Profile:
+            self.Profile.disable()
+            self.Profile.dump_stats(BaseName + ".prof")
+        elif tracemalloc.is_tracing():
+            Snapshot = tracemalloc.take_snapshot()
+            Current, Peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(BaseName + ".txt", 'w') as f:
+                f.write(f"Current: {Current:,} bytes   Peak: {Peak:,} bytes\n\n")
+                for Stat in Snapshot.statistics('lineno')[:25]:
+                    f.write(f"{Stat}\n")
+        self.Metrics.count('ProfiledPolicies')
+        return False
+
+
+# One set of metrics for the process.
+METRICS = Metrics()
@@ -0,0 +1,20 @@
+# Description: Importable name for "One Stop.py" so other tools can reuse its functions
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import importlib.util
+import os
+import sys
+
+
+# "One Stop.py" has a space in its name, so it can't be imported directly.
+# Loading it by path here and swapping it into sys.modules lets other files
+# simply use "import OneStop as OS".
+
+OneStopPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "One Stop.py")
+
+Spec = importlib.util.spec_from_file_location(__name__, OneStopPath)
+Module = importlib.util.module_from_spec(Spec)
+sys.modules[__name__] = Module
+Spec.loader.exec_module(Module)
@@ -0,0 +1,232 @@
+# Description: Multi-process quoting pipeline for policy files, with ordered output and a throughput report
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import BatchPolicies as BP
+import OneStop as OS
+import PolicyNumbers as PN
+import PolicyQuery as PQ
+import PolicyStore as PS
+import QuoteCache as QC
+import ReceiptRenderer as RR
+
+
+# Pipeline Values
+
+STAGES = ('Validate', 'Price', 'Render', 'Persist')
+DEFAULT_CHUNK_SIZE = 500
+
+
+# Worker Functions
+#
+# These run in the pool processes. Each takes a whole chunk of policies so
+# the cost of sending work between processes is spread over many policies.
+
+def validate_and_price_chunk(Chunk, Rates):
+
+    # Chunk is a list of (RecordNum, Record), priced with the Rates snapshot.
+    # Returns the accepted policies, the rejected record numbers with their
+    # errors, and time per stage.
+    Accepted = []
+    Rejects = []
+    ValidateTime = 0.0
+    PriceTime = 0.0
+    CacheBefore = QC.cache_stats()
+
+    for RecordNum, Record in Chunk:
+        Start = time.perf_counter()
+        try:
+            CustInfo = BP.build_customer_info(Record)
+            Claims = BP.parse_claims(Record.get('Claims'))
+            PayMethod, DownPay = BP.build_payment_info(Record)
+        except ValueError as Error:
+            Rejects.append((RecordNum, str(Error)))
+            ValidateTime += time.perf_counter() - Start
+            continue
+        Priced = time.perf_counter()
+        ValidateTime += Priced - Start
+
+        PremDetails, Hst, TotCost, MonPayment = BP.price_policy(CustInfo, PayMethod, DownPay, Rates)
+        Accepted.append((CustInfo, Claims, PayMethod, DownPay, PremDetails, Hst, TotCost, MonPayment))
+        PriceTime += time.perf_counter() - Priced
+
+    # Quote cache hits and misses for this chunk, for the run's hit rate.
+    CacheAfter = QC.cache_stats()
+    CacheCounts = {'Hits': CacheAfter['Hits'] - CacheBefore['Hits'], 'Misses': CacheAfter['Misses'] - CacheBefore['Misses']}
+
+    return Accepted, Rejects, {'Validate': ValidateTime, 'Price': PriceTime}, CacheCounts
+
+def render_chunk(NumberedPolicies):
+
+    # NumberedPolicies is a list of (PolicyNumber, Policy). Returns the receipts in the same order.
+    Start = time.perf_counter()
+    Dates = RR.receipt_dates()
+    Receipts = []
+    for PolicyNumber, (CustInfo, Claims, PayMethod, DownPay, PremDetails, Hst, TotCost, MonPayment) in NumberedPolicies:
+        Receipts.append(RR.render_receipt(PolicyNumber, CustInfo, Claims, PremDetails, Hst, TotCost, PayMethod,
+                                          DownPay, MonPayment, PremDetails['TotalPremium'], Dates=Dates))
+    return Receipts, time.perf_counter() - Start
+
+
+# Pipeline Functions
+
+def chunked(Iterable, Size):
+
+    # Group an iterable into lists of Size items without reading it all in.
+    Iterator = iter(Iterable)
+    while True:
+        Chunk = list(itertools.islice(Iterator, Size))
+        if not Chunk:
+            return
+        yield Chunk
+
+def run_pipeline(InFileName, ClaimsFileName=None, ReceiptFileName=None, RejectFileName=None,
+                 Workers=None, ChunkSize=DEFAULT_CHUNK_SIZE, DefaultsFileName=None):
+
+    # Validation/pricing and receipt rendering run in the pool. Policy numbers
+    # are handed out here, in input order, once a chunk is known to be valid,
+    # and saving happens here too, so Claims.dat and the receipt file are
+    # always in policy number order. Only a few chunks per worker are in
+    # flight at a time, so memory stays flat however long the input is.
+    # Files not named are the active context's (OneStop.use_context).
+    ClaimsFileName = ClaimsFileName or PS.CLAIMS_FILE
+    DefaultsFileName = DefaultsFileName or PN.DEFAULTS_FILE
+    Workers = Workers or os.cpu_count() or 1
+    MaxInFlight = Workers * 2
+    Seconds = dict.fromkeys(STAGES, 0.0)
+    Counts = dict.fromkeys(STAGES, 0)
+    Rejected = 0
+    Cache = {'Hits': 0, 'Misses': 0}
+    StartTime = time.perf_counter()
+
+    # Every worker prices with the snapshot in effect when the run starts.
+    OS.RATE_TABLE.check_for_changes()
+    Rates = OS.RATE_TABLE.current()
+
+    Allocator = PN.PolicyNumberAllocator(DefaultsFileName)
+    Writer = PS.PolicyWriter(ClaimsFileName)
+    ReceiptFile = open(ReceiptFileName, 'w') if ReceiptFileName else None
+    RejectFile = open(RejectFileName, 'a') if RejectFileName else None
+
+    Priced = deque()
+    Rendered = deque()
+
+    def advance(Finish):
+
+        nonlocal Rejected
+
+        # Take priced chunks in order, number them and send them to be rendered.
+        while Priced and (Finish or Priced[0].done() or len(Priced) >= MaxInFlight):
+            Accepted, Rejects, Timings, CacheCounts = Priced.popleft().result()
+            for Name, Value in CacheCounts.items():
+                Cache[Name] += Value
+            for Stage, Value in Timings.items():
+                Seconds[Stage] += Value
+            Counts['Validate'] += len(Accepted) + len(Rejects)
+            Counts['Price'] += len(Accepted)
+
+            Rejected += len(Rejects)
+            if RejectFile:
+                for RecordNum, Error in Rejects:
+                    RejectFile.write(json.dumps({'Record': RecordNum, 'Error': Error}) + "\n")
+
+            if Accepted:
+                NumberedPolicies = [(Allocator.next_number(), Policy) for Policy in Accepted]
+                Rendered.append((NumberedPolicies, Pool.submit(render_chunk, NumberedPolicies)))
+
+        # Save rendered chunks in order.
+        while Rendered and (Finish or Rendered[0][1].done() or len(Rendered) >= MaxInFlight):
+            NumberedPolicies, Future = Rendered.popleft()
+            Receipts, RenderTime = Future.result()
+            Seconds['Render'] += RenderTime
+            Counts['Render'] += len(Receipts)
+
+            Start = time.perf_counter()
+            for PolicyNumber, (CustInfo, Claims, PayMethod, DownPay, PremDetails, *_) in NumberedPolicies:
+                OS.write_policy_data(Writer, PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails, Rates.Version)
+            if ReceiptFile:
+                ReceiptFile.write(''.join(Receipts))
+            Seconds['Persist'] += time.perf_counter() - Start
+            Counts['Persist'] += len(NumberedPolicies)
+
+    try:
+        with ProcessPoolExecutor(max_workers=Workers) as Pool:
+            Records = enumerate(BP.read_policy_records(InFileName), start=1)
+            for Chunk in chunked(Records, ChunkSize):
+                Priced.append(Pool.submit(validate_and_price_chunk, Chunk, Rates))
+                advance(False)
+            advance(True)
+    finally:
+        Start = time.perf_counter()
+        Writer.close()
+        Seconds['Persist'] += time.perf_counter() - Start
+        Allocator.release()
+        if ReceiptFile:
+            ReceiptFile.close()
+        if RejectFile:
+            RejectFile.close()
+
+    # Index the records just saved; only the new ones are read.
+    PQ.open_index(ClaimsFileName)
+
+    # Return a summary of the run, with time and count per stage.
+    return {
+        'Processed': Counts['Persist'],
+        'Rejected': Rejected,
+        'Workers': Workers,
+        'RateVersion': Rates.Version,
+        'Seconds': time.perf_counter() - StartTime,
+        'StageSeconds': Seconds,
+        'StageCounts': Counts,
+        'QuoteCache': Cache,
+    }
+
+def print_throughput_report(Summary):
+
+    # Worker stages add up time across all processes, so their rate is per
+    # process; the overall line is what the whole run achieved.
+    print()
+    print(f"  Stage       Policies     Seconds    Policies/sec")
+    print(f"  ----------------------------------------------------")
+    for Stage in STAGES:
+        Count = Summary['StageCounts'][Stage]
+        StageSeconds = Summary['StageSeconds'][Stage]
+        Rate = Count / StageSeconds if StageSeconds else 0.0
+        print(f"  {Stage:<10s}  {Count:>8d}  {StageSeconds:>10.3f}  {Rate:>14,.0f}")
+    print(f"  ----------------------------------------------------")
+    Rate = Summary['Processed'] / Summary['Seconds'] if Summary['Seconds'] else 0.0
+    print(f"  {'Overall':<10s}  {Summary['Processed']:>8d}  {Summary['Seconds']:>10.3f}  {Rate:>14,.0f}")
+    Lookups = Summary['QuoteCache']['Hits'] + Summary['QuoteCache']['Misses']
+    HitRate = Summary['QuoteCache']['Hits'] / Lookups if Lookups else 0.0
+    print(f"  Workers: {Summary['Workers']}   Rejected: {Summary['Rejected']}   Quote cache hit rate: {HitRate:.1%}")
+    print()
+
+def main(Args=None):
+
+    Parser = argparse.ArgumentParser(description="Quote One Stop Insurance policies from a file across all CPU cores.")
+    Parser.add_argument("InFile", help="CSV or JSONL file of policy records")
+    Parser.add_argument("--claims-file", default=PS.CLAIMS_FILE, help="file the policies are saved to")
+    Parser.add_argument("--receipt-file", default=None, help="file the receipts are written to")
+    Parser.add_argument("--reject-file", default=None, help="JSONL file for records that fail validation")
+    Parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    Parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="policies sent to a worker at a time")
+    Options = Parser.parse_args(Args)
+
+    Summary = run_pipeline(Options.InFile, Options.claims_file, Options.receipt_file, Options.reject_file,
+                           Options.workers, Options.chunk_size)
+    print_throughput_report(Summary)
+
+    return 0 if Summary['Rejected'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,647 @@
+# Description: Segmented policy log for Claims.dat with rotation, compressed sealed segments, compaction and a parallel scan
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import argparse
+import lzma
+import os
+import re
+import sys
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import partial
+
+import PolicyNumbers as PN
+import PolicyStore as PS
+
+
+# Log Layout
+#
+# Claims.dat stays the active segment, so everything that reads or appends
+# to it works as before. Rotating moves it into Claims.dat.segments/ as a
+# sealed segment and starts a new, empty Claims.dat. A sealed segment is a
+# whole store file (header and records) compressed with zlib or lzma, named
+# <first>-<last>.dat.zz or .dat.xz after the range of rotations it holds.
+# Compaction merges runs of sealed segments into segments of about the
+# rotation size, each covering the range of the ones it replaces.
+#
+# Every step writes its new file before removing the old one, so a crash
+# can leave an uncompressed segment (<n>-<n>.dat) or a segment whose range
+# is covered by a compacted one. list_segments reads the log as if the
+# step had finished, and the next rotate or compact tidies up.
+#
+# Segments are numbered by rotation; the active segment has the number it
+# will be sealed under. A record's place in the log is its segment number
+# and its offset there, packed into one integer (log_position). Compaction
+# rewrites sealed segments and moves their records, so it counts itself in
+# a generation file; a reader holding positions from an earlier generation
+# has to start over (see LogReader).
+
+SEGMENT_SUFFIX = ".segments"
+STARTED_FILE = "active.started"
+GENERATION_FILE = "generation"
+SEGMENT_NAME = re.compile(r"^(\d{6})-(\d{6})\.dat(\.zz|\.xz)?$")
+
+COMPRESSIONS = {'zlib': '.zz', 'lzma': '.xz'}
+DECOMPRESS = {'.zz': zlib.decompress, '.xz': lzma.decompress}
+
+# Rotate once the active segment reaches this size, by default.
+ROTATE_BYTES = 64 << 20
+
+# Data is read and compressed this much at a time.
+CHUNK_SIZE = 1 << 20
+
+# Offsets within a segment take the low bits of a log position (1 TB).
+OFFSET_BITS = 40
+
+
+# Segment Functions
+
+def segment_dir(FileName):
+    return FileName + SEGMENT_SUFFIX
+
+def list_segments(FileName):
+
+    # The sealed segments in order, as (First, Last, Path), and the paths
+    # of any left over from an unfinished step. A segment is left over when
+    # a wider or compressed segment already holds its range.
+    Directory = segment_dir(FileName)
+    Entries = []
+    for Name in os.listdir(Directory) if os.path.isdir(Directory) else ():
+        Match = SEGMENT_NAME.match(Name)
+        if Match:
+            First, Last, Ext = int(Match[1]), int(Match[2]), Match[3] or ""
+            Entries.append((First, -Last, not Ext, os.path.join(Directory, Name)))
+
+    Live = []
+    Stale = []
+    for First, Last, _, Path in sorted(Entries):
+        if Live and -Last <= Live[-1][1]:
+            Stale.append(Path)
+        else:
+            Live.append((First, -Last, Path))
+    return Live, Stale
+
+def log_segments(FileName):
+
+    # Every segment of the log as (First, Last, Path), oldest first, ending
+    # with the active one, Claims.dat itself.
+    Live, _ = list_segments(FileName)
+    Active = Live[-1][1] + 1 if Live else 1
+    return Live + [(Active, Active, FileName)]
+
+def generation(FileName):
+
+    # How many times the log has been compacted.
+    try:
+        with open(os.path.join(segment_dir(FileName), GENERATION_FILE), 'r') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
+
+def next_generation(FileName):
+    TempPath = os.path.join(segment_dir(FileName), GENERATION_FILE + ".tmp")
+    with open(TempPath, 'w') as f:
+        f.write(str(generation(FileName) + 1))
+    os.replace(TempPath, os.path.join(segment_dir(FileName), GENERATION_FILE))
+
+def log_position(Segment, Offset):
+    return Segment << OFFSET_BITS | Offset
+
+def split_position(Position):
+    return Position >> OFFSET_BITS, Position & ((1 << OFFSET_BITS) - 1)
+
+def compressor(Compression):
+    if Compression not in COMPRESSIONS:
+        raise ValueError(f"Compression must be one of {', '.join(COMPRESSIONS)}.")
+    return zlib.compressobj(6) if Compression == 'zlib' else lzma.LZMACompressor(preset=6)
+
+def write_segment(Path, Chunks, Compression):
+
+    # Compress the chunks into Path through a temporary file, so Path only
+    # ever holds a complete segment. Returns the compressed size.
+    Compressor = compressor(Compression)
+    TempPath = Path + ".tmp"
+    try:
+        with open(TempPath, 'wb') as f:
+            for Chunk in Chunks:
+                f.write(Compressor.compress(Chunk))
+            f.write(Compressor.flush())
+            f.flush()
+            os.fsync(f.fileno())
+            Size = f.tell()
+    except BaseException:
+        os.remove(TempPath)
+        raise
+    os.replace(TempPath, Path)
+    return Size
+
+def read_chunks(FileName, Length):
+
+    # The first Length bytes of a file, CHUNK_SIZE at a time.
+    with open(FileName, 'rb') as f:
+        while Length > 0:
+            Chunk = f.read(min(CHUNK_SIZE, Length))
+            if not Chunk:
+                break
+            Length -= len(Chunk)
+            yield Chunk
+
+def read_segment(Path):
+
+    # A sealed segment as the bytes of the store file it holds.
+    with open(Path, 'rb') as f:
+        Data = f.read()
+    Ext = os.path.splitext(Path)[1]
+    return DECOMPRESS[Ext](Data) if Ext in DECOMPRESS else Data
+
+def seal_segment(Path, Compression):
+
+    # Compress an uncompressed segment in place of the original.
+    Sealed = Path + COMPRESSIONS[Compression]
+    write_segment(Sealed, read_chunks(Path, os.path.getsize(Path)), Compression)
+    os.remove(Path)
+    return Sealed
+
+def maintenance_lock(FileName):
+
+    # Held alone while recovering, sealing or compacting segments, so two
+    # of them never write the same temporary file or remove a segment the
+    # other is still reading. Writers never take it; they share
+    # Claims.dat.lock, which rotation takes (inside this one) only for the
+    # rename.
+    return PN.FileLock(segment_dir(FileName))
+
+def recover_segments(FileName, Compression='zlib'):
+
+    # Finish any step a crash interrupted: seal uncompressed segments and
+    # remove the ones a wider segment already holds. Caller holds the
+    # maintenance lock.
+    Live, Stale = list_segments(FileName)
+    for Path in Stale:
+        os.remove(Path)
+    for First, Last, Path in Live:
+        if os.path.splitext(Path)[1] not in DECOMPRESS:
+            seal_segment(Path, Compression)
+
+
+# Rotation Functions
+
+def started_date(FileName):
+
+    # The day the active segment was started, or None if not recorded.
+    try:
+        with open(os.path.join(segment_dir(FileName), STARTED_FILE), 'r') as f:
+            return date.fromisoformat(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def mark_started(FileName, Day=None):
+    os.makedirs(segment_dir(FileName), exist_ok=True)
+    with open(os.path.join(segment_dir(FileName), STARTED_FILE), 'w') as f:
+        f.write((Day or date.today()).isoformat())
+
+def should_rotate(FileName, RotateBytes=ROTATE_BYTES, RotateDays=None, Today=None):
+
+    # True once the active segment holds records and has reached
+    # RotateBytes or is RotateDays old. Stores from before the log have no
+    # start date, so their age is counted from the first check.
+    Size = os.path.getsize(FileName) if os.path.exists(FileName) else 0
+    if Size <= PS.HEADER.size:
+        return False
+    if RotateBytes and Size >= RotateBytes:
+        return True
+    if RotateDays:
+        Started = started_date(FileName)
+        if Started is None:
+            mark_started(FileName, Today)
+            return False
+        return ((Today or date.today()) - Started).days >= RotateDays
+    return False
+
+def rotate(FileName, Compression='zlib'):
+
+    # Seal the active segment and start a new one. Claims.dat is renamed
+    # into the log first, so the new Claims.dat is ready straight away and
+    # the slow part, compressing, works on a file nobody is writing to. The
+    # rename happens under Claims.dat.lock, which writers share while they
+    # append (see PolicyStore.PolicyWriter), so it waits for a batch in
+    # progress and every later batch goes to the new Claims.dat. The
+    # maintenance lock is held throughout, so a compaction or another
+    # rotation waits until the segment is sealed.
+    # Returns the sealed segment's path, or None if there was nothing to seal.
+    compressor(Compression)
+    with maintenance_lock(FileName):
+        recover_segments(FileName, Compression)
+        with PN.FileLock(FileName):
+            if not os.path.exists(FileName) or os.path.getsize(FileName) <= PS.HEADER.size:
+                return None
+            Length = PS.valid_length(FileName)
+            Live, _ = list_segments(FileName)
+            Number = Live[-1][1] + 1 if Live else 1
+            Path = os.path.join(segment_dir(FileName), f"{Number:06d}-{Number:06d}.dat")
+            os.makedirs(segment_dir(FileName), exist_ok=True)
+            os.replace(FileName, Path)
+            PS.open_store(FileName).close()
+            mark_started(FileName)
+
+        # A torn record at the end is left out, as open_store would cut it off.
+        if Length < os.path.getsize(Path):
+            os.truncate(Path, Length)
+        return seal_segment(Path, Compression)
+
+class SegmentedWriter(PS.PolicyWriter):
+
+    # A PolicyWriter that rotates Claims.dat into the log once it reaches
+    # RotateBytes or is RotateDays old. The check runs after each batch is
+    # written, so a batch never spans two segments. The next batch reopens
+    # the new Claims.dat, as in any other writer.
+
+    def __init__(self, FileName, RotateBytes=ROTATE_BYTES, RotateDays=None, Compression='zlib', **Options):
+        compressor(Compression)
+        super().__init__(FileName, **Options)
+        self.RotateBytes = RotateBytes
+        self.RotateDays = RotateDays
+        self.Compression = Compression
+        self.Sealed = []
+
+    def write_batch(self):
+
+        # Caller holds the lock.
+        super().write_batch()
+        if should_rotate(self.FileName, self.RotateBytes, self.RotateDays):
+            self.Sealed.append(rotate(self.FileName, self.Compression))
+
+
+# Scan Functions
+
+def segment_paths(FileName):
+
+    # Every segment of the log, oldest first, ending with the active one.
+    return [Path for _, _, Path in log_segments(FileName)]
+
+class LogReader:
+
+    # Reads the records of a log in order, each read() picking up where the
+    # last one stopped, across rotations. The indexes and reports that keep
+    # up with Claims.dat read it through here. The position is (Generation,
+    # Segment, End, LastFrame): the generation it was read in, the segment
+    # being read, where the last record read there ends and that record's
+    # (Offset, Length, Crc), so matches() can tell if it is still there.
+    # record_at() reads single records back by log position.
+    #
+    # Sealed segments are decompressed into memory one at a time; the last
+    # one is kept until close() for the next read or lookup in it.
+
+    def __init__(self, FileName, Position=None):
+        self.FileName = FileName
+        self.Generation, self.Segment, self.End, self.LastFrame = Position or (generation(FileName), 0, PS.HEADER.size, None)
+        self.Cached = None          # (Path, Version, View) of the last sealed segment opened
+        self.Paths = None           # segment number -> path, for record_at
+        self.File = None            # Claims.dat, open for record_at
+        self.FileVersion = None
+
+    def position(self):
+        return self.Generation, self.Segment, self.End, self.LastFrame
+
+    def matches(self):
+
+        # True if the log has not been compacted since the position was
+        # taken and the last record read is still where it was.
+        if self.Generation != generation(self.FileName):
+            return False
+        if not self.Segment:
+            return True
+        Path = next((Path for _, Last, Path in log_segments(self.FileName) if Last == self.Segment), None)
+        if Path is None:
+            return False
+        if self.LastFrame is None:
+            return True
+        Offset, Length, Crc = self.LastFrame
+        if Path == self.FileName:
+            return PS.frame_matches(Path, Offset, Length, Crc)
+        _, View = self.open_sealed(Path)
+        return (Offset + Length <= len(View)
+                and PS.FRAME.unpack_from(View, Offset) == (Length - PS.FRAME.size, Crc))
+
+    def open_sealed(self, Path):
+        if self.Cached is None or self.Cached[0] != Path:
+            self.Cached = None
+            View = memoryview(read_segment(Path))
+            self.Cached = (Path, PS.HEADER.unpack_from(View, 0)[1], View)
+        return self.Cached[1:]
+
+    def frames(self, Path, Offset):
+
+        # (Version, frames from Offset on) of one segment.
+        if Path != self.FileName:
+            Version, View = self.open_sealed(Path)
+            return Version, PS.iter_buffer_frames(View, Offset, Name=Path)
+        if not os.path.exists(Path) or os.path.getsize(Path) <= Offset:
+            return PS.FORMAT_VERSION, ()
+        return PS.read_store_version(Path), PS.iter_frames(Path, Offset)
+
+    def read(self):
+
+        # Yield (Segment, Version, Offset, End, Crc, Payload) for every record
+        # after the position, oldest first, moving the position on as it
+        # goes. Payloads are memoryviews, only valid until the next record
+        # is requested. Callers check matches() first.
+        for _, Last, Path in log_segments(self.FileName):
+            if Last < self.Segment:
+                continue
+            if Last > self.Segment:
+                self.Segment, self.End, self.LastFrame = Last, PS.HEADER.size, None
+            Version, Frames = self.frames(Path, self.End)
+            for Offset, End, Crc, Payload in Frames:
+                self.End = End
+                self.LastFrame = (Offset, End - Offset, Crc)
+                yield Last, Version, Offset, End, Crc, Payload
+        self.Cached = None
+
+    def record_at(self, Position):
+
+        # (Version, Payload) of the record at a log position taken in this
+        # generation. Reading positions in order decompresses each sealed
+        # segment once.
+        Segment, Offset = split_position(Position)
+        if self.Paths is None or Segment not in self.Paths:
+            self.Paths = {Last: Path for _, Last, Path in log_segments(self.FileName)}
+        Path = self.Paths.get(Segment)
+        if Path is None:
+            raise ValueError(f"No segment {Segment} in the {self.FileName} log.")
+        if Path != self.FileName:
+            Version, View = self.open_sealed(Path)
+            Length, Crc = PS.FRAME.unpack_from(View, Offset)
+            Payload = bytes(View[Offset + PS.FRAME.size:Offset + PS.FRAME.size + Length])
+            if len(Payload) != Length or zlib.crc32(Payload) != Crc:
+                raise ValueError(f"No valid record at offset {Offset} of {Path}.")
+            return Version, Payload
+        if self.File is None:
+            self.File = open(Path, 'rb')
+            self.FileVersion = PS.read_store_version(Path)
+        return self.FileVersion, PS.read_frame(self.File, Offset)
+
+    def close(self):
+        self.Cached = None
+        self.Paths = None
+        if self.File is not None:
+            self.File.close()
+            self.File = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *ExcInfo):
+        self.close()
+
+def scan_segment(Path, Scanner):
+
+    # Run Scanner(Version, Payloads) over one segment, decompressing it in
+    # memory if it is sealed. Payloads are memoryviews, only valid until
+    # the next one is requested.
+    if os.path.splitext(Path)[1] in DECOMPRESS:
+        View = memoryview(read_segment(Path))
+        Version = PS.HEADER.unpack_from(View, 0)[1]
+        Frames = PS.iter_buffer_frames(View, Name=Path)
+    elif os.path.exists(Path) and os.path.getsize(Path) > 0:
+        Version = PS.read_store_version(Path)
+        Frames = PS.iter_frames(Path)
+    else:
+        Version = PS.FORMAT_VERSION
+        Frames = ()
+    return Scanner(Version, (Payload for _, _, _, Payload in Frames))
+
+def scan(FileName, Scanner, Workers=None):
+
+    # Scan every segment of the log, several at once in worker processes,
+    # so decompressing and decoding a long history uses every core. Scanner
+    # must be a module-level function (workers import it by name) and its
+    # result picklable. Returns the results in segment order.
+    Paths = segment_paths(FileName)
+    Workers = min(Workers or os.cpu_count() or 1, len(Paths))
+    if Workers == 1:
+        return [scan_segment(Path, Scanner) for Path in Paths]
+    with ProcessPoolExecutor(Workers) as Pool:
+        return list(Pool.map(partial(scan_segment, Scanner=Scanner), Paths))
+
+def iter_log_policies(FileName):
+
+    # Stream every record in the log as a dict, oldest first, one segment
+    # in memory at a time.
+    for _, Version, _, _, _, Payload in LogReader(FileName).read():
+        yield PS.decode_policy(Payload, Version)
+
+def latest_positions(Version, Payloads):
+
+    # The segment's store format, where each policy number was last saved,
+    # the positions of records with no policy number (0, from the old text
+    # format), which cannot be told apart and are all kept, and the framed
+    # length of every record. The record count is len(Lengths).
+    Fixed = PS.FIXED_BY_VERSION[Version]
+    Positions = {}
+    Unnumbered = []
+    Lengths = array('I')
+    for Position, Payload in enumerate(Payloads):
+        PolicyNumber = Fixed.unpack_from(Payload, 0)[0]
+        if PolicyNumber:
+            Positions[PolicyNumber] = Position
+        else:
+            Unnumbered.append(Position)
+        Lengths.append(PS.FRAME.size + len(Payload))
+    return Version, Positions, Unnumbered, Lengths
+
+def policy_totals(Version, Payloads):
+
+    # The record count and the (total premium, claim count, claim total) of
+    # each policy's last record in the segment, by policy number, plus a
+    # list of them for records with no policy number.
+    Premium = PS.FIXED_FIELDS.index('TotalPremium')
+    Records = 0
+    Totals = {}
+    Unnumbered = []
+    for Records, Payload in enumerate(Payloads, start=1):
+        Fixed, _, Claims = PS.decode_raw(Payload, Version)
+        Total = (Fixed[Premium], len(Claims), sum(Claim[2] for Claim in Claims))
+        if Fixed[0]:
+            Totals[Fixed[0]] = Total
+        else:
+            Unnumbered.append(Total)
+    return Records, Totals, Unnumbered
+
+
+# Compaction Functions
+
+def upgrade_record(Payload, Version):
+
+    # A record from an older store format, framed in the current one, as
+    # PolicyStore.migrate_legacy_file rewrites a whole file.
+    Record = PS.decode_policy(Payload, Version)
+    return PS.encode_policy(Record['PolicyNumber'], Record, Record['Claims'], Record['PayMethod'], Record['DownPay'],
+                            Record, Record['RateVersion'])
+
+def compact(FileName, Compression='zlib', Workers=None, SegmentBytes=ROTATE_BYTES):
+
+    # Merge runs of sealed segments into segments of about SegmentBytes
+    # (uncompressed) holding only the latest record of each policy number,
+    # so a scan still has a segment per worker and no segment is larger
+    # than a rotation would make it. A record is dropped when the same
+    # policy was saved again later, in a sealed segment or in Claims.dat.
+    # Record order is kept, and records in an older store format are
+    # rewritten in the current one. The maintenance lock is held
+    # throughout, so a rotation waits rather than sealing into the range
+    # being merged. Returns (records before, records after, bytes before,
+    # bytes after), or None when there are no sealed segments.
+    compressor(Compression)
+    with maintenance_lock(FileName):
+        recover_segments(FileName, Compression)
+        Live, _ = list_segments(FileName)
+        if not Live:
+            return None
+
+        # Find each policy's latest record with a parallel scan of every
+        # segment, the active one included.
+        Latest = {}
+        Keep = [set() for _ in Live]
+        Versions = []
+        Lengths = []
+        for Segment, Result in enumerate(scan(FileName, latest_positions, Workers)):
+            Version, Positions, Unnumbered, RecordLengths = Result
+            for PolicyNumber, Position in Positions.items():
+                Latest[PolicyNumber] = (Segment, Position)
+            if Segment < len(Live):
+                Keep[Segment].update(Unnumbered)
+                Versions.append(Version)
+                Lengths.append(RecordLengths)
+        for Segment, Position in Latest.values():
+            if Segment < len(Live):
+                Keep[Segment].add(Position)
+        Before = sum(len(RecordLengths) for RecordLengths in Lengths)
+        After = sum(len(Positions) for Positions in Keep)
+
+        # Group neighbouring segments by the size of the records they keep. A
+        # segment bigger than SegmentBytes on its own stays a group of one.
+        Groups = []
+        GroupBytes = 0
+        for Segment, Positions in enumerate(Keep):
+            Bytes = sum(Lengths[Segment][Position] for Position in Positions)
+            if Groups and GroupBytes + Bytes <= SegmentBytes:
+                Groups[-1].append(Segment)
+                GroupBytes += Bytes
+            else:
+                Groups.append([Segment])
+                GroupBytes = Bytes
+
+        def kept_records(Group):
+
+            # One header, then the group's kept records, framed.
+            yield PS.HEADER.pack(PS.MAGIC, PS.FORMAT_VERSION)
+            for Segment in Group:
+                Path = Live[Segment][2]
+                View = memoryview(read_segment(Path))
+                for Position, (Offset, End, _, Payload) in enumerate(PS.iter_buffer_frames(View, Name=Path)):
+                    if Position in Keep[Segment]:
+                        if Versions[Segment] == PS.FORMAT_VERSION:
+                            yield View[Offset:End]
+                        else:
+                            yield upgrade_record(Payload, Versions[Segment])
+
+        # A segment on its own with nothing to drop or upgrade is already compact.
+        Merges = []
+        for Group in Groups:
+            Path = os.path.join(segment_dir(FileName),
+                                f"{Live[Group[0]][0]:06d}-{Live[Group[-1]][1]:06d}.dat{COMPRESSIONS[Compression]}")
+            First = Group[0]
+            if not (Group == [First] and Live[First][2] == Path and len(Keep[First]) == len(Lengths[First])
+                    and Versions[First] == PS.FORMAT_VERSION):
+                Merges.append((Group, Path))
+        BytesBefore = sum(os.path.getsize(Path) for _, _, Path in Live)
+        if not Merges:
+            return Before, After, BytesBefore, BytesBefore
+
+        # Positions in the old segments stop meaning anything once the first
+        # merged segment is in place, so readers are told to start over both
+        # before and after. Each merged segment covers its group's whole range,
+        # so it replaces the old ones even if the removals are cut short.
+        next_generation(FileName)
+        for Group, Path in Merges:
+            write_segment(Path, kept_records(Group), Compression)
+        next_generation(FileName)
+        for Group, Path in Merges:
+            for Segment in Group:
+                if Live[Segment][2] != Path:
+                    os.remove(Live[Segment][2])
+        Live, _ = list_segments(FileName)
+        return Before, After, BytesBefore, sum(os.path.getsize(Path) for _, _, Path in Live)
+
+
+# Main Functions
+
+def print_segments(FileName):
+
+    print(f"  {'Segment':<24s} {'Size':>14s}")
+    for _, _, Path in list_segments(FileName)[0]:
+        print(f"  {os.path.basename(Path):<24s} {os.path.getsize(Path):>14,d}")
+    Size = os.path.getsize(FileName) if os.path.exists(FileName) else 0
+    print(f"  {os.path.basename(FileName) + ' (active)':<24s} {Size:>14,d}")
+
+def main(Args=None):
+
+    Parser = argparse.ArgumentParser(description="Rotate, compact and scan the Claims.dat policy log.")
+    Commands = Parser.add_subparsers(dest="Command", required=True)
+
+    Rotate = Commands.add_parser("rotate", help="seal Claims.dat into the log and start a new one")
+    Rotate.add_argument("--max-mb", type=float, default=None, help="only rotate once Claims.dat is this big")
+    Rotate.add_argument("--max-days", type=int, default=None, help="only rotate once Claims.dat is this many days old")
+    Compact = Commands.add_parser("compact", help="merge sealed segments, keeping the latest record of each policy")
+    Compact.add_argument("--segment-mb", type=float, default=ROTATE_BYTES >> 20, help="size to merge segments up to")
+    Scan = Commands.add_parser("scan", help="summarize the whole history across all segments")
+    Commands.add_parser("list", help="list the segments and their sizes")
+
+    for Command in Commands.choices.values():
+        Command.add_argument("ClaimsFile", nargs="?", default=PS.CLAIMS_FILE, help="policy store file")
+    for Command in (Rotate, Compact):
+        Command.add_argument("--compression", choices=sorted(COMPRESSIONS), default="zlib", help="how sealed segments are compressed")
+    for Command in (Compact, Scan):
+        Command.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    Options = Parser.parse_args(Args)
+
+    StartTime = time.perf_counter()
+    if Options.Command == "rotate":
+        Due = Options.max_mb is None and Options.max_days is None
+        MaxBytes = int(Options.max_mb * (1 << 20)) if Options.max_mb else None
+        if Due or should_rotate(Options.ClaimsFile, MaxBytes, Options.max_days):
+            Path = rotate(Options.ClaimsFile, Options.compression)
+            print(f"Sealed {Path}." if Path else "Nothing to rotate.")
+        else:
+            print("Not due for rotation.")
+    elif Options.Command == "compact":
+        Result = compact(Options.ClaimsFile, Options.compression, Options.workers, int(Options.segment_mb * (1 << 20)))
+        if Result is None:
+            print("No sealed segments to compact.")
+        else:
+            Before, After, BytesBefore, BytesAfter = Result
+            print(f"Records: {Before:,} -> {After:,}  Bytes: {BytesBefore:,} -> {BytesAfter:,}  "
+                  f"Time: {time.perf_counter() - StartTime:.2f}s")
+    elif Options.Command == "scan":
+        Results = scan(Options.ClaimsFile, policy_totals, Options.workers)
+        Latest = {}
+        Unnumbered = []
+        for _, Totals, Others in Results:
+            Latest.update(Totals)
+            Unnumbered += Others
+        States = list(Latest.values()) + Unnumbered
+        Premium, Claims, ClaimTotal = (sum(Column) for Column in zip(*States)) if States else (0, 0, 0)
+        print(f"Segments: {len(Results)}  Records: {sum(Result[0] for Result in Results):,}  Policies: {len(States):,}")
+        print(f"Latest state: premium {Premium:,.2f}  claims {Claims:,} totalling {ClaimTotal:,.2f}  "
+              f"Time: {time.perf_counter() - StartTime:.2f}s")
+    else:
+        print_segments(Options.ClaimsFile)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
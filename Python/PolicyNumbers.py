@@ -0,0 +1,163 @@
+# Description: Policy number allocator that leases blocks of numbers and saves the next number back to Defaults.dat
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+# Allocator Values
+
+# Data files live beside the program, wherever it is run from. OneStop's
+# use_context() points DEFAULTS_FILE at another folder.
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULTS_FILE = os.path.join(DATA_DIR, "Defaults.dat")
+DEFAULT_BLOCK_SIZE = 1000
+
+
+# File Functions
+
+class FileLock:
+
+    # Lock on a "<file>.lock" file next to Defaults.dat or Claims.dat. The
+    # lock is kept on a separate file because both files get replaced (on
+    # save and on rotation). Exclusive unless Shared; msvcrt has no shared
+    # locks, so there shared holders take turns instead.
+
+    def __init__(self, FileName, Shared=False):
+        self.LockFileName = FileName + ".lock"
+        self.Shared = Shared
+        self.File = None
+
+    def __enter__(self):
+        self.File = open(self.LockFileName, 'a+')
+        if fcntl:
+            fcntl.flock(self.File.fileno(), fcntl.LOCK_SH if self.Shared else fcntl.LOCK_EX)
+        else:
+            self.File.seek(0)
+            msvcrt.locking(self.File.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *ExcInfo):
+        if fcntl:
+            fcntl.flock(self.File.fileno(), fcntl.LOCK_UN)
+        else:
+            self.File.seek(0)
+            msvcrt.locking(self.File.fileno(), msvcrt.LK_UNLCK, 1)
+        self.File.close()
+        self.File = None
+
+def read_next_number(FileName):
+
+    # The next policy number is the first line of Defaults.dat.
+    with open(FileName, 'rb') as f:
+        return int(f.readline())
+
+def write_next_number(FileName, NextNumber):
+
+    # Replace only the first line, keeping the other rates and the file's
+    # line endings exactly as they are. The new file is written beside the
+    # old one, synced, then swapped in so a crash never leaves a half file.
+    with open(FileName, 'rb') as f:
+        FirstLine = f.readline()
+        Rest = f.read()
+
+    LineEnd = FirstLine[len(FirstLine.rstrip(b'\r\n')):]
+    TempFileName = FileName + ".tmp"
+    with open(TempFileName, 'wb') as f:
+        f.write(str(NextNumber).encode('ascii') + LineEnd + Rest)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(TempFileName, FileName)
+
+
+# Allocator Functions
+
+def lease_block(FileName=None, Count=DEFAULT_BLOCK_SIZE):
+
+    # Reserve Count numbers for this process and save the new next number.
+    # Returns the first number of the block.
+    FileName = FileName or DEFAULTS_FILE
+    with FileLock(FileName):
+        Start = read_next_number(FileName)
+        write_next_number(FileName, Start + Count)
+    return Start
+
+class PolicyNumberAllocator:
+
+    # Hands out policy numbers from blocks leased from Defaults.dat, so only
+    # one disk round-trip is needed per block. Safe to share between threads,
+    # and separate processes never get the same number. Numbers left in a
+    # block when a process stops are skipped unless release() can return them.
+
+    def __init__(self, FileName=None, BlockSize=DEFAULT_BLOCK_SIZE):
+        self.FileName = FileName or DEFAULTS_FILE
+        self.BlockSize = BlockSize
+        self.Lock = threading.Lock()
+        self.Next = 0
+        self.End = 0
+
+    def next_number(self):
+
+        with self.Lock:
+            if self.Next >= self.End:
+                self.Next = lease_block(self.FileName, self.BlockSize)
+                self.End = self.Next + self.BlockSize
+            Number = self.Next
+            self.Next += 1
+            return Number
+
+    def lease_number(self):
+
+        # The next number as a NumberLease, for work that may be abandoned.
+        return NumberLease(self)
+
+    def give_back(self, Number):
+
+        # Return a number that was never used and save it back to
+        # Defaults.dat. Only the most recently handed out number can go back.
+        with self.Lock:
+            if Number == self.Next - 1:
+                self.Next -= 1
+        self.release()
+
+    def release(self):
+
+        # Give back the unused part of the current block, but only if no one
+        # else has leased numbers since (the saved next number is still ours).
+        with self.Lock:
+            if self.Next >= self.End:
+                return
+            with FileLock(self.FileName):
+                if read_next_number(self.FileName) == self.End:
+                    write_next_number(self.FileName, self.Next)
+            self.End = self.Next
+
+class NumberLease:
+
+    # One number taken from an allocator for a policy being entered. Unless
+    # keep() is called once the policy is saved, leaving the with block
+    # (an error, Ctrl+C or the end of input) gives the number back, so an
+    # abandoned policy does not leave a gap in the numbering.
+
+    def __init__(self, Allocator):
+        self.Allocator = Allocator
+        self.Number = Allocator.next_number()
+        self.Kept = False
+
+    def keep(self):
+        self.Kept = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *ExcInfo):
+        if not self.Kept:
+            self.Allocator.give_back(self.Number)
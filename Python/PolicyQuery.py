@@ -0,0 +1,233 @@
+# Description: Streaming queries over Claims.dat, with a sidecar index on policy number, province and postal code
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import argparse
+import json
+import os
+import struct
+import sys
+from array import array
+
+import PolicyLog as PL
+import PolicyStore as PS
+
+
+# Index Values
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b'OSPI'
+INDEX_VERSION = 2
+INDEX_HEADER = struct.Struct('<4sHQ')       # magic, version, log generation
+
+# One entry per record in the log: the segment it is in, where its frame
+# starts there, its total length and checksum, then the values it is
+# indexed on. Provinces are two letters and postal codes six characters
+# once collect_customer_info has formatted them.
+ENTRY = struct.Struct('<IQIIq2s6s')
+
+# Fields the command line report can group by.
+GROUP_FIELDS = PS.STRING_FIELDS + ('PayMethod', 'NumCars', 'RateVersion')
+
+
+# Streaming Functions
+
+def iter_policies(FileName, Where=None):
+
+    # Stream policies from the log (the sealed segments, then Claims.dat) as
+    # dicts, one at a time, optionally keeping only those for which
+    # Where(Policy) is true.
+    for Policy in PL.iter_log_policies(FileName):
+        if Where is None or Where(Policy):
+            yield Policy
+
+def aggregate(FileName, GroupBy, Totals=('TotalPremium',), Where=None):
+
+    # Count and total policies per value of GroupBy in one streaming pass.
+    # Memory grows with the number of groups, not the number of policies.
+    # Returns {Group: {'Count': n, Field: total, ...}}.
+    Groups = {}
+    for Policy in iter_policies(FileName, Where):
+        Group = Groups.get(Policy[GroupBy])
+        if Group is None:
+            Group = Groups[Policy[GroupBy]] = dict.fromkeys(Totals, 0.0)
+            Group['Count'] = 0
+        Group['Count'] += 1
+        for Field in Totals:
+            Group[Field] += Policy[Field] or 0.0
+    return Groups
+
+
+# Index
+
+def index_file_name(FileName):
+    return FileName + INDEX_SUFFIX
+
+class PolicyIndex:
+
+    # Sidecar index for a store file and its log, kept in "<store>.idx".
+    # Each record gets a fixed-size entry, so bringing the index up to date
+    # only reads the records added since the last update() and appends their
+    # entries. If the store was replaced (migrated or restored) or the log
+    # compacted, the last entry no longer matches it and the index is rebuilt.
+    #
+    # Lookups read just the matching records by log position: a seek each in
+    # Claims.dat, and one decompression per sealed segment they fall in.
+    # When a policy number appears more than once the latest record is the
+    # current one.
+
+    def __init__(self, FileName):
+        self.FileName = FileName
+        self.IndexFileName = index_file_name(FileName)
+        self.load()
+
+    def reset(self):
+        self.Reader = PL.LogReader(self.FileName)
+        self.ByNumber = {}
+        self.ByProvince = {}
+        self.ByPostCode = {}
+        self.Count = 0
+
+    def add_entry(self, Segment, Offset, PolicyNumber, Province, PostCode):
+        Position = PL.log_position(Segment, Offset)
+        self.ByNumber[PolicyNumber] = Position
+        self.ByProvince.setdefault(Province, array('Q')).append(Position)
+        self.ByPostCode.setdefault(PostCode, array('Q')).append(Position)
+        self.Count += 1
+
+    def load(self):
+
+        # Read the index file, dropping a torn entry at the end, then check
+        # it still describes the store.
+        self.reset()
+        if not os.path.exists(self.IndexFileName):
+            return
+        with open(self.IndexFileName, 'rb') as f:
+            Data = f.read()
+        if len(Data) < INDEX_HEADER.size or INDEX_HEADER.unpack_from(Data)[:2] != (INDEX_MAGIC, INDEX_VERSION):
+            return
+        Generation = INDEX_HEADER.unpack_from(Data)[2]
+
+        Length = INDEX_HEADER.size + (len(Data) - INDEX_HEADER.size) // ENTRY.size * ENTRY.size
+        if Length < len(Data):
+            with open(self.IndexFileName, 'r+b') as f:
+                f.truncate(Length)
+
+        Position = (Generation, 0, PS.HEADER.size, None)
+        for Segment, Offset, Size, Crc, PolicyNumber, Province, PostCode in ENTRY.iter_unpack(
+                memoryview(Data)[INDEX_HEADER.size:Length]):
+            self.add_entry(Segment, Offset, PolicyNumber,
+                           Province.decode('ascii').rstrip('\0'), PostCode.decode('ascii').rstrip('\0'))
+            Position = (Generation, Segment, Offset + Size, (Offset, Size, Crc))
+
+        # The last entry says where to carry on reading the log.
+        self.Reader = PL.LogReader(self.FileName, Position)
+        if not self.Reader.matches():
+            self.reset()
+
+    def update(self):
+
+        # Index any records added to the log since the last update. Returns
+        # the number of records added.
+        if not self.Reader.matches():
+            self.reset()
+
+        # An empty index is written out from scratch, replacing any stale file.
+        Fresh = self.Count == 0
+        Entries = []
+        for Segment, Version, Offset, End, Crc, Payload in self.Reader.read():
+            Policy = PS.decode_policy(Payload, Version)
+            Province = Policy['Province'].encode('ascii', 'replace')[:2]
+            PostCode = Policy['PostCode'].encode('ascii', 'replace')[:6]
+            Entries.append(ENTRY.pack(Segment, Offset, End - Offset, Crc, Policy['PolicyNumber'], Province, PostCode))
+            self.add_entry(Segment, Offset, Policy['PolicyNumber'], Province.decode('ascii'), PostCode.decode('ascii'))
+        if not Entries:
+            return 0
+
+        with open(self.IndexFileName, 'wb' if Fresh else 'ab') as f:
+            if Fresh:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.Reader.Generation))
+            f.write(b"".join(Entries))
+        return len(Entries)
+
+    def __len__(self):
+        return self.Count
+
+    def read_at(self, Positions):
+
+        # Decode the records at the given log positions, in that order.
+        with PL.LogReader(self.FileName, self.Reader.position()) as Reader:
+            for Position in Positions:
+                Version, Payload = Reader.record_at(Position)
+                yield PS.decode_policy(Payload, Version)
+
+    def by_number(self, PolicyNumber):
+
+        # The current record for a policy number, or None.
+        Position = self.ByNumber.get(PolicyNumber)
+        if Position is None:
+            return None
+        return next(self.read_at([Position]))
+
+    def find(self, Keys, Width, Field, Value):
+
+        # Records whose Field equals Value. The index keeps only the first
+        # Width characters, so each candidate is checked against the record.
+        Key = Value.encode('ascii', 'replace')[:Width].decode('ascii')
+        for Policy in self.read_at(Keys.get(Key, ())):
+            if Policy[Field] == Value:
+                yield Policy
+
+    def by_province(self, Province):
+        return self.find(self.ByProvince, 2, 'Province', Province.upper())
+
+    def by_post_code(self, PostCode):
+        return self.find(self.ByPostCode, 6, 'PostCode', PostCode.upper().replace(" ", ""))
+
+def open_index(FileName):
+
+    # Load the index for a store file and bring it up to date.
+    Index = PolicyIndex(FileName)
+    Index.update()
+    return Index
+
+
+# Main Functions
+
+def main(Args=None):
+
+    Parser = argparse.ArgumentParser(description="Query policies saved in Claims.dat.")
+    Parser.add_argument("ClaimsFile", nargs="?", default=PS.CLAIMS_FILE, help="policy store file")
+    Query = Parser.add_mutually_exclusive_group(required=True)
+    Query.add_argument("--policy", type=int, help="show the policy with this number")
+    Query.add_argument("--province", help="list policies in a province")
+    Query.add_argument("--post-code", help="list policies for a postal code")
+    Query.add_argument("--report", choices=GROUP_FIELDS, help="count and total premium grouped by a field")
+    Options = Parser.parse_args(Args)
+
+    if Options.report:
+        Groups = aggregate(Options.ClaimsFile, Options.report)
+        print(f"  {Options.report:<12s} {'Policies':>9s} {'Total Premium':>16s}")
+        print(f"  ---------------------------------------")
+        for Group, Totals in sorted(Groups.items(), key=lambda Item: str(Item[0])):
+            print(f"  {str(Group):<12s} {Totals['Count']:>9,d} {Totals['TotalPremium']:>16,.2f}")
+        return 0
+
+    Index = open_index(Options.ClaimsFile)
+    if Options.policy is not None:
+        Policy = Index.by_number(Options.policy)
+        Policies = [Policy] if Policy else []
+    elif Options.province:
+        Policies = Index.by_province(Options.province)
+    else:
+        Policies = Index.by_post_code(Options.post_code)
+
+    Found = 0
+    for Policy in Policies:
+        sys.stdout.write(json.dumps(Policy) + "\n")
+        Found += 1
+    return 0 if Found else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
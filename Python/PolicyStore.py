@@ -0,0 +1,508 @@
+# Description: Binary policy store for Claims.dat with a memory-mapped reader and a migrator for the old text format
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, date
+
+import PolicyNumbers as PN
+
+
+# Claims.dat lives beside the program, wherever it is run from. OneStop's
+# use_context() points CLAIMS_FILE at another folder.
+CLAIMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Claims.dat")
+
+
+# Store Layout
+#
+# The file starts with a header (magic + format version), followed by records.
+# Each record is framed as <payload length><crc32 of payload><payload> so a
+# reader can skip records without decoding them and can spot a torn last record.
+#
+# Payload:  fixed numeric block (FIXED) at the very start, so numeric columns
+#           can be read straight from their offset without decoding strings,
+#           then each STRING_FIELDS value as <uint16 length><utf-8 bytes>,
+#           then <uint16 claim count> and for each claim
+#           <uint16 length><number bytes><CLAIM>.
+
+MAGIC = b'OSPS'
+FORMAT_VERSION = 2
+
+HEADER = struct.Struct('<4sH')
+FRAME = struct.Struct('<II')
+FIXED_BY_VERSION = {
+    1: struct.Struct('<IHBBdddddd'),
+    2: struct.Struct('<IHBBddddddI'),
+}
+FIXED = FIXED_BY_VERSION[FORMAT_VERSION]
+LENGTH = struct.Struct('<H')
+CLAIM = struct.Struct('<id')
+
+# Version 2 added RateVersion, the RateTables version of the rates that priced the policy.
+FIXED_FIELDS = ('PolicyNumber', 'NumCars', 'Flags', 'PayCode', 'DownPay', 'Premium',
+                'ExtLiabilityCost', 'GlassCoverageCost', 'LoanerCarCost', 'TotalPremium', 'RateVersion')
+STRING_FIELDS = ('FName', 'LName', 'Address', 'City', 'Province', 'PostCode', 'PhoneNum')
+FLAG_FIELDS = ('ExtLiability', 'GlassCoverage', 'LoanerCar')
+
+PAY_CODES = {'Full': 0, 'Monthly': 1, 'Down Pay': 2}
+
+# Largest values the fixed-width fields can hold. Input is checked against
+# these when it is entered (see VALIDATORS in One Stop.py and parse_claims).
+MAX_NUM_CARS = 0xFFFF
+MAX_TEXT_BYTES = 0xFFFF
+MAX_CLAIMS = 0xFFFF
+PAY_METHODS = {Code: Method for Method, Code in PAY_CODES.items()}
+
+
+# Encoding Functions
+
+def encode_policy(PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails, RateVersion=0):
+
+    # Pack the coverage flags into one byte, bit 0 = ExtLiability and so on.
+    Flags = 0
+    for Bit, Field in enumerate(FLAG_FIELDS):
+        if CustInfo[Field] == 'Y':
+            Flags |= 1 << Bit
+
+    # A value too big for its field (see MAX_NUM_CARS and so on) is a
+    # ValueError, like any other bad input, rather than a struct.error.
+    try:
+        Parts = [FIXED.pack(
+            PolicyNumber,
+            CustInfo['NumCars'],
+            Flags,
+            PAY_CODES[PayMethod],
+            math.nan if DownPay is None else DownPay,
+            PremDetails['Premium'],
+            PremDetails['ExtLiabilityCost'],
+            PremDetails['GlassCoverageCost'],
+            PremDetails['LoanerCarCost'],
+            PremDetails['TotalPremium'],
+            RateVersion
+        )]
+
+        for Field in STRING_FIELDS:
+            Value = str(CustInfo[Field]).encode('utf-8')
+            Parts.append(LENGTH.pack(len(Value)))
+            Parts.append(Value)
+
+        # Claim dates are stored as day ordinals, claim numbers as text.
+        Parts.append(LENGTH.pack(len(Claims)))
+        for Claim in Claims:
+            Number = str(Claim['Number']).encode('utf-8')
+            ClaimDate = datetime.strptime(Claim['Date'], '%Y-%m-%d').toordinal()
+            Parts.append(LENGTH.pack(len(Number)))
+            Parts.append(Number)
+            Parts.append(CLAIM.pack(ClaimDate, Claim['Amount']))
+    except struct.error as Error:
+        raise ValueError(f"Policy {PolicyNumber} has a value too large to store: {Error}") from None
+
+    Payload = b''.join(Parts)
+
+    # Return the framed record, ready to be written in one call.
+    return FRAME.pack(len(Payload), zlib.crc32(Payload)) + Payload
+
+def decode_fixed(Payload, Version=FORMAT_VERSION):
+
+    # Unpack only the numeric block at the front of a record. Records from
+    # version 1 files have no rate version and read back as 0.
+    Record = dict(zip(FIXED_FIELDS, FIXED_BY_VERSION[Version].unpack_from(Payload, 0)))
+    Record.setdefault('RateVersion', 0)
+    return Record
+
+def decode_raw(Payload, Version=FORMAT_VERSION):
+
+    # Unpack a record without building dicts or converting dates: the fixed
+    # block as a tuple in FIXED_FIELDS order, the strings in STRING_FIELDS
+    # order, and the claims as (Number, DayOrdinal, Amount) tuples.
+    Fixed = FIXED_BY_VERSION[Version].unpack_from(Payload, 0)
+    Offset = FIXED_BY_VERSION[Version].size
+
+    Strings = []
+    for _ in STRING_FIELDS:
+        (Length,) = LENGTH.unpack_from(Payload, Offset)
+        Offset += LENGTH.size
+        Strings.append(bytes(Payload[Offset:Offset + Length]).decode('utf-8'))
+        Offset += Length
+
+    (ClaimCount,) = LENGTH.unpack_from(Payload, Offset)
+    Offset += LENGTH.size
+    Claims = []
+    for _ in range(ClaimCount):
+        (Length,) = LENGTH.unpack_from(Payload, Offset)
+        Offset += LENGTH.size
+        Number = bytes(Payload[Offset:Offset + Length]).decode('utf-8')
+        Offset += Length
+        ClaimDate, Amount = CLAIM.unpack_from(Payload, Offset)
+        Offset += CLAIM.size
+        Claims.append((Number, ClaimDate, Amount))
+
+    return Fixed, Strings, Claims
+
+def decode_policy(Payload, Version=FORMAT_VERSION):
+
+    Fixed, Strings, Claims = decode_raw(Payload, Version)
+    Record = dict(zip(FIXED_FIELDS, Fixed))
+    Record.setdefault('RateVersion', 0)
+
+    # Turn the packed values back into the shapes One Stop.py uses.
+    Flags = Record.pop('Flags')
+    for Bit, Field in enumerate(FLAG_FIELDS):
+        Record[Field] = 'Y' if Flags & (1 << Bit) else 'N'
+    Record['PayMethod'] = PAY_METHODS[Record.pop('PayCode')]
+    if math.isnan(Record['DownPay']):
+        Record['DownPay'] = None
+
+    Record.update(zip(STRING_FIELDS, Strings))
+    Record['Claims'] = [{'Number': Number, 'Date': date.fromordinal(ClaimDate).isoformat(), 'Amount': Amount}
+                        for Number, ClaimDate, Amount in Claims]
+
+    return Record
+
+def frame_matches(FileName, Offset, Length, Crc):
+
+    # True if the record frame at Offset in the store still has this length
+    # (frame included) and checksum. Used by the sidecar files to notice the
+    # store being replaced under them.
+    if not os.path.exists(FileName) or os.path.getsize(FileName) < Offset + Length:
+        return False
+    with open(FileName, 'rb') as f:
+        f.seek(Offset)
+        Frame = f.read(FRAME.size)
+    return len(Frame) == FRAME.size and FRAME.unpack(Frame) == (Length - FRAME.size, Crc)
+
+
+# File Functions
+
+def has_store_header(FileName):
+
+    # True if the file starts with the store header.
+    with open(FileName, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def read_store_version(FileName):
+
+    # Format version from the file header.
+    with open(FileName, 'rb') as f:
+        Magic, Version = HEADER.unpack(f.read(HEADER.size))
+    if Magic != MAGIC:
+        raise ValueError(f"{FileName} is not a policy store file.")
+    if Version > FORMAT_VERSION:
+        raise ValueError(f"{FileName} uses store format {Version}, newer than this program supports.")
+    return Version
+
+def valid_length(FileName):
+
+    # Walk the record frames and return where the last complete record ends.
+    # Only the last record's checksum is checked, which is where a crash
+    # during a write would leave a torn record.
+    with open(FileName, 'rb') as f:
+        Map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            Offset = HEADER.size
+            LastStart = None
+            Size = len(Map)
+            while Offset + FRAME.size <= Size:
+                Length, _ = FRAME.unpack_from(Map, Offset)
+                if Offset + FRAME.size + Length > Size:
+                    break
+                LastStart = Offset
+                Offset += FRAME.size + Length
+
+            if LastStart is not None:
+                Length, Crc = FRAME.unpack_from(Map, LastStart)
+                Start = LastStart + FRAME.size
+                if zlib.crc32(Map[Start:Start + Length]) != Crc:
+                    Offset = LastStart
+        finally:
+            Map.close()
+
+    return Offset
+
+def open_store(FileName, Buffering=-1):
+
+    # Open the store for appending, writing the header if the file is new.
+    # A torn record left at the end by a crash is cut off first so new
+    # records are not written after it.
+    f = open(FileName, 'ab', buffering=Buffering)
+    if f.tell() == 0:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        f.flush()
+    elif not has_store_header(FileName):
+        f.close()
+        raise ValueError(f"{FileName} is in the old text format. Run 'python PolicyStore.py migrate {FileName}' first.")
+    elif read_store_version(FileName) < FORMAT_VERSION:
+        f.close()
+        raise ValueError(f"{FileName} uses an older store format. Run 'python PolicyStore.py migrate {FileName}' first.")
+    else:
+        Length = valid_length(FileName)
+        if Length < f.tell():
+            f.truncate(Length)
+    return f
+
+def append_policy(f, PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails, RateVersion=0):
+
+    # One write per record so a record is never split across writes.
+    f.write(encode_policy(PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails, RateVersion))
+
+class PolicyWriter:
+
+    # Keeps Claims.dat open and writes policies in batches. A batch is written
+    # when it reaches BatchCount records or BatchBytes bytes, or when a write
+    # arrives BatchSeconds after the batch was started. Each batch goes out in
+    # a single write of whole records, optionally followed by an fsync.
+    #
+    # Writers hold "Claims.dat.lock" shared while they append, and
+    # PolicyLog.rotate takes it alone to move Claims.dat into the log. Each
+    # batch checks under the lock that Claims.dat is still the file it has
+    # open and reopens it if it was rotated, so no batch lands in a segment
+    # that is being sealed.
+
+    def __init__(self, FileName, BatchCount=500, BatchBytes=1 << 20, BatchSeconds=1.0, Fsync=False):
+        self.FileName = FileName
+        self.BatchCount = BatchCount
+        self.BatchBytes = BatchBytes
+        self.BatchSeconds = BatchSeconds
+        self.Fsync = Fsync
+        with PN.FileLock(FileName, Shared=True):
+            self.File = open_store(FileName, Buffering=0)
+        self.Lock = threading.Lock()
+        self.Batch = []
+        self.BatchSize = 0
+        self.BatchStarted = 0.0
+        self.Written = 0
+
+    def write(self, PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails, RateVersion=0):
+
+        # Records are encoded before taking the lock so threads only wait on the append.
+        Record = encode_policy(PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails, RateVersion)
+
+        with self.Lock:
+            if not self.Batch:
+                self.BatchStarted = time.monotonic()
+            self.Batch.append(Record)
+            self.BatchSize += len(Record)
+
+            if (len(self.Batch) >= self.BatchCount or self.BatchSize >= self.BatchBytes
+                    or time.monotonic() - self.BatchStarted >= self.BatchSeconds):
+                self.write_batch()
+
+    def write_batch(self):
+
+        # Caller holds the lock. The file is unbuffered, so the batch normally
+        # goes out in one write call; a torn tail is cut off by open_store.
+        if not self.Batch:
+            return
+        Data = b''.join(self.Batch)
+        View = memoryview(Data)
+        with PN.FileLock(self.FileName, Shared=True):
+            self.reopen_if_rotated()
+            while View:
+                View = View[self.File.write(View):]
+            if self.Fsync:
+                os.fsync(self.File.fileno())
+
+        self.Written += len(self.Batch)
+        self.Batch = []
+        self.BatchSize = 0
+
+    def reopen_if_rotated(self):
+
+        # Caller holds the file lock. A rotated Claims.dat is a new file
+        # under the same name.
+        try:
+            Rotated = os.stat(self.FileName).st_ino != os.fstat(self.File.fileno()).st_ino
+        except FileNotFoundError:
+            Rotated = True
+        if Rotated:
+            self.File.close()
+            self.File = open_store(self.FileName, Buffering=0)
+
+    def flush(self):
+
+        with self.Lock:
+            self.write_batch()
+
+    def close(self):
+
+        with self.Lock:
+            if self.File.closed:
+                return
+            self.write_batch()
+            self.File.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *ExcInfo):
+        self.close()
+
+def iter_frames(FileName, Offset=HEADER.size):
+
+    # Memory-map the file and yield (Offset, End, Crc, Payload) for each
+    # record from Offset on, where Offset and End are the file positions of
+    # the record's frame. Payload is a memoryview, only valid until the next
+    # record is requested. Reading stops at a torn or corrupt record at the
+    # end of the file.
+    if not os.path.exists(FileName) or os.path.getsize(FileName) == 0:
+        return
+
+    with open(FileName, 'rb') as f:
+        Map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        View = memoryview(Map)
+        try:
+            yield from iter_buffer_frames(View, Offset, FileName)
+        finally:
+            View.release()
+            Map.close()
+
+def iter_buffer_frames(View, Offset=HEADER.size, Name="buffer"):
+
+    # iter_frames over a whole store already in memory (a memoryview of
+    # the header and records), such as a decompressed log segment.
+    Magic, Version = HEADER.unpack_from(View, 0)
+    if Magic != MAGIC:
+        raise ValueError(f"{Name} is not a policy store file.")
+    if Version > FORMAT_VERSION:
+        raise ValueError(f"{Name} uses store format {Version}, newer than this program supports.")
+
+    Size = len(View)
+    while Offset + FRAME.size <= Size:
+        Length, Crc = FRAME.unpack_from(View, Offset)
+        Start = Offset + FRAME.size
+        if Start + Length > Size:
+            break
+        Payload = View[Start:Start + Length]
+        if zlib.crc32(Payload) != Crc:
+            Payload.release()
+            break
+        try:
+            yield Offset, Start + Length, Crc, Payload
+        finally:
+            Payload.release()
+        Offset = Start + Length
+
+def iter_payloads(FileName):
+
+    # Yield each record payload as a memoryview, which is only valid until
+    # the next record is requested.
+    for _, _, _, Payload in iter_frames(FileName):
+        yield Payload
+
+def read_frame(f, Offset):
+
+    # Read the record payload whose frame starts at Offset in an open store
+    # file, checking its checksum.
+    f.seek(Offset)
+    Length, Crc = FRAME.unpack(f.read(FRAME.size))
+    Payload = f.read(Length)
+    if len(Payload) != Length or zlib.crc32(Payload) != Crc:
+        raise ValueError(f"No valid record at offset {Offset}.")
+    return Payload
+
+def read_policies(FileName):
+
+    # Stream every policy in the store as a dict.
+    if not os.path.exists(FileName) or os.path.getsize(FileName) == 0:
+        return
+    Version = read_store_version(FileName)
+    for Payload in iter_payloads(FileName):
+        yield decode_policy(Payload, Version)
+
+def read_columns(FileName, Columns):
+
+    # Load only the requested columns. Numeric columns come straight from
+    # the fixed block; string columns and Claims need the full decode.
+    Columns = list(Columns)
+    Result = {Column: [] for Column in Columns}
+    NeedsDecode = any(Column not in FIXED_FIELDS for Column in Columns)
+    if not os.path.exists(FileName) or os.path.getsize(FileName) == 0:
+        return Result
+    Version = read_store_version(FileName)
+
+    for Payload in iter_payloads(FileName):
+        Record = decode_policy(Payload, Version) if NeedsDecode else decode_fixed(Payload, Version)
+        for Column in Columns:
+            Result[Column].append(Record[Column])
+
+    return Result
+
+
+# Migration Functions
+
+def read_legacy_policies(FileName):
+
+    # The old format wrote four lines per policy:
+    #   {CustInfo}, ['City'], ['Province'], ['PostCode'], PayMethod
+    #   DownPay
+    #   {PremDetails}
+    #   TotPremium
+    # Values are parsed with ast.literal_eval, never eval.
+    import ast
+
+    with open(FileName, 'r') as f:
+        Lines = [Line.rstrip('\r\n') for Line in f if Line.strip()]
+
+    for Index in range(0, len(Lines) - 3, 4):
+        CustText, _, Rest = Lines[Index].rpartition(", ['City'], ")
+        PayMethod = Rest.rpartition(", ")[2]
+        CustInfo = ast.literal_eval(CustText)
+        DownPay = ast.literal_eval(Lines[Index + 1])
+        PremDetails = ast.literal_eval(Lines[Index + 2])
+        yield CustInfo, PayMethod, DownPay, PremDetails
+
+def migrate_legacy_file(FileName, FirstPolicyNumber=0):
+
+    # Rewrite an old text Claims.dat, or a store file in an older format, in
+    # the current format. The text format did not save policy numbers, so
+    # they are numbered from FirstPolicyNumber (0 leaves them all as 0,
+    # meaning unknown). Records from older store files keep their numbers.
+    if os.path.getsize(FileName) == 0:
+        return 0
+    if has_store_header(FileName):
+        if read_store_version(FileName) == FORMAT_VERSION:
+            return 0
+        Policies = ((Record['PolicyNumber'], Record, Record['Claims'], Record['PayMethod'], Record['DownPay'], Record,
+                     Record['RateVersion']) for Record in read_policies(FileName))
+    else:
+        Policies = ((FirstPolicyNumber + Index if FirstPolicyNumber else 0, CustInfo, [], PayMethod, DownPay, PremDetails, 0)
+                    for Index, (CustInfo, PayMethod, DownPay, PremDetails) in enumerate(read_legacy_policies(FileName)))
+
+    TempFileName = FileName + ".migrating"
+    Count = 0
+    with open(TempFileName, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        for Policy in Policies:
+            append_policy(f, *Policy)
+            Count += 1
+        f.flush()
+        os.fsync(f.fileno())
+
+    # Keep the old file next to the new one and swap the new one in.
+    os.replace(FileName, FileName + ".bak")
+    os.replace(TempFileName, FileName)
+
+    return Count
+
+def main(Args=None):
+
+    Args = sys.argv[1:] if Args is None else Args
+    if len(Args) < 2 or Args[0] != 'migrate':
+        print("Usage: python PolicyStore.py migrate Claims.dat [FirstPolicyNumber]")
+        return 2
+
+    FirstPolicyNumber = int(Args[2]) if len(Args) > 2 else 0
+    Count = migrate_legacy_file(Args[1], FirstPolicyNumber)
+    print(f"Migrated {Count} policies in {Args[1]}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
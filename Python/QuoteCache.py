@@ -0,0 +1,103 @@
+# Description: Bounded cache of premium and total cost quotes, keyed by coverage and rate version
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import threading
+from collections import OrderedDict
+
+import OneStop as OS
+
+
+# Cache Values
+
+DEFAULT_MAX_SIZE = 4096
+
+
+class QuoteCache:
+
+    # A premium depends only on NumCars, the three coverage flags and the
+    # rates, so the same few hundred quotes come up again and again. Entries
+    # are keyed by those values plus the rate snapshot's version, and the
+    # least recently used entry is dropped once MaxSize is reached. When a
+    # new rate version shows up the old entries are cleared.
+    #
+    # The premium dicts handed back are shared between callers, so they must
+    # be treated as read-only.
+
+    def __init__(self, MaxSize=DEFAULT_MAX_SIZE):
+        self.MaxSize = MaxSize
+        self.Entries = OrderedDict()
+        self.Lock = threading.Lock()
+        self.Version = None
+        self.Hits = 0
+        self.Misses = 0
+        self.Invalidations = 0
+
+    def lookup(self, Key, Version, Compute):
+
+        # Return the cached value for Key, computing and storing it on a miss.
+        with self.Lock:
+            if Version != self.Version:
+                if self.Entries:
+                    self.Entries.clear()
+                    self.Invalidations += 1
+                self.Version = Version
+
+            Value = self.Entries.get(Key)
+            if Value is not None:
+                self.Entries.move_to_end(Key)
+                self.Hits += 1
+                return Value
+            self.Misses += 1
+
+        Value = Compute()
+
+        with self.Lock:
+            if Version == self.Version:
+                self.Entries[Key] = Value
+                if len(self.Entries) > self.MaxSize:
+                    self.Entries.popitem(last=False)
+        return Value
+
+    def quote(self, NumCars, ExtLiability, GlassCoverage, LoanerCar, Rates=None):
+
+        # Premium, HST and total cost in one lookup; returns (PremDetails, Hst, TotCost).
+        Rates = Rates or OS.RATE_TABLE.current()
+
+        def compute():
+            PremDetails = OS.calculate_insurance_premium(NumCars, ExtLiability, GlassCoverage, LoanerCar, Rates)
+            Hst, TotCost = OS.calculate_total_cost(PremDetails['TotalPremium'], Rates)
+            return PremDetails, Hst, TotCost
+
+        Key = ('Quote', NumCars, ExtLiability == 'Y', GlassCoverage == 'Y', LoanerCar == 'Y')
+        return self.lookup(Key, Rates.Version, compute)
+
+    def stats(self):
+
+        # Counters for checking the hit rate.
+        with self.Lock:
+            Lookups = self.Hits + self.Misses
+            return {
+                'Hits': self.Hits,
+                'Misses': self.Misses,
+                'HitRate': self.Hits / Lookups if Lookups else 0.0,
+                'Size': len(self.Entries),
+                'MaxSize': self.MaxSize,
+                'Invalidations': self.Invalidations,
+                'RateVersion': self.Version,
+            }
+
+    def clear(self):
+        with self.Lock:
+            self.Entries.clear()
+            self.Hits = 0
+            self.Misses = 0
+            self.Invalidations = 0
+
+
+# One cache shared by everything in this process.
+QUOTE_CACHE = QuoteCache()
+
+def cache_stats():
+    return QUOTE_CACHE.stats()
@@ -0,0 +1,273 @@
+# Description: Asyncio quoting service for One Stop Insurance, with line-delimited JSON over TCP or a Unix socket, and a load generator
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import BatchPolicies as BP
+import OneStop as OS
+
+
+# Server Values
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Longest request line accepted, and the most connections served at once.
+# Further connections wait for a free slot rather than slowing everyone down.
+MAX_LINE_BYTES = 64 * 1024
+DEFAULT_MAX_CLIENTS = 1024
+
+# Responses are written as soon as they are ready and the client is only
+# made to wait (by not reading its next request) once this much output is
+# waiting to be sent.
+WRITE_HIGH_WATER = 256 * 1024
+
+
+# Quote Functions
+
+def quote_policy(Record, Rates=None):
+
+    # Record has the same fields as a BatchPolicies record; Claims are
+    # optional. Returns the response dict, with the error message on a
+    # failed validation, same as the batch reject file.
+    Rates = Rates or OS.RATE_TABLE.current()
+    try:
+        CustInfo = BP.build_customer_info(Record)
+        BP.parse_claims(Record.get('Claims'))
+        PayMethod, DownPay = BP.build_payment_info(Record)
+    except ValueError as Error:
+        return {'Ok': False, 'Error': str(Error)}
+
+    PremDetails, Hst, TotCost, MonPayment = BP.price_policy(CustInfo, PayMethod, DownPay, Rates)
+
+    Response = {'Ok': True, 'PayMethod': PayMethod}
+    Response.update(PremDetails)
+    Response.update({'Hst': Hst, 'TotalCost': TotCost, 'MonthlyPayment': MonPayment, 'RateVersion': Rates.Version})
+    return Response
+
+def handle_line(Line):
+
+    # One request line in, one response line out. An "Id" in the request is
+    # copied to the response so pipelining clients can match them up.
+    try:
+        Record = json.loads(Line)
+        if not isinstance(Record, dict):
+            raise ValueError("Request must be a JSON object.")
+    except (ValueError, RecursionError) as Error:
+        return json.dumps({'Ok': False, 'Error': f"Bad request: {Error}"}).encode('utf-8') + b"\n"
+
+    # Whatever goes wrong with one request is answered as an error, so it
+    # cannot end the connection and lose the requests pipelined behind it.
+    try:
+        Response = quote_policy(Record)
+    except Exception as Error:
+        Response = {'Ok': False, 'Error': f"Bad request: {Error}"}
+    if 'Id' in Record:
+        Response['Id'] = Record['Id']
+    return json.dumps(Response).encode('utf-8') + b"\n"
+
+
+# Server Functions
+
+class QuoteServer:
+
+    # Each connection reads request lines and answers them in order. A client
+    # may send many requests without waiting for the answers (pipelining);
+    # pricing takes microseconds, so requests are answered inline on the
+    # event loop rather than handed to threads. Backpressure comes from the
+    # sockets: a client that stops reading its answers is paused once
+    # WRITE_HIGH_WATER bytes are waiting, and while paused its requests are
+    # left unread in the kernel buffer, so it cannot run up server memory.
+
+    def __init__(self, MaxClients=DEFAULT_MAX_CLIENTS):
+        self.Slots = asyncio.Semaphore(MaxClients)
+        self.Requests = 0
+        self.Clients = 0
+
+    async def handle_client(self, Reader, Writer):
+        Writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        async with self.Slots:
+            self.Clients += 1
+            try:
+                while True:
+                    try:
+                        Line = await Reader.readline()
+                    except ValueError:
+                        # Line longer than MAX_LINE_BYTES; there is no safe
+                        # place to resume reading, so drop the connection.
+                        Writer.write(json.dumps({'Ok': False, 'Error': "Request too long."}).encode('utf-8') + b"\n")
+                        break
+                    if not Line:
+                        break
+                    if not Line.strip():
+                        continue
+
+                    Writer.write(handle_line(Line))
+                    self.Requests += 1
+                    await Writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                self.Clients -= 1
+                Writer.close()
+
+    async def serve(self, Host=DEFAULT_HOST, Port=DEFAULT_PORT, UnixPath=None, Ready=None):
+
+        # Serve until cancelled. Defaults.dat is checked for rate changes in
+        # the background, so new rates apply without a restart.
+        OS.RATE_TABLE.start_watching()
+        try:
+            if UnixPath:
+                if os.path.exists(UnixPath):
+                    os.remove(UnixPath)
+                Server = await asyncio.start_unix_server(self.handle_client, UnixPath, limit=MAX_LINE_BYTES)
+            else:
+                Server = await asyncio.start_server(self.handle_client, Host, Port, limit=MAX_LINE_BYTES)
+            async with Server:
+                if Ready:
+                    Ready(Server)
+                await Server.serve_forever()
+        finally:
+            OS.RATE_TABLE.stop_watching()
+
+
+# Load Generator
+
+SAMPLE_REQUEST = {
+    'FName': "John", 'LName': "Smith", 'Address': "12 Water Street", 'City': "St. John's", 'Province': "NL",
+    'PostCode': "A1B2C3", 'PhoneNum': "7095551234", 'NumCars': 2, 'ExtLiability': "Y", 'GlassCoverage': "N",
+    'LoanerCar': "Y", 'PayMethod': "D", 'DownPay': 500
+}
+
+def sample_request(Index):
+
+    # Vary the coverage so the requests are not all the same quote.
+    Request = dict(SAMPLE_REQUEST, Id=Index, NumCars=Index % 5 + 1)
+    Request['ExtLiability'] = "YN"[Index % 2]
+    Request['GlassCoverage'] = "YN"[Index // 2 % 2]
+    Request['PayMethod'] = "FMD"[Index % 3]
+    return (json.dumps(Request) + "\n").encode('utf-8')
+
+async def run_client(Host, Port, UnixPath, Count, Pipeline, Latencies, Rate=None):
+
+    # Send Count requests over one connection, keeping up to Pipeline
+    # requests outstanding, and record each round trip in seconds. With a
+    # Rate (requests/sec for this connection) requests go out on a fixed
+    # schedule instead of as fast as the server answers.
+    if UnixPath:
+        Reader, Writer = await asyncio.open_unix_connection(UnixPath, limit=MAX_LINE_BYTES)
+    else:
+        Reader, Writer = await asyncio.open_connection(Host, Port, limit=MAX_LINE_BYTES)
+
+    SentAt = {}
+    Window = asyncio.Semaphore(Pipeline)
+    Errors = 0
+
+    async def send():
+        StartTime = time.perf_counter()
+        for Index in range(Count):
+            if Rate:
+                Delay = StartTime + Index / Rate - time.perf_counter()
+                if Delay > 0:
+                    await asyncio.sleep(Delay)
+            await Window.acquire()
+            SentAt[Index] = time.perf_counter()
+            Writer.write(sample_request(Index))
+            await Writer.drain()
+
+    Sender = asyncio.create_task(send())
+    try:
+        for _ in range(Count):
+            Response = json.loads(await Reader.readline())
+            Latencies.append(time.perf_counter() - SentAt.pop(Response['Id']))
+            if not Response['Ok']:
+                Errors += 1
+            Window.release()
+        await Sender
+    finally:
+        Writer.close()
+    return Errors
+
+def percentile(SortedValues, Fraction):
+    if not SortedValues:
+        return 0.0
+    return SortedValues[min(len(SortedValues) - 1, int(Fraction * len(SortedValues)))]
+
+async def run_load(Host=DEFAULT_HOST, Port=DEFAULT_PORT, UnixPath=None, Connections=50, Requests=20000, Pipeline=8,
+                   Rate=None):
+
+    # Spread Requests across Connections clients and report throughput and
+    # latency percentiles (in milliseconds). Rate is the total requests/sec
+    # to offer; without it every client sends as fast as it can, which
+    # measures peak throughput rather than latency at a given load.
+    Latencies = []
+    PerClient = max(1, Requests // Connections)
+    ClientRate = Rate / Connections if Rate else None
+    StartTime = time.perf_counter()
+    Errors = await asyncio.gather(*(run_client(Host, Port, UnixPath, PerClient, Pipeline, Latencies, ClientRate)
+                                    for _ in range(Connections)))
+    Seconds = time.perf_counter() - StartTime
+
+    Latencies.sort()
+    return {
+        'Requests': len(Latencies),
+        'Errors': sum(Errors),
+        'Seconds': Seconds,
+        'RequestsPerSecond': len(Latencies) / Seconds if Seconds else 0.0,
+        'P50Ms': percentile(Latencies, 0.50) * 1000,
+        'P99Ms': percentile(Latencies, 0.99) * 1000,
+        'MaxMs': (Latencies[-1] if Latencies else 0.0) * 1000,
+    }
+
+def print_load_report(Summary):
+    print()
+    print(f"  Requests: {Summary['Requests']:,}   Errors: {Summary['Errors']}   Time: {Summary['Seconds']:.2f}s")
+    print(f"  Throughput: {Summary['RequestsPerSecond']:,.0f} requests/sec")
+    print(f"  Latency:    p50 {Summary['P50Ms']:.2f} ms   p99 {Summary['P99Ms']:.2f} ms   max {Summary['MaxMs']:.2f} ms")
+    print()
+
+
+# Main Functions
+
+def main(Args=None):
+
+    Parser = argparse.ArgumentParser(description="One Stop Insurance quoting service.")
+    Commands = Parser.add_subparsers(dest="Command", required=True)
+
+    Serve = Commands.add_parser("serve", help="run the quoting server")
+    Load = Commands.add_parser("load", help="send test quotes to a running server")
+    for Command in (Serve, Load):
+        Command.add_argument("--host", default=DEFAULT_HOST, help="address to listen on or connect to")
+        Command.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port")
+        Command.add_argument("--unix", default=None, help="use this Unix socket path instead of TCP")
+    Serve.add_argument("--max-clients", type=int, default=DEFAULT_MAX_CLIENTS, help="connections served at once")
+    Load.add_argument("--connections", type=int, default=50, help="concurrent client connections")
+    Load.add_argument("--requests", type=int, default=20000, help="total requests to send")
+    Load.add_argument("--pipeline", type=int, default=8, help="requests each connection keeps outstanding")
+    Load.add_argument("--rate", type=float, default=None, help="total requests/sec to offer (default: as fast as possible)")
+    Options = Parser.parse_args(Args)
+
+    if Options.Command == "serve":
+        Address = Options.unix or f"{Options.host}:{Options.port}"
+        Server = QuoteServer(Options.max_clients)
+        try:
+            asyncio.run(Server.serve(Options.host, Options.port, Options.unix,
+                                     Ready=lambda _: print(f"Quoting on {Address}", flush=True)))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    Summary = asyncio.run(run_load(Options.host, Options.port, Options.unix, Options.connections,
+                                   Options.requests, Options.pipeline, Options.rate))
+    print_load_report(Summary)
+    return 0 if Summary['Errors'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
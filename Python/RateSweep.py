@@ -0,0 +1,252 @@
+# Description: What-if pricing sweep that prices the whole policy book under many rate scenarios in parallel, sharing the book through shared memory
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import OneStop as OS
+import PolicyLog as PL
+import PolicyStore as PS
+import RateTables as RT
+import VectorPricing as VP
+
+
+# Sweep Values
+
+# Book columns shared with the workers, and their types.
+BOOK_COLUMNS = (('NumCars', np.float64), ('ExtLiability', np.bool_), ('GlassCoverage', np.bool_),
+                ('LoanerCar', np.bool_), ('Monthly', np.bool_), ('Province', np.uint16))
+
+# Each task prices this many policies under one scenario, so a few
+# scenarios still keep every worker busy.
+SLICE_SIZE = 250000
+
+# Totals kept per province for each scenario.
+TOTALS = ('Premium', 'Hst', 'Fees')
+
+PROVINCE_FIELD = PS.STRING_FIELDS.index('Province')
+
+
+# Book Functions
+
+def read_book(ClaimsFileName):
+
+    # The latest record of each policy in the log, as the columns pricing
+    # needs plus a province code. Returns (columns, province names). Only
+    # the fixed block and the province are read from each record.
+    Rows = []
+    Provinces = {}
+    for _, Version, _, _, _, Payload in PL.LogReader(ClaimsFileName).read():
+        Fixed = PS.FIXED_BY_VERSION[Version]
+        Offset = Fixed.size
+        for _ in range(PROVINCE_FIELD):
+            Offset += PS.LENGTH.size + PS.LENGTH.unpack_from(Payload, Offset)[0]
+        (Length,) = PS.LENGTH.unpack_from(Payload, Offset)
+        Province = bytes(Payload[Offset + PS.LENGTH.size:Offset + PS.LENGTH.size + Length])
+        Rows.append(Fixed.unpack_from(Payload, 0)[:4] + (Provinces.setdefault(Province, len(Provinces)),))
+
+    Table = np.array(Rows, dtype=np.int64) if Rows else np.empty((0, 5), dtype=np.int64)
+    PolicyNumber, NumCars, Flags, PayCode, Province = Table.T
+
+    # A policy number saved more than once keeps its last record. Number 0
+    # marks migrated records with no number of their own; all are kept.
+    _, Latest = np.unique(PolicyNumber[::-1], return_index=True)
+    Keep = len(PolicyNumber) - 1 - Latest
+    Keep = np.sort(np.concatenate([Keep[PolicyNumber[Keep] != 0], np.flatnonzero(PolicyNumber == 0)]))
+
+    Book = {'NumCars': NumCars[Keep], 'Monthly': PayCode[Keep] != PS.PAY_CODES['Full'], 'Province': Province[Keep]}
+    for Bit, Field in enumerate(PS.FLAG_FIELDS):
+        Book[Field] = (Flags[Keep] & (1 << Bit)) != 0
+    Book = {Column: Book[Column].astype(Type) for Column, Type in BOOK_COLUMNS}
+    return Book, [Province.decode('utf-8') for Province in Provinces]
+
+
+# Shared Memory
+
+def share_book(Book):
+
+    # Copy the book columns into one shared memory block. Returns the block
+    # and the layout workers need to map the columns back out of it.
+    Layout = []
+    Offset = 0
+    for Column, Type in BOOK_COLUMNS:
+        Layout.append((Column, np.dtype(Type).str, len(Book[Column]), Offset))
+        Offset += Book[Column].nbytes
+    Block = shared_memory.SharedMemory(create=True, size=max(Offset, 1))
+    for Column, Type, Size, Start in Layout:
+        np.ndarray(Size, dtype=Type, buffer=Block.buf, offset=Start)[:] = Book[Column]
+    return Block, Layout
+
+def attach_book(BlockName, Layout):
+
+    # Map the shared columns without copying them. The process that created
+    # the block removes it once the sweep is done.
+    Block = shared_memory.SharedMemory(name=BlockName)
+    return Block, {Column: np.ndarray(Size, dtype=Type, buffer=Block.buf, offset=Start)
+                   for Column, Type, Size, Start in Layout}
+
+# Set in each worker by init_worker.
+WORKER_BLOCK = None
+WORKER_BOOK = None
+
+def init_worker(BlockName, Layout):
+
+    global WORKER_BLOCK, WORKER_BOOK
+    WORKER_BLOCK, WORKER_BOOK = attach_book(BlockName, Layout)
+
+
+# Pricing Functions
+
+def price_slice(Book, Rates, Start, Stop, ProvinceCount):
+
+    # Price policies Start to Stop with VectorPricing and total the premium,
+    # HST and monthly processing fees per province. Returns a
+    # (len(TOTALS), ProvinceCount) array.
+    Rates = VP.rates_dict(Rates)
+    Premiums = VP.calculate_insurance_premiums(Book['NumCars'][Start:Stop], Book['ExtLiability'][Start:Stop],
+                                               Book['GlassCoverage'][Start:Stop], Book['LoanerCar'][Start:Stop], Rates)
+    Hst, _ = VP.calculate_total_costs(Premiums['TotalPremium'], Rates)
+    Fees = Book['Monthly'][Start:Stop] * (Rates['MONTHLY_PAYMENT_PROCESSING_FEE'] * Rates['NUM_PAYMENTS'])
+
+    Codes = Book['Province'][Start:Stop]
+    return np.stack([np.bincount(Codes, Values, ProvinceCount) for Values in (Premiums['TotalPremium'], Hst, Fees)])
+
+def price_task(Task):
+
+    # Run in a worker on the shared book.
+    Scenario, Rates, Start, Stop, ProvinceCount = Task
+    return Scenario, price_slice(WORKER_BOOK, Rates, Start, Stop, ProvinceCount)
+
+def sweep(Book, Provinces, Scenarios, Workers=None, SliceSize=SLICE_SIZE):
+
+    # Price the book under each (Name, RateSnapshot) scenario. The first
+    # scenario is the baseline the others are compared with. Returns one
+    # result dict per scenario, in order.
+    Workers = Workers or os.cpu_count() or 1
+    Size = len(Book['NumCars'])
+    Slices = [(Start, min(Start + SliceSize, Size)) for Start in range(0, Size, SliceSize)] or [(0, 0)]
+    Tasks = [(Scenario, VP.rates_dict(Rates), Start, Stop, len(Provinces))
+             for Scenario, (_, Rates) in enumerate(Scenarios) for Start, Stop in Slices]
+    Totals = np.zeros((len(Scenarios), len(TOTALS), len(Provinces)))
+
+    if Workers == 1:
+        for Scenario, Rates, Start, Stop, ProvinceCount in Tasks:
+            Totals[Scenario] += price_slice(Book, Rates, Start, Stop, ProvinceCount)
+    else:
+        # The book goes to the workers once, through shared memory; each
+        # task carries only its rates and slice bounds.
+        Block, Layout = share_book(Book)
+        try:
+            with ProcessPoolExecutor(Workers, initializer=init_worker, initargs=(Block.name, Layout)) as Pool:
+                for Scenario, Result in Pool.map(price_task, Tasks):
+                    Totals[Scenario] += Result
+        finally:
+            Block.close()
+            Block.unlink()
+
+    Results = []
+    for (Name, Rates), Scenario in zip(Scenarios, Totals):
+        ByProvince = dict(zip(Provinces, (Scenario[0] + Scenario[2]).tolist()))
+        Results.append({'Name': Name, 'RateVersion': Rates.Version, 'Policies': Size,
+                        **dict(zip(TOTALS, Scenario.sum(axis=1).tolist())), 'ByProvince': ByProvince})
+    for Result in Results:
+        Result['Revenue'] = Result['Premium'] + Result['Fees']
+        Result['Change'] = Result['Revenue'] - Results[0]['Revenue']
+        Result['ProvinceChange'] = {Province: Revenue - Results[0]['ByProvince'][Province]
+                                    for Province, Revenue in Result['ByProvince'].items()}
+    return Results
+
+
+# Scenario Functions
+
+def parse_vary(Text):
+
+    # "FIELD=v1,v2,..." into (FIELD, [v1, v2, ...]). Errors are raised as
+    # ArgumentTypeError so argparse shows the message instead of its own.
+    Field, _, Values = Text.partition("=")
+    Field = Field.strip().upper()
+    try:
+        if Field not in RT.RATE_FIELDS or not Values:
+            raise ValueError
+        return Field, [float(Value) for Value in Values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Expected FIELD=value,value,... with FIELD one of {', '.join(RT.RATE_FIELDS)}.") from None
+
+def build_scenarios(Baseline, ScenarioFiles=(), Varies=()):
+
+    # The baseline first, then one scenario per alternate Defaults.dat, then
+    # every combination of the varied rates applied to the baseline.
+    Scenarios = [("Current", Baseline)]
+    for FileName in ScenarioFiles:
+        Scenarios.append((os.path.basename(FileName), RT.load_rates(FileName)))
+    if Varies:
+        Fields = [Field for Field, _ in Varies]
+        for Values in itertools.product(*(Values for _, Values in Varies)):
+            Rates = Baseline._asdict()
+            Rates.update(zip(Fields, Values))
+            Name = ", ".join(f"{Field}={Value:g}" for Field, Value in zip(Fields, Values))
+            Scenarios.append((Name, RT.make_snapshot(Rates[Field] for Field in RT.RATE_FIELDS)))
+    return Scenarios
+
+
+# Report Functions
+
+def print_sweep_report(Results, ByProvince=False):
+    print()
+    # Revenue is premium plus processing fees; HST is collected, not earned.
+    Width = max(len(Result['Name']) for Result in Results + [{'Name': 'Scenario'}])
+    print(f"  {'Scenario':<{Width}s} {'Revenue':>16s} {'Change':>14s} {'Change %':>9s} {'HST':>14s}")
+    print(f"  {'-' * (Width + 57)}")
+    Base = Results[0]['Revenue']
+    for Result in Results:
+        Percent = Result['Change'] / Base * 100 if Base else 0.0
+        print(f"  {Result['Name']:<{Width}s} {Result['Revenue']:>16,.2f} {Result['Change']:>+14,.2f} {Percent:>+8.2f}%"
+              f" {Result['Hst']:>14,.2f}")
+
+    if ByProvince:
+        Provinces = sorted(Results[0]['ByProvince'])
+        print()
+        print("  Change in revenue by province")
+        print(f"  {'Scenario':<{Width}s}" + "".join(f"{Province:>12s}" for Province in Provinces))
+        for Result in Results[1:]:
+            print(f"  {Result['Name']:<{Width}s}"
+                  + "".join(f"{Result['ProvinceChange'][Province]:>+12,.0f}" for Province in Provinces))
+    print()
+
+
+# Main Functions
+
+def main(Args=None):
+
+    Parser = argparse.ArgumentParser(description="Price every policy in Claims.dat under alternate rates and compare revenue.")
+    Parser.add_argument("ClaimsFile", nargs="?", default=PS.CLAIMS_FILE, help="policy store file")
+    Parser.add_argument("--scenario", action="append", default=[], help="alternate Defaults.dat file; repeat for several")
+    Parser.add_argument("--vary", action="append", default=[], type=parse_vary,
+                        help="FIELD=v1,v2,... to try; several --vary options give every combination")
+    Parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    Parser.add_argument("--by-province", action="store_true", help="also show the change in revenue per province")
+    Options = Parser.parse_args(Args)
+
+    StartTime = time.perf_counter()
+    Book, Provinces = read_book(Options.ClaimsFile)
+    ReadTime = time.perf_counter() - StartTime
+    Scenarios = build_scenarios(OS.RATE_TABLE.current(), Options.scenario, Options.vary)
+    Results = sweep(Book, Provinces, Scenarios, Options.workers)
+
+    print_sweep_report(Results, Options.by_province)
+    print(f"  Policies: {len(Book['NumCars']):,}   Scenarios: {len(Scenarios)}   Read: {ReadTime:.2f}s   "
+          f"Total: {time.perf_counter() - StartTime:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# Description: Rate tables loaded from Defaults.dat into immutable, versioned snapshots, with hot reload
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import os
+import threading
+import zlib
+from collections import namedtuple
+
+
+# Rate Values
+
+# Defaults.dat holds the next policy number on line 1 and these rates, in order, after it.
+RATE_FIELDS = ('BASIC_PREMIUM', 'ADDITIONAL_CAR_DISCOUNT', 'EXT_LIABILITY_COST_PER_CAR',
+               'GLASS_COVERAGE_COST_PER_CAR', 'LOANER_CAR_COST_PER_CAR', 'HST_RATE',
+               'MONTHLY_PAYMENT_PROCESSING_FEE')
+
+# An immutable set of rates. Version is a checksum of the rate values, so
+# the same rates always get the same version, in any process, and a policy
+# stamped with a version can be matched back to the rates that priced it.
+RateSnapshot = namedtuple('RateSnapshot', ('Version',) + RATE_FIELDS)
+
+
+# Load Functions
+
+def rate_version(Rates):
+
+    # Checksum of the rate values. Only the rates count, not the policy
+    # number line, which changes every time numbers are handed out.
+    Text = ",".join(repr(float(Rate)) for Rate in Rates)
+    return zlib.crc32(Text.encode('ascii'))
+
+def make_snapshot(Rates):
+
+    # Build a snapshot from the rate values in RATE_FIELDS order.
+    Rates = tuple(float(Rate) for Rate in Rates)
+    return RateSnapshot(rate_version(Rates), *Rates)
+
+def parse_rates(Text):
+
+    # Skip the policy number line and read the rates in order.
+    Lines = [Line for Line in Text.splitlines() if Line.strip()]
+    if len(Lines) < len(RATE_FIELDS) + 1:
+        raise ValueError(f"Defaults.dat needs {len(RATE_FIELDS) + 1} lines, found {len(Lines)}.")
+    return make_snapshot(Lines[1:len(RATE_FIELDS) + 1])
+
+def load_rates(FileName):
+
+    with open(FileName, 'r') as f:
+        return parse_rates(f.read())
+
+
+# Rate Table
+
+class RateTable:
+
+    # Holds the current RateSnapshot for a Defaults.dat file. Pricing code
+    # takes current() once per policy and uses that snapshot throughout, so a
+    # reload swapping in new rates never changes a policy half-way through
+    # and never has to wait for one. Swapping is a single reference
+    # assignment, so readers need no lock.
+    #
+    # Nothing is read until the rates are first needed, so creating a table
+    # (for example when One Stop.py is imported) costs no file I/O.
+
+    def __init__(self, FileName):
+        self.FileName = FileName
+        self.Lock = threading.Lock()
+        self.Stamp = None
+        self.Snapshot = None
+        self.Snapshots = {}
+        self.Watcher = None
+        self.StopWatching = threading.Event()
+
+    def load(self):
+
+        # Read the rates the first time they are needed.
+        with self.Lock:
+            if self.Snapshot is None:
+                self.Stamp = self.file_stamp()
+                Snapshot = load_rates(self.FileName)
+                self.Snapshots[Snapshot.Version] = Snapshot
+                self.Snapshot = Snapshot
+            return self.Snapshot
+
+    def current(self):
+        Snapshot = self.Snapshot
+        if Snapshot is None:
+            Snapshot = self.load()
+        return Snapshot
+
+    def snapshot(self, Version):
+
+        # Look up an earlier snapshot seen by this table, by version.
+        return self.Snapshots.get(Version)
+
+    def file_stamp(self):
+        Info = os.stat(self.FileName)
+        return Info.st_mtime_ns, Info.st_size
+
+    def check_for_changes(self):
+
+        # Reload if Defaults.dat changed on disk. Returns True if the rates
+        # changed. A change to the policy number alone keeps the snapshot.
+        # A file caught half-written is ignored until the next check.
+        if self.Snapshot is None:
+            self.load()
+            return False
+        with self.Lock:
+            try:
+                Stamp = self.file_stamp()
+                if Stamp == self.Stamp:
+                    return False
+                Snapshot = load_rates(self.FileName)
+            except (OSError, ValueError):
+                return False
+
+            self.Stamp = Stamp
+            if Snapshot.Version == self.Snapshot.Version:
+                return False
+            self.Snapshots[Snapshot.Version] = Snapshot
+            self.Snapshot = Snapshot
+            return True
+
+    def start_watching(self, Interval=1.0):
+
+        # Check Defaults.dat every Interval seconds on a background thread.
+        if self.Watcher is not None:
+            return
+        self.StopWatching.clear()
+
+        def watch():
+            while not self.StopWatching.wait(Interval):
+                self.check_for_changes()
+
+        self.Watcher = threading.Thread(target=watch, name="RateTableWatcher", daemon=True)
+        self.Watcher.start()
+
+    def stop_watching(self):
+        if self.Watcher is not None:
+            self.StopWatching.set()
+            self.Watcher.join()
+            self.Watcher = None
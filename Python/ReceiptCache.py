@@ -0,0 +1,361 @@
+# Description: On-disk receipt cache for One Stop Insurance, so a rerun only re-renders the receipts, and receipt sections, whose inputs changed
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime
+
+import BatchPolicies as BP
+import OneStop as OS
+import PolicyLog as PL
+import PolicyStore as PS
+import ReceiptRenderer as RR
+
+
+# Cache Layout
+# "<store>.receipts" starts with a header (magic + format version), followed
+# by entries framed as in Claims.dat: <payload length><crc32><payload>.
+#
+# A section entry holds one rendered receipt section, zlib compressed, under
+# a hash of the inputs it was rendered from, so policies with the same inputs
+# share it. A policy entry records which Claims.dat record and rate version a
+# policy's receipt was made from, and the keys of its sections. A later
+# policy entry replaces an earlier one for the same policy number. Migrated
+# records are all numbered 0, so each is kept under minus its log position
+# instead (see latest_records).
+
+CACHE_SUFFIX = ".receipts"
+CACHE_MAGIC = b'OSRC'
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct('<4sH')
+FRAME = PS.FRAME
+
+SECTION_KIND = b'S'
+POLICY_KIND = b'P'
+SECTION = struct.Struct('<cQ')              # kind, key, then the compressed text
+POLICY = struct.Struct('<cqIIIQQQ')         # kind, policy number, record length and crc, rate version, section keys
+
+# The cached sections, in receipt order. The title (policy number and dates)
+# and the footer are rendered every time; they are a single format call.
+SECTIONS = ('Customer', 'Premium', 'Claims')
+
+# Receipts are written this many at a time.
+CHUNK_SIZE = 1000
+
+
+# Key Functions
+
+def content_key(*Values):
+
+    # 64-bit hash of the values' repr. Each key starts with the section name,
+    # so equal inputs to different sections never share a key.
+    return int.from_bytes(hashlib.blake2b(repr(Values).encode('utf-8'), digest_size=8).digest(), 'little')
+
+def section_keys(Policy, RateVersion):
+
+    # The keys of a policy's Customer, Premium and Claims sections. Policy
+    # is a record as PS.decode_policy returns it. The premium section is
+    # keyed on the coverage, payment method and the rates that price it,
+    # not on the prices saved with the record.
+    return (
+        content_key('Customer', *(Policy[Field] for Field in PS.STRING_FIELDS)),
+        content_key('Premium', Policy['NumCars'], Policy['ExtLiability'], Policy['GlassCoverage'],
+                    Policy['LoanerCar'], Policy['PayMethod'], Policy['DownPay'], RateVersion),
+        content_key('Claims', *((Claim['Number'], Claim['Date'], Claim['Amount']) for Claim in Policy['Claims'])),
+    )
+
+def render_section(Name, Policy, Rates):
+    if Name == 'Customer':
+        return RR.render_customer(Policy)
+    if Name == 'Claims':
+        return RR.render_claims(Policy['Claims'])
+    PremDetails, Hst, TotCost, MonPayment = BP.price_policy(Policy, Policy['PayMethod'], Policy['DownPay'], Rates)
+    return RR.render_premium(Policy, PremDetails, Hst, TotCost, Policy['PayMethod'], Policy['DownPay'], MonPayment,
+                             PremDetails['TotalPremium'])
+
+
+# Cache
+
+def cache_file_name(FileName):
+    return FileName + CACHE_SUFFIX
+
+class ReceiptCache:
+
+    # Rendered receipt sections kept on disk beside a store file. Loading
+    # reads only the keys and where each section is; a section's text is
+    # read back when a receipt needs it. New entries are kept in memory until
+    # save(), which appends them, and rewrites the file once more than half
+    # of it is replaced policy entries and sections no policy uses.
+
+    def __init__(self, FileName):
+        self.FileName = FileName
+        self.File = None
+        self.load()
+
+    def reset(self):
+        self.Sections = {}          # key -> (offset, length) of the compressed text in the file
+        self.Policies = {}          # entry number -> (record length, record crc, rate version, section keys)
+        self.NewSections = {}       # key -> compressed text, not saved yet
+        self.NewPolicies = {}
+        self.End = CACHE_HEADER.size
+        self.Entries = 0
+
+    def load(self):
+
+        # Scan the entries, cutting off a torn one at the end of the file.
+        self.close()
+        self.reset()
+        if not os.path.exists(self.FileName) or os.path.getsize(self.FileName) < CACHE_HEADER.size:
+            return
+
+        with open(self.FileName, 'rb') as f:
+            Map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            View = memoryview(Map)
+            try:
+                if CACHE_HEADER.unpack_from(View, 0) != (CACHE_MAGIC, CACHE_VERSION):
+                    return
+                Offset = CACHE_HEADER.size
+                Size = len(View)
+                while Offset + FRAME.size <= Size:
+                    Length, Crc = FRAME.unpack_from(View, Offset)
+                    Start = Offset + FRAME.size
+                    if Start + Length > Size or zlib.crc32(View[Start:Start + Length]) != Crc:
+                        break
+                    if View[Start:Start + 1] == SECTION_KIND:
+                        (_, Key) = SECTION.unpack_from(View, Start)
+                        self.Sections[Key] = (Start + SECTION.size, Length - SECTION.size)
+                    else:
+                        (_, PolicyNumber, RecordLength, RecordCrc, RateVersion, *Keys) = POLICY.unpack_from(View, Start)
+                        self.Policies[PolicyNumber] = (RecordLength, RecordCrc, RateVersion, tuple(Keys))
+                    self.Entries += 1
+                    Offset = Start + Length
+            finally:
+                View.release()
+                Map.close()
+
+        self.End = Offset
+        if self.End < os.path.getsize(self.FileName):
+            with open(self.FileName, 'r+b') as f:
+                f.truncate(self.End)
+
+    # Lookups
+
+    def lookup(self, PolicyNumber, RecordLength, RecordCrc, RateVersion):
+
+        # The section keys of a policy's receipt if it was made from this
+        # exact record (by length and checksum) and these rates, else None.
+        Entry = self.NewPolicies.get(PolicyNumber) or self.Policies.get(PolicyNumber)
+        if Entry is None or Entry[:3] != (RecordLength, RecordCrc, RateVersion):
+            return None
+        return Entry[3]
+
+    def section(self, Key):
+        Data = self.NewSections.get(Key)
+        if Data is None:
+            Offset, Length = self.Sections[Key]
+            if self.File is None:
+                self.File = open(self.FileName, 'rb')
+            self.File.seek(Offset)
+            Data = self.File.read(Length)
+        return zlib.decompress(Data).decode('utf-8')
+
+    def has_section(self, Key):
+        return Key in self.NewSections or Key in self.Sections
+
+    def text(self, Keys):
+
+        # The cached part of a receipt: its sections joined in order.
+        return "".join(self.section(Key) for Key in Keys)
+
+    # Rendering
+
+    def render(self, Policy, RecordLength, RecordCrc, Rates, EntryNumber=None):
+
+        # Render the cached part of a policy's receipt, redoing only the
+        # sections whose inputs changed, and record it for the policy (under
+        # EntryNumber if given). Returns the text and the number of sections
+        # rendered.
+        Keys = section_keys(Policy, Rates.Version)
+        Parts = []
+        Rendered = 0
+        for Name, Key in zip(SECTIONS, Keys):
+            if self.has_section(Key):
+                Parts.append(self.section(Key))
+                continue
+            Text = render_section(Name, Policy, Rates)
+            self.NewSections[Key] = zlib.compress(Text.encode('utf-8'))
+            Parts.append(Text)
+            Rendered += 1
+        EntryNumber = Policy['PolicyNumber'] if EntryNumber is None else EntryNumber
+        self.NewPolicies[EntryNumber] = (RecordLength, RecordCrc, Rates.Version, Keys)
+        return "".join(Parts), Rendered
+
+    # Saving
+
+    def save(self):
+
+        # Append the new entries in one write, then compact if needed.
+        if not self.NewSections and not self.NewPolicies:
+            return
+        # An empty cache is written out from scratch, replacing any stale file.
+        Fresh = self.Entries == 0
+        Parts = [CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION)] if Fresh else []
+        Offset = CACHE_HEADER.size if Fresh else self.End
+        for Key, Data in self.NewSections.items():
+            Payload = SECTION.pack(SECTION_KIND, Key) + Data
+            Parts.append(FRAME.pack(len(Payload), zlib.crc32(Payload)))
+            Parts.append(Payload)
+            self.Sections[Key] = (Offset + FRAME.size + SECTION.size, len(Data))
+            Offset += FRAME.size + len(Payload)
+        for PolicyNumber, (RecordLength, RecordCrc, RateVersion, Keys) in self.NewPolicies.items():
+            Payload = POLICY.pack(POLICY_KIND, PolicyNumber, RecordLength, RecordCrc, RateVersion, *Keys)
+            Parts.append(FRAME.pack(len(Payload), zlib.crc32(Payload)))
+            Parts.append(Payload)
+            Offset += FRAME.size + len(Payload)
+        self.Policies.update(self.NewPolicies)
+
+        with open(self.FileName, 'wb' if Fresh else 'ab') as f:
+            f.write(b"".join(Parts))
+        self.Entries += len(self.NewSections) + len(self.NewPolicies)
+        self.End = Offset
+        self.NewSections = {}
+        self.NewPolicies = {}
+
+        Live = {Key for Entry in self.Policies.values() for Key in Entry[3]}
+        if self.Entries - len(self.Policies) - len(Live) > self.Entries // 2:
+            self.compact(Live)
+
+    def compact(self, Live):
+
+        # Rewrite the file with only the current policy entries and the
+        # sections they use, replacing it in one step.
+        TempFileName = self.FileName + ".tmp"
+        with open(TempFileName, 'wb') as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION))
+            for Key in Live:
+                Offset, Length = self.Sections[Key]
+                self.File = self.File or open(self.FileName, 'rb')
+                self.File.seek(Offset)
+                Payload = SECTION.pack(SECTION_KIND, Key) + self.File.read(Length)
+                f.write(FRAME.pack(len(Payload), zlib.crc32(Payload)) + Payload)
+            for PolicyNumber, (RecordLength, RecordCrc, RateVersion, Keys) in self.Policies.items():
+                Payload = POLICY.pack(POLICY_KIND, PolicyNumber, RecordLength, RecordCrc, RateVersion, *Keys)
+                f.write(FRAME.pack(len(Payload), zlib.crc32(Payload)) + Payload)
+        self.close()
+        os.replace(TempFileName, self.FileName)
+        self.load()
+
+    def close(self):
+        if self.File is not None:
+            self.File.close()
+            self.File = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *ExcInfo):
+        self.save()
+        self.close()
+        return False
+
+def open_cache(ClaimsFileName):
+    return ReceiptCache(cache_file_name(ClaimsFileName))
+
+
+# Rerun Functions
+
+def latest_records(ClaimsFileName):
+
+    # {EntryNumber: (Position, Length, Crc)} for the latest record of each
+    # policy in the log, reading just the policy number from each record.
+    # Policy number 0 marks a migrated record with no number of its own, so
+    # every one is kept, under minus its log position (which stays put, as
+    # the log is only appended to until it is compacted).
+    Latest = {}
+    for Segment, Version, Offset, End, Crc, Payload in PL.LogReader(ClaimsFileName).read():
+        Position = PL.log_position(Segment, Offset)
+        PolicyNumber = PS.FIXED_BY_VERSION[Version].unpack_from(Payload, 0)[0]
+        Latest[PolicyNumber or -Position] = (Position, End - Offset, Crc)
+    return Latest
+
+def rerun_receipts(ClaimsFileName=None, Output=None, ChangedOnly=False, Rates=None, InvoiceDate=None):
+
+    # Make the receipt for the latest record of every policy in the log,
+    # priced with the current rates, in the order the records were saved.
+    # Receipts whose record and rates are unchanged since the last run come
+    # from the cache without decoding the record; for the rest only the
+    # changed sections are rendered. With ChangedOnly, only the changed
+    # receipts are written to Output.
+    ClaimsFileName = ClaimsFileName or PS.CLAIMS_FILE
+    Rates = Rates or OS.RATE_TABLE.current()
+    Dates = RR.receipt_dates(InvoiceDate)
+    Summary = {'Policies': 0, 'Unchanged': 0, 'Changed': 0, 'SectionsRendered': 0, 'Seconds': 0.0}
+    StartTime = time.perf_counter()
+
+    Buffer = []
+    Latest = sorted(latest_records(ClaimsFileName).items(), key=lambda Item: Item[1][0])
+    with open_cache(ClaimsFileName) as Cache, PL.LogReader(ClaimsFileName) as Reader:
+        for EntryNumber, (Position, Length, Crc) in Latest:
+            PolicyNumber = max(EntryNumber, 0)
+            Summary['Policies'] += 1
+            Keys = Cache.lookup(EntryNumber, Length, Crc, Rates.Version)
+            if Keys is not None:
+                Summary['Unchanged'] += 1
+                if ChangedOnly or Output is None:
+                    continue
+                Body = Cache.text(Keys)
+            else:
+                Version, Payload = Reader.record_at(Position)
+                Policy = PS.decode_policy(Payload, Version)
+                Body, Rendered = Cache.render(Policy, Length, Crc, Rates, EntryNumber)
+                Summary['Changed'] += 1
+                Summary['SectionsRendered'] += Rendered
+                if Output is None:
+                    continue
+
+            Buffer.append(RR.render_title(PolicyNumber, Dates) + Body + RR.render_footer(PolicyNumber))
+            if len(Buffer) >= CHUNK_SIZE:
+                Output.write("".join(Buffer))
+                Buffer = []
+        if Buffer:
+            Output.write("".join(Buffer))
+
+    Summary['Seconds'] = time.perf_counter() - StartTime
+    return Summary
+
+
+# Main Functions
+
+def main(Args=None):
+
+    Parser = argparse.ArgumentParser(description="Re-make the receipts for the policies in Claims.dat, reusing cached receipts.")
+    Parser.add_argument("ClaimsFile", nargs="?", default=PS.CLAIMS_FILE, help="policy store file")
+    Parser.add_argument("--output", default=None, help="write the receipts to this file (default: standard output)")
+    Parser.add_argument("--changed-only", action="store_true", help="write only the receipts that changed")
+    Parser.add_argument("--invoice-date", default=None, help="invoice date, YYYY-MM-DD (default: today)")
+    Parser.add_argument("--no-output", action="store_true", help="only bring the cache up to date")
+    Options = Parser.parse_args(Args)
+
+    InvoiceDate = datetime.strptime(Options.invoice_date, '%Y-%m-%d') if Options.invoice_date else None
+    if Options.no_output:
+        Summary = rerun_receipts(Options.ClaimsFile, None, Options.changed_only, InvoiceDate=InvoiceDate)
+    elif Options.output:
+        with open(Options.output, 'w') as Output:
+            Summary = rerun_receipts(Options.ClaimsFile, Output, Options.changed_only, InvoiceDate=InvoiceDate)
+    else:
+        Summary = rerun_receipts(Options.ClaimsFile, sys.stdout, Options.changed_only, InvoiceDate=InvoiceDate)
+
+    print(f"Policies: {Summary['Policies']:,}  Unchanged: {Summary['Unchanged']:,}  Changed: {Summary['Changed']:,}  "
+          f"Sections rendered: {Summary['SectionsRendered']:,}  Time: {Summary['Seconds']:.2f}s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# Description: Receipt renderer that builds the One Stop Insurance receipt layout once and renders each policy into a single string
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import re
+from datetime import datetime, timedelta
+
+import FormatValues as FV
+
+
+# Receipt Layout
+# The same lines generate_and_display_receipt printed, as format templates.
+# Each section is joined into one string once, when the module loads. The
+# sections are rendered separately so ReceiptCache.py can keep and reuse
+# each one on its own.
+
+TITLE_LINES = [
+    "",
+    "",
+    "    ____________________________________________________________",
+    "   |         ------- One Stop Insurance Policy --------         |",
+    "   |                       Policy - #{PolicyNumber:<10s}                 |",
+    "   |    ----------------------------------------------------    |",
+    "   | ---------- Current Invoice Date -- {InvoiceDate:>10s} ------------ |",
+    "   | ----------   First Payment Date -- {FirstPaymentDate:>10s} ------------ |",
+    "   |____________________________________________________________|",
+]
+
+CUSTOMER_LINES = [
+    "   |          ========  Customer Information  ========          |",
+    "   |                                                            |",
+    "   | " + f"{'Full Name':>22s}" + " -- {FullName:<33s}|",
+    "   | " + f"{'Phone Number':>22s}" + " -- {PhoneNum:<33s}|",
+    "   | " + f"{'Street':>22s}" + " -- {Address:<33s}|",
+    "   | " + f"{'City':>22s}" + " -- {CityProv:<33s}|",
+]
+
+PREMIUM_LINES = [
+    "   |____________________________________________________________|",
+    "   |         ===========  Premium Details  ===========          |",
+    "   |                                                            |",
+    "   |  Number  of Cars  ----  {NumCars}  ----  {Premium:>9s}                 |",
+    "   |  Extra Liability  ----  {ExtLiability}  ----  {ExtLiabilityCost:>9s}                 |",
+    "   |  Glass  Coverage  ----  {GlassCoverage}  ----  {GlassCoverageCost:>9s}                 |",
+    "   |  Loaner Car       ----  {LoanerCar}  ----  {LoanerCarCost:>9s}                 |",
+    "   |____________________________________________________________|",
+    "   |                                                            |",
+    "   |  Total Premium  -------------  {TotalPremium:>9s}                  |",
+    "   |  HST Charge  --------------- {Hst:>9s}                      |",
+    "   |____________________________________________________________|",
+    "   |  Total Cost  ---------------  {TotalCost:>9s}                    |",
+    "   |____________________________________________________________|",
+    "   |              ======  Payment  Details  ======              |",
+    "   |                                                            |",
+]
+
+INSTALLMENT_LINES = [
+    "   |          ----  Payment Method ----- {PayMethod:>9s} ----         |",
+    "   |          ----    Down Payment ----- {DownPay:>9s} ----         |",
+    "   |          ---- Monthly Payment ----- {MonPayment:>9s} ----         |",
+]
+
+FULL_PAYMENT_LINES = [
+    "   |                 Payment Method: Full Payment               |",
+]
+
+CLAIMS_HEADER_LINES = [
+    "   |____________________________________________________________|",
+    "   |              ======  Claim(s) Details  ========            |",
+    "   |                                                            |",
+    "   |              Claim #    Claim Date       Amount            |",
+    "   |------------------------------------------------------------|",
+]
+
+CLAIM_LINE = "   |                {Number:>5s},   {Date:>10s},   {Amount:>9s}            |\n"
+
+NO_CLAIMS_LINES = [
+    "   |____________________________________________________________|",
+    "   |            ========  Claim(s) Details  ========            |",
+    "   |                                                            |",
+    "   |                   Claims History: N/A                      |",
+    "   |____________________________________________________________|",
+]
+
+FOOTER_LINES = [
+    "   |____________________________________________________________|",
+    "   |                                                            |",
+    "   |       Thank you for choosing One Stop Insurance Company    |",
+    "   |____________________________________________________________|",
+    "",
+    "",
+    "",
+    "",
+    "Your policy data for policy number {PolicyNumber} has been saved successfully.",
+    "",
+]
+
+def compile_section(Lines):
+
+    # Join a section into one template string, one "\n" per printed line.
+    return "".join(Line + "\n" for Line in Lines)
+
+TITLE_TEMPLATE = compile_section(TITLE_LINES)
+CUSTOMER_TEMPLATE = compile_section(CUSTOMER_LINES)
+
+# The premium section is one template for each payment layout.
+PREMIUM_TEMPLATES = {
+    True: compile_section(PREMIUM_LINES + FULL_PAYMENT_LINES),
+    False: compile_section(PREMIUM_LINES + INSTALLMENT_LINES),
+}
+CLAIMS_HEADER = compile_section(CLAIMS_HEADER_LINES)
+NO_CLAIMS = compile_section(NO_CLAIMS_LINES)
+FOOTER_TEMPLATE = compile_section(FOOTER_LINES)
+
+# Claim dates already in YYYY-MM-DD form print as they are; anything else
+# goes through strptime/strftime as before.
+ISO_DATE_PATTERN = re.compile(r"[1-9]\d{3}-\d\d-\d\d", re.ASCII)
+
+
+# Render Functions
+
+def receipt_dates(InvoiceDate=None):
+
+    # Invoice date, and the first payment date on the first day of the next month.
+    InvoiceDate = InvoiceDate or datetime.now()
+    FirstPaymentDate = (InvoiceDate.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return FV.FDateS(InvoiceDate), FV.FDateS(FirstPaymentDate)
+
+def render_title(PolicyNumber, Dates):
+    InvoiceDate, FirstPaymentDate = Dates
+    return TITLE_TEMPLATE.format(PolicyNumber=f"{PolicyNumber}", InvoiceDate=InvoiceDate,
+                                 FirstPaymentDate=FirstPaymentDate)
+
+def render_customer(CustInfo):
+    return CUSTOMER_TEMPLATE.format(
+        FullName=f"{CustInfo.get('FName', '')} {CustInfo.get('LName', '')}",
+        PhoneNum=CustInfo.get('PhoneNum', ''),
+        Address=f"{CustInfo.get('Address', '')}",
+        CityProv=f"{CustInfo.get('City', '')}, {CustInfo.get('Province', '')}, {CustInfo.get('PostCode')}",
+    )
+
+def render_premium(CustInfo, PremDetails, Hst, TotCost, PayMethod, DownPay, MonPayment, TotPremium):
+
+    # Coverage, premium details and payment details.
+    return PREMIUM_TEMPLATES[PayMethod == 'Full'].format(
+        NumCars=CustInfo['NumCars'],
+        ExtLiability=CustInfo['ExtLiability'],
+        GlassCoverage=CustInfo['GlassCoverage'],
+        LoanerCar=CustInfo['LoanerCar'],
+        Premium=FV.FDollar2(PremDetails['Premium']),
+        ExtLiabilityCost=FV.FDollar2(PremDetails['ExtLiabilityCost']),
+        GlassCoverageCost=FV.FDollar2(PremDetails['GlassCoverageCost']),
+        LoanerCarCost=FV.FDollar2(PremDetails['LoanerCarCost']),
+        TotalPremium=FV.FDollar2(TotPremium),
+        Hst=FV.FDollar2(Hst),
+        TotalCost=FV.FDollar2(TotCost),
+        PayMethod=f"{PayMethod}",
+        DownPay=FV.FDollar2(DownPay) if DownPay else "N/A",
+        MonPayment=FV.FDollar2(MonPayment) if MonPayment else "N/A",
+    )
+
+def render_claims(Claims):
+
+    # Render the claims block as one string.
+    if not Claims:
+        return NO_CLAIMS
+
+    Parts = [CLAIMS_HEADER]
+    for Claim in Claims:
+        ClaimDate = Claim['Date']
+        if not ISO_DATE_PATTERN.fullmatch(ClaimDate):
+            ClaimDate = FV.FDateS(datetime.strptime(ClaimDate, '%Y-%m-%d'))
+        Parts.append(CLAIM_LINE.format(Number=Claim['Number'], Date=ClaimDate, Amount=FV.FDollar2(Claim['Amount'])))
+    return "".join(Parts)
+
+def render_footer(PolicyNumber):
+    return FOOTER_TEMPLATE.format(PolicyNumber=f"{PolicyNumber}")
+
+def render_receipt(PolicyNumber, CustInfo, Claims, PremDetails, Hst, TotCost, PayMethod, DownPay, MonPayment,
+                   TotPremium, Dates=None):
+
+    # Render one full receipt, exactly as generate_and_display_receipt lays it out.
+    # Dates is the (invoice date, first payment date) pair from receipt_dates,
+    # passed in when rendering many receipts at once.
+    return (render_title(PolicyNumber, Dates or receipt_dates())
+            + render_customer(CustInfo)
+            + render_premium(CustInfo, PremDetails, Hst, TotCost, PayMethod, DownPay, MonPayment, TotPremium)
+            + render_claims(Claims)
+            + render_footer(PolicyNumber))
+
+def write_receipts(f, Receipts, ChunkSize=1000, InvoiceDate=None):
+
+    # Receipts is an iterable of render_receipt argument tuples (without Dates).
+    # Receipts are joined and written ChunkSize at a time, so thousands of
+    # receipts take a handful of writes. Returns the number written.
+    Dates = receipt_dates(InvoiceDate)
+    Count = 0
+    Buffer = []
+    for Args in Receipts:
+        Buffer.append(render_receipt(*Args, Dates=Dates))
+        if len(Buffer) >= ChunkSize:
+            f.write("".join(Buffer))
+            Count += len(Buffer)
+            Buffer = []
+    if Buffer:
+        f.write("".join(Buffer))
+        Count += len(Buffer)
+    return Count
@@ -0,0 +1,294 @@
+# Description: Compact record types for policies and claims, and a column-based container for whole batches
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import sys
+from array import array
+from datetime import date, datetime
+
+
+# Record Types
+#
+# Slotted classes take less memory than a dict with the same keys. They also
+# support Record['Key'] and Record.get('Key'), so they can be passed anywhere
+# One Stop.py passes the customer, premium or claim dicts.
+#
+# Claims are kept as Claim records (see ClaimCollection). collect_customer_info
+# and calculate_insurance_premium still return dicts; a single policy's dicts
+# cost nothing worth saving. Slotted records alone save about 40% per policy,
+# because the string values they hold dominate. Only PolicyBatch, which keeps
+# no per-value objects, cuts memory per policy by more than half (see
+# memory_benchmark below).
+
+class Record:
+
+    __slots__ = ()
+
+    def __getitem__(self, Key):
+        try:
+            return getattr(self, Key)
+        except AttributeError:
+            raise KeyError(Key) from None
+
+    def __setitem__(self, Key, Value):
+        if Key not in self.__slots__:
+            raise KeyError(Key)
+        setattr(self, Key, Value)
+
+    def get(self, Key, Default=None):
+        return getattr(self, Key, Default) if Key in self.__slots__ else Default
+
+    def keys(self):
+        return self.__slots__
+
+    def to_dict(self):
+        return {Key: getattr(self, Key) for Key in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, Values):
+        return cls(*(Values[Key] for Key in cls.__slots__))
+
+    def __eq__(self, Other):
+        if isinstance(Other, Record):
+            Other = Other.to_dict()
+        return self.to_dict() == Other
+
+    # Records are compared by value and can be changed (ClaimCollection
+    # updates claim amounts), so like dicts they cannot be hashed.
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class CustomerInfo(Record):
+
+    # Same fields collect_customer_info returns.
+    __slots__ = ('FName', 'LName', 'Address', 'City', 'Province', 'PostCode', 'PhoneNum',
+                 'NumCars', 'ExtLiability', 'GlassCoverage', 'LoanerCar')
+
+    def __init__(self, FName, LName, Address, City, Province, PostCode, PhoneNum,
+                 NumCars, ExtLiability, GlassCoverage, LoanerCar):
+        self.FName = FName
+        self.LName = LName
+        self.Address = Address
+        self.City = City
+        self.Province = Province
+        self.PostCode = PostCode
+        self.PhoneNum = PhoneNum
+        self.NumCars = NumCars
+        self.ExtLiability = ExtLiability
+        self.GlassCoverage = GlassCoverage
+        self.LoanerCar = LoanerCar
+
+class PremiumDetails(Record):
+
+    # Same fields calculate_insurance_premium returns.
+    __slots__ = ('Premium', 'TotalPremium', 'ExtLiabilityCost', 'GlassCoverageCost', 'LoanerCarCost')
+
+    def __init__(self, Premium, TotalPremium, ExtLiabilityCost, GlassCoverageCost, LoanerCarCost):
+        self.Premium = Premium
+        self.TotalPremium = TotalPremium
+        self.ExtLiabilityCost = ExtLiabilityCost
+        self.GlassCoverageCost = GlassCoverageCost
+        self.LoanerCarCost = LoanerCarCost
+
+class Claim(Record):
+
+    # One claim as get_claims records it.
+    __slots__ = ('Number', 'Date', 'Amount')
+
+    def __init__(self, Number, Date, Amount):
+        self.Number = Number
+        self.Date = Date
+        self.Amount = Amount
+
+class Policy(Record):
+
+    # Everything saved for one policy.
+    __slots__ = ('PolicyNumber', 'CustInfo', 'Claims', 'PayMethod', 'DownPay', 'PremDetails')
+
+    def __init__(self, PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails):
+        self.PolicyNumber = PolicyNumber
+        self.CustInfo = CustInfo
+        self.Claims = Claims
+        self.PayMethod = PayMethod
+        self.DownPay = DownPay
+        self.PremDetails = PremDetails
+
+
+# Batch Container
+
+class TextColumn:
+
+    # A column of strings kept as one UTF-8 buffer plus end offsets,
+    # instead of one Python string object per value.
+
+    __slots__ = ('Text', 'Ends')
+
+    def __init__(self):
+        self.Text = bytearray()
+        self.Ends = array('Q')
+
+    def append(self, Value):
+        self.Text += Value.encode('utf-8')
+        self.Ends.append(len(self.Text))
+
+    def __getitem__(self, Index):
+        Start = self.Ends[Index - 1] if Index else 0
+        return self.Text[Start:self.Ends[Index]].decode('utf-8')
+
+    def __len__(self):
+        return len(self.Ends)
+
+class PolicyBatch:
+
+    # Struct-of-arrays store for a batch of policies: one typed array (or text
+    # column) per field, so a policy costs a few bytes per field rather than
+    # several Python objects. batch[i] rebuilds a Policy record on demand, and
+    # the numeric columns can be handed to NumPy without copying, e.g.
+    # numpy.frombuffer(batch.Columns['TotalPremium']).
+
+    TEXT_FIELDS = ('FName', 'LName', 'Address', 'City', 'Province', 'PostCode', 'PhoneNum')
+    FLAG_FIELDS = ('ExtLiability', 'GlassCoverage', 'LoanerCar')
+    MONEY_FIELDS = PremiumDetails.__slots__
+    PAY_METHODS = ('Full', 'Monthly', 'Down Pay')
+
+    def __init__(self):
+        self.Columns = {Field: TextColumn() for Field in self.TEXT_FIELDS}
+        self.Columns['PolicyNumber'] = array('q')
+        self.Columns['NumCars'] = array('H')
+        self.Columns['Flags'] = bytearray()
+        self.Columns['PayCode'] = bytearray()
+        self.Columns['DownPay'] = array('d')
+        for Field in self.MONEY_FIELDS:
+            self.Columns[Field] = array('d')
+
+        # Claims for policy i are ClaimStarts[i]:ClaimStarts[i + 1] in the claim columns.
+        self.ClaimStarts = array('Q', [0])
+        self.ClaimNumbers = TextColumn()
+        self.ClaimDates = array('i')
+        self.ClaimAmounts = array('d')
+
+    def append(self, PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails):
+
+        # CustInfo, Claims and PremDetails may be dicts or the record types above.
+        Columns = self.Columns
+        for Field in self.TEXT_FIELDS:
+            Columns[Field].append(str(CustInfo[Field]))
+
+        Flags = 0
+        for Bit, Field in enumerate(self.FLAG_FIELDS):
+            if CustInfo[Field] == 'Y':
+                Flags |= 1 << Bit
+
+        Columns['PolicyNumber'].append(PolicyNumber)
+        Columns['NumCars'].append(CustInfo['NumCars'])
+        Columns['Flags'].append(Flags)
+        Columns['PayCode'].append(self.PAY_METHODS.index(PayMethod))
+        Columns['DownPay'].append(float('nan') if DownPay is None else DownPay)
+        for Field in self.MONEY_FIELDS:
+            Columns[Field].append(PremDetails[Field])
+
+        for ClaimItem in Claims:
+            self.ClaimNumbers.append(str(ClaimItem['Number']))
+            self.ClaimDates.append(datetime.strptime(ClaimItem['Date'], '%Y-%m-%d').toordinal())
+            self.ClaimAmounts.append(ClaimItem['Amount'])
+        self.ClaimStarts.append(len(self.ClaimAmounts))
+
+    def __len__(self):
+        return len(self.Columns['PolicyNumber'])
+
+    def __getitem__(self, Index):
+
+        # Rebuild one policy as record objects.
+        if Index < 0:
+            Index += len(self)
+        Columns = self.Columns
+        Flags = Columns['Flags'][Index]
+        DownPay = Columns['DownPay'][Index]
+
+        CustInfo = CustomerInfo(
+            *(Columns[Field][Index] for Field in self.TEXT_FIELDS),
+            Columns['NumCars'][Index],
+            *('Y' if Flags & (1 << Bit) else 'N' for Bit in range(len(self.FLAG_FIELDS)))
+        )
+        PremDetails = PremiumDetails(*(Columns[Field][Index] for Field in self.MONEY_FIELDS))
+        Claims = [Claim(self.ClaimNumbers[ClaimIndex], date.fromordinal(self.ClaimDates[ClaimIndex]).isoformat(),
+                        self.ClaimAmounts[ClaimIndex])
+                  for ClaimIndex in range(self.ClaimStarts[Index], self.ClaimStarts[Index + 1])]
+
+        return Policy(Columns['PolicyNumber'][Index], CustInfo, Claims, self.PAY_METHODS[Columns['PayCode'][Index]],
+                      None if DownPay != DownPay else DownPay, PremDetails)
+
+    def __iter__(self):
+        for Index in range(len(self)):
+            yield self[Index]
+
+
+# Memory Benchmark
+
+def sample_policy(Index):
+
+    # A synthetic policy with distinct names and addresses, as dicts.
+    CustInfo = {
+        'FName': f"First{Index}", 'LName': f"Last{Index}", 'Address': f"{Index} Water Street",
+        'City': "St. John's", 'Province': 'NL', 'PostCode': f"A{Index % 10}B{Index % 7}C{Index % 3}",
+        'PhoneNum': f"709{Index:07d}"[:10], 'NumCars': Index % 4 + 1,
+        'ExtLiability': 'Y', 'GlassCoverage': 'N', 'LoanerCar': 'Y'
+    }
+    PremDetails = {'Premium': 869.0 + Index % 4 * 651.75, 'TotalPremium': 1300.0 + Index % 4 * 651.75,
+                   'ExtLiabilityCost': 130.0 * (Index % 4 + 1), 'GlassCoverageCost': 0, 'LoanerCarCost': 58.0 * (Index % 4 + 1)}
+    Claims = [{'Number': str(Index * 10 + Number), 'Date': '2023-05-01', 'Amount': 1000.0 + Number}
+              for Number in range(Index % 3)]
+    return Index, CustInfo, Claims, 'Monthly', None, PremDetails
+
+def measure(Build, Count):
+
+    # Bytes allocated (and still held) while building Count policies.
+    import tracemalloc
+    tracemalloc.start()
+    Before = tracemalloc.get_traced_memory()[0]
+    Kept = Build(Count)
+    After = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del Kept
+    return After - Before
+
+def build_dicts(Count):
+    return [sample_policy(Index) for Index in range(Count)]
+
+def build_records(Count):
+    Policies = []
+    for Index in range(Count):
+        PolicyNumber, CustInfo, Claims, PayMethod, DownPay, PremDetails = sample_policy(Index)
+        Policies.append(Policy(PolicyNumber, CustomerInfo.from_dict(CustInfo), [Claim.from_dict(Item) for Item in Claims],
+                               PayMethod, DownPay, PremiumDetails.from_dict(PremDetails)))
+    return Policies
+
+def build_batch(Count):
+    Batch = PolicyBatch()
+    for Index in range(Count):
+        Batch.append(*sample_policy(Index))
+    return Batch
+
+def memory_benchmark(Count=100000):
+
+    # Compare memory held per policy for dicts, slotted records and a PolicyBatch.
+    Results = {
+        'Dicts': measure(build_dicts, Count),
+        'Records': measure(build_records, Count),
+        'PolicyBatch': measure(build_batch, Count),
+    }
+
+    print(f"  Memory per policy ({Count:,} policies)")
+    print(f"  ------------------------------------------")
+    for Name, Bytes in Results.items():
+        Saving = 1 - Bytes / Results['Dicts']
+        print(f"  {Name:<12s} {Bytes / Count:>8,.0f} bytes   {Saving:>6.1%} saved")
+    print()
+
+    return Results
+
+if __name__ == "__main__":
+    memory_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,116 @@
+# Description: Vectorized premium, HST and monthly payment calculations for whole portfolios
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import numpy as np
+
+import OneStop as OS
+
+
+# Rate Functions
+
+def current_rates(Rates=None):
+
+    # Turn a RateTables snapshot (the current one if none is given) into the
+    # dict of rates used below, adding the number of monthly payments.
+    Rates = Rates or OS.RATE_TABLE.current()
+    Values = Rates._asdict()
+    Values['NUM_PAYMENTS'] = OS.NUM_PAYMENTS
+    return Values
+
+
+# Conversion Functions
+
+def rates_dict(Rates):
+
+    # Accept a rates dict, a RateTables snapshot, or None for the current rates.
+    if isinstance(Rates, dict):
+        return Rates
+    return current_rates(Rates)
+
+def as_flag_array(Flags):
+
+    # Boolean arrays are used as they are; 'Y'/'N' values are compared the
+    # same way calculate_insurance_premium does (exactly equal to 'Y').
+    Flags = np.asarray(Flags)
+    if Flags.dtype == bool:
+        return Flags
+    return Flags == 'Y'
+
+def as_down_pay_array(DownPays, Size):
+
+    # None (or a missing array) means no down payment, stored as 0. Any
+    # other value must be a finite amount, as calculate_monthly_payments
+    # requires.
+    if DownPays is None:
+        return np.zeros(Size)
+    DownPays = np.asarray(DownPays)
+    if DownPays.dtype == object:
+        DownPays = np.where(np.equal(DownPays, None), 0.0, DownPays)
+    DownPays = DownPays.astype(float)
+    if not np.isfinite(DownPays).all():
+        raise ValueError("Down payments must be finite amounts.")
+    return DownPays
+
+
+# Calculation Functions
+
+def calculate_insurance_premiums(NumCars, ExtLiability, GlassCoverage, LoanerCar, Rates=None):
+
+    # Same formula as calculate_insurance_premium, applied to every policy at once.
+    Rates = rates_dict(Rates)
+    NumCars = np.asarray(NumCars, dtype=float)
+
+    BasicPremium = Rates['BASIC_PREMIUM']
+    Premium = BasicPremium + (BasicPremium * (1 - Rates['ADDITIONAL_CAR_DISCOUNT']) * (NumCars - 1))
+
+    ExtLiabilityCost = np.where(as_flag_array(ExtLiability), Rates['EXT_LIABILITY_COST_PER_CAR'] * NumCars, 0.0)
+    GlassCoverageCost = np.where(as_flag_array(GlassCoverage), Rates['GLASS_COVERAGE_COST_PER_CAR'] * NumCars, 0.0)
+    LoanerCarCost = np.where(as_flag_array(LoanerCar), Rates['LOANER_CAR_COST_PER_CAR'] * NumCars, 0.0)
+
+    # Added in the same order as the scalar version so results match exactly.
+    TotPremium = Premium + ExtLiabilityCost + GlassCoverageCost + LoanerCarCost
+
+    return {
+        'Premium': Premium,
+        'TotalPremium': TotPremium,
+        'ExtLiabilityCost': ExtLiabilityCost,
+        'GlassCoverageCost': GlassCoverageCost,
+        'LoanerCarCost': LoanerCarCost,
+    }
+
+def calculate_total_costs(Premium, Rates=None):
+
+    # Same as calculate_total_cost for an array of premiums.
+    Rates = rates_dict(Rates)
+    Premium = np.asarray(Premium, dtype=float)
+
+    Hst = Premium * Rates['HST_RATE']
+    TotCost = Premium + Hst
+
+    return Hst, TotCost
+
+def calculate_monthly_payments(TotCost, PayMethods, DownPays=None, Rates=None):
+
+    # Same as calculate_monthly_payments; 'Full' policies get NaN instead of None.
+    Rates = rates_dict(Rates)
+    TotCost = np.asarray(TotCost, dtype=float)
+    PayMethods = np.asarray(PayMethods)
+    DownPays = as_down_pay_array(DownPays, TotCost.shape)
+
+    AdjustedCost = TotCost - DownPays
+    MonPayment = (AdjustedCost / Rates['NUM_PAYMENTS']) + Rates['MONTHLY_PAYMENT_PROCESSING_FEE']
+
+    return np.where(PayMethods == 'Full', np.nan, MonPayment)
+
+def price_portfolio(NumCars, ExtLiability, GlassCoverage, LoanerCar, PayMethods, DownPays=None, Rates=None):
+
+    # Runs premium, HST/total cost and monthly payments in one pass over the portfolio.
+    Rates = rates_dict(Rates)
+
+    Results = calculate_insurance_premiums(NumCars, ExtLiability, GlassCoverage, LoanerCar, Rates)
+    Results['Hst'], Results['TotalCost'] = calculate_total_costs(Results['TotalPremium'], Rates)
+    Results['MonthlyPayment'] = calculate_monthly_payments(Results['TotalCost'], PayMethods, DownPays, Rates)
+
+    return Results
@@ -0,0 +1,9 @@
+# Description: Shared test setup, so the tests import the program modules the way they import each other
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
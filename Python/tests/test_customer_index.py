@@ -0,0 +1,50 @@
+# Description: Tests for the customer index over Claims.dat
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import CustomerIndex as CI
+import PolicyStore as PS
+
+
+CUSTOMER = {'FName': "Anne", 'LName': "Tremblay", 'Address': "12 Water Street", 'City': "St. John's",
+            'Province': "NL", 'PostCode': "A1B2C3", 'PhoneNum': "7095551234", 'NumCars': 1,
+            'ExtLiability': "Y", 'GlassCoverage': "N", 'LoanerCar': "N"}
+PREMIUMS = {'Premium': 869.0, 'ExtLiabilityCost': 130.0, 'GlassCoverageCost': 0.0, 'LoanerCarCost': 0.0,
+            'TotalPremium': 999.0}
+
+def write_policies(FileName, Policies):
+    with PS.PolicyWriter(FileName) as Writer:
+        for PolicyNumber, CustInfo in Policies:
+            Writer.write(PolicyNumber, CustInfo, [], 'Full', None, PREMIUMS)
+
+def test_migrated_records_are_all_indexed(tmp_path):
+
+    # Three migrated (policy 0) customers, one of them sharing a phone
+    # number with policy 7, and policy 7 saved twice.
+    FileName = str(tmp_path / "Claims.dat")
+    write_policies(FileName, [
+        (0, dict(CUSTOMER, FName="Brian", LName="Murphy", PostCode="B2C3D4", PhoneNum="7095550001")),
+        (0, dict(CUSTOMER, FName="Carla", LName="Nguyen", PostCode="C3D4E5", PhoneNum="7095550002")),
+        (0, dict(CUSTOMER, FName="Dan", LName="Singh", PostCode="D4E5F6")),
+        (7, CUSTOMER),
+        (7, CUSTOMER),
+    ])
+
+    Index = CI.open_customer_index(FileName)
+    assert len(Index) == 4
+    assert Index.find(dict(CUSTOMER, FName="Brian", LName="Murphy", PostCode="B2C3D4", PhoneNum="")) == \
+        [(0, 'Name and postal code')]
+    assert Index.find(dict(CUSTOMER, FName="Carla", LName="Nguyen", PostCode="C3D4E5", PhoneNum="")) == \
+        [(0, 'Name and postal code')]
+    assert Index.duplicates(Fuzzy=False) == [([0, 7], ['Phone number'])]
+
+def test_update_adds_migrated_records_without_replacing(tmp_path):
+    FileName = str(tmp_path / "Claims.dat")
+    write_policies(FileName, [(0, CUSTOMER)])
+    Index = CI.open_customer_index(FileName)
+
+    write_policies(FileName, [(0, CUSTOMER), (0, dict(CUSTOMER, FName="Brian", PhoneNum="7095550001"))])
+    assert Index.update() == 2
+    assert len(Index) == 3
+    assert Index.find(CUSTOMER, Fuzzy=False) == [(0, 'Phone number'), (0, 'Phone number')]
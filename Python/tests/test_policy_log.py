@@ -0,0 +1,58 @@
+# Description: Tests for rotating and compacting the Claims.dat policy log
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import multiprocessing
+import os
+
+import PolicyLog as PL
+import PolicyStore as PS
+
+
+CUSTOMER = {'FName': "Anne", 'LName': "Tremblay", 'Address': "12 Water Street", 'City': "St. John's",
+            'Province': "NL", 'PostCode': "A1B2C3", 'PhoneNum': "7095551234", 'NumCars': 1,
+            'ExtLiability': "Y", 'GlassCoverage': "N", 'LoanerCar': "N"}
+PREMIUMS = {'Premium': 869.0, 'ExtLiabilityCost': 130.0, 'GlassCoverageCost': 0.0, 'LoanerCarCost': 0.0,
+            'TotalPremium': 999.0}
+
+ROUNDS = 20
+POLICIES_PER_ROUND = 1000
+
+def write_policies(FileName, PolicyNumbers):
+    with PS.PolicyWriter(FileName) as Writer:
+        for PolicyNumber in PolicyNumbers:
+            Writer.write(PolicyNumber, CUSTOMER, [], 'Full', None, PREMIUMS)
+
+def rotate_rounds(FileName):
+
+    # Save a round of new policies, then rotate them into the log.
+    for Round in range(ROUNDS):
+        First = 1 + Round * POLICIES_PER_ROUND
+        write_policies(FileName, range(First, First + POLICIES_PER_ROUND))
+        PL.rotate(FileName)
+
+def compact_until(FileName, Done):
+    while not Done.is_set():
+        PL.compact(FileName, Workers=1, SegmentBytes=1 << 20)
+
+def test_rotate_and_compact_together(tmp_path):
+
+    # Rotations in one process while another compacts over and over. Every
+    # policy is saved once, so however the two interleave each record must
+    # be kept and no temporary segment left behind.
+    FileName = str(tmp_path / "Claims.dat")
+    Done = multiprocessing.Event()
+    Rotator = multiprocessing.Process(target=rotate_rounds, args=(FileName,))
+    Compactor = multiprocessing.Process(target=compact_until, args=(FileName, Done))
+    Rotator.start()
+    Compactor.start()
+    Rotator.join()
+    Done.set()
+    Compactor.join()
+    assert (Rotator.exitcode, Compactor.exitcode) == (0, 0)
+
+    PL.compact(FileName, Workers=1)
+    PolicyNumbers = [Policy['PolicyNumber'] for Policy in PL.iter_log_policies(FileName)]
+    assert PolicyNumbers == list(range(1, ROUNDS * POLICIES_PER_ROUND + 1))
+    assert not [Name for Name in os.listdir(PL.segment_dir(FileName)) if Name.endswith(".tmp")]
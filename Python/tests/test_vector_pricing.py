@@ -0,0 +1,44 @@
+# Description: Tests that the vectorized pricing matches the One Stop calculations
+# Name: William Moss
+# Date(s): 10-17-2026
+
+
+import math
+
+import numpy as np
+import pytest
+
+import OneStop as OS
+import VectorPricing as VP
+
+
+TOTAL_COSTS = (869.0, 1737.25, 2999.99)
+PAYMENTS = (('Full', None), ('Monthly', None), ('Down Pay', 0.0), ('Down Pay', 250.0), ('Down Pay', 1000.5))
+
+def test_monthly_payments_match_scalar():
+    Rates = OS.RATE_TABLE.current()
+    Cases = [(TotCost, PayMethod, DownPay) for TotCost in TOTAL_COSTS for PayMethod, DownPay in PAYMENTS]
+    TotCosts, PayMethods, DownPays = zip(*Cases)
+
+    Vector = VP.calculate_monthly_payments(TotCosts, PayMethods, DownPays, Rates)
+    for (TotCost, PayMethod, DownPay), MonPayment in zip(Cases, Vector.tolist()):
+        Scalar = OS.calculate_monthly_payments(TotCost, PayMethod, DownPay, Rates)
+        if Scalar is None:
+            assert math.isnan(MonPayment)
+        else:
+            assert MonPayment == Scalar
+
+@pytest.mark.parametrize("DownPay", [math.nan, math.inf, -math.inf])
+@pytest.mark.parametrize("PayMethod", ['Monthly', 'Down Pay', 'Full'])
+def test_non_finite_down_payments_rejected_by_both(PayMethod, DownPay):
+    Rates = OS.RATE_TABLE.current()
+    with pytest.raises(ValueError):
+        OS.calculate_monthly_payments(1737.25, PayMethod, DownPay, Rates)
+    with pytest.raises(ValueError):
+        VP.calculate_monthly_payments([1737.25], [PayMethod], [DownPay], Rates)
+    with pytest.raises(ValueError):
+        VP.calculate_monthly_payments(np.array([1737.25]), np.array([PayMethod]), np.array([DownPay]), Rates)
+
+@pytest.mark.parametrize("InputValue", ["nan", "inf", "-inf", "Infinity"])
+def test_non_finite_amounts_are_invalid_input(InputValue):
+    assert not OS.is_valid_input(InputValue, 'PosiFloat')